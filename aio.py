@@ -0,0 +1,216 @@
+import asyncio
+
+from flask import abort, current_app, g, jsonify
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException, InternalServerError
+from werkzeug.routing import Map, Rule
+from werkzeug.test import EnvironBuilder
+
+from api import precondition, to_json, validated
+from clock import get_now
+from genres import GENRE_MODELS
+from instrumentation import begin_request, end_request
+from models import Genre, Venue, Artist, Show
+from pagination import keyset_query, keyset_rows
+from replicas import replica_for_request
+from versions import collection_versions, collection_validator_from, entity_versions, entity_validator_from
+from viewmodels import VENUE_AREA_KEYS, ARTIST_LIST_KEYS, SHOW_LIST_KEYS, venue_areas_query, venue_areas_data, \
+    artist_list_query, artist_list_data, show_list_query, show_list_data, venue_detail, artist_detail, \
+    upcoming_counts_statement, stale_counter_ids, merge_upcoming_counts, SHOW_TILE_ORDER, show_tile
+
+# ----------------------------------------------------------------------------#
+# Async read path.
+# ----------------------------------------------------------------------------#
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+# model -> (its Show column, counterpart model, counterpart's Show column, tile key prefix, shaper)
+DETAILS = {
+    Venue: (Show.venue_id, Artist, Show.artist_id, 'artist', venue_detail),
+    Artist: (Show.artist_id, Venue, Show.venue_id, 'venue', artist_detail),
+}
+
+
+class AsyncDatabase(object):
+    """AsyncEngines over the app's primary and replica binds, built on first use inside the serving event loop.
+
+    Every fetch runs on its own pooled connection, so independent queries can be awaited together.
+    """
+
+    def __init__(self, uri, options=None, binds=None):
+        self.urls = {None: self.async_url(uri)}
+        self.urls.update((key, self.async_url(bind_uri)) for key, bind_uri in (binds or {}).items())
+        self.options = options or {}
+        self.engines = {}
+
+    @staticmethod
+    def async_url(uri):
+        url = make_url(uri)
+        return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+    def get_engine(self, bind=None):
+        if bind not in self.engines:
+            self.engines[bind] = create_async_engine(self.urls[bind], **self.options)
+        return self.engines[bind]
+
+    async def fetch(self, statement):
+        async with AsyncSession(self.get_engine(g.get('db_bind'))) as session:
+            return (await session.execute(statement)).all()
+
+    async def fetch_all(self, *statements):
+        return await asyncio.gather(*(self.fetch(statement) for statement in statements))
+
+
+def init_async(app):
+    binds = app.config.get('SQLALCHEMY_BINDS') or {}
+    app.extensions['async_db'] = AsyncDatabase(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config.get('SQLALCHEMY_ENGINE_OPTIONS'),
+        {key: binds[key] for key in app.extensions.get('replicas', ())})
+    return app.extensions['async_db']
+
+
+def get_async_db():
+    return current_app.extensions['async_db']
+
+
+async def keyset_page_async(query, keys):
+    query, per_page = keyset_query(query, keys)
+    return keyset_rows(await get_async_db().fetch(query), keys, per_page)
+
+
+async def venue_areas_async():
+    rows, next_cursor = await keyset_page_async(venue_areas_query(), VENUE_AREA_KEYS)
+    stale = stale_counter_ids(rows)
+    recounted = dict(await get_async_db().fetch(upcoming_counts_statement(Show.venue_id, stale))) if stale else {}
+    return venue_areas_data(rows, merge_upcoming_counts(rows, stale, recounted), next_cursor)
+
+
+async def artist_list_async():
+    return artist_list_data(*await keyset_page_async(artist_list_query(), ARTIST_LIST_KEYS))
+
+
+async def show_list_async():
+    return show_list_data(*await keyset_page_async(show_list_query(), SHOW_LIST_KEYS))
+
+
+def detail_statements(model, entity_id):
+    """The entity, its genres, and its past and upcoming show tiles: four independent queries."""
+    show_key, counterpart, counterpart_key, prefix, _ = DETAILS[model]
+    link_model, link_key = GENRE_MODELS[model]
+    now = get_now()
+    tiles = select(counterpart.id, counterpart.name, counterpart.image_link, Show.start_date_time) \
+        .join(counterpart, counterpart_key == counterpart.id).where(show_key == entity_id) \
+        .order_by(*SHOW_TILE_ORDER)
+    return (
+        select(model).where(model.id == entity_id),
+        select(Genre.name).join(link_model, link_model.genre_id == Genre.id).where(link_key == entity_id)
+        .order_by(link_model.id),
+        tiles.where(Show.start_date_time <= now),
+        tiles.where(Show.start_date_time > now),
+    )
+
+
+async def detail_async(model, entity_id):
+    entity, genres, past, upcoming = await get_async_db().fetch_all(*detail_statements(model, entity_id))
+    if not entity:
+        abort(404)
+    prefix, shaper = DETAILS[model][-2:]
+    return shaper(entity[0][0], [row.name for row in genres],
+                  [show_tile(prefix, row, row.start_date_time) for row in past],
+                  [show_tile(prefix, row, row.start_date_time) for row in upcoming])
+
+
+async def conditional_async(versions, to_validator, build):
+    """Async counterpart of api.conditional."""
+    validator = to_validator(await get_async_db().fetch(versions))
+    response = precondition(validator)
+    if response is None:
+        response = validated(jsonify(to_json(await build())), validator)
+    return response
+
+
+async def venues():
+    return await conditional_async(collection_versions(['venues', 'shows'], timed=True),
+                                   lambda rows: collection_validator_from(rows, timed=True), venue_areas_async)
+
+
+async def venue(venue_id):
+    return await conditional_async(entity_versions(Venue, venue_id),
+                                   lambda rows: entity_validator_from(Venue, venue_id, rows[0] if rows else None),
+                                   lambda: detail_async(Venue, venue_id))
+
+
+async def artists():
+    return await conditional_async(collection_versions(['artists']), collection_validator_from, artist_list_async)
+
+
+async def artist(artist_id):
+    return await conditional_async(entity_versions(Artist, artist_id),
+                                   lambda rows: entity_validator_from(Artist, artist_id, rows[0] if rows else None),
+                                   lambda: detail_async(Artist, artist_id))
+
+
+async def shows():
+    return await conditional_async(collection_versions(['venues', 'artists', 'shows']), collection_validator_from,
+                                   show_list_async)
+
+
+class AsyncReadApp(object):
+    """ASGI app answering the read-only /api/v1 listing and detail routes on the event loop.
+
+    Those handlers run inside a Flask request context, so request args, config and the clock work
+    as usual; the replica choice and SQL instrumentation are applied by hand, since Flask's request
+    hooks don't run. Any other request goes to `fallback`, normally the Flask app wrapped for ASGI.
+    """
+
+    url_map = Map([
+        Rule('/api/v1/venues', endpoint=venues),
+        Rule('/api/v1/venues/<int:venue_id>', endpoint=venue),
+        Rule('/api/v1/artists', endpoint=artists),
+        Rule('/api/v1/artists/<int:artist_id>', endpoint=artist),
+        Rule('/api/v1/shows', endpoint=shows),
+    ])
+
+    def __init__(self, app, fallback):
+        self.app = app
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            return await self.fallback(scope, receive, send)
+        try:
+            endpoint, values = self.url_map.bind('localhost').match(scope['path'])
+        except HTTPException:
+            return await self.fallback(scope, receive, send)
+
+        environ = EnvironBuilder(
+            path=scope['path'], query_string=scope['query_string'], method=scope['method'],
+            headers=[(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']],
+        ).get_environ()
+        with self.app.request_context(environ):
+            g.db_bind = replica_for_request()
+            begin_request()
+            try:
+                response = await endpoint(**values)
+            except HTTPException as error:
+                response = error.get_response()
+            except Exception:
+                self.app.logger.exception('Exception on %s [%s]', scope['path'], scope['method'])
+                response = InternalServerError().get_response()
+            end_request(response)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.to_wsgi_list()],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': b'' if scope['method'] == 'HEAD' else response.get_data(),
+        })
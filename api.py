@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+
+from availability import availability
+from booking import parse_duration, parse_start
+from clock import get_now
+from models import db, Venue, Artist
+from versions import collection_validator, entity_validator_from, entity_versions, partition_version
+from viewmodels import venue_areas, single_venue, artist_list, single_artist, show_list, search_results, \
+    search_show_results, nearby_args, nearby_venues
+
+# ----------------------------------------------------------------------------#
+# JSON API.
+# ----------------------------------------------------------------------------#
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def to_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    return value
+
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(validator, build):
+    """Answers 304 from the validator alone; `build` only runs when the client's copy is stale."""
+    response = precondition(validator)
+    if response is None:
+        response = validated(jsonify(to_json(build())), validator)
+    return response
+
+
+def precondition(validator):
+    """Aborts with 404 for a missing entity; returns a 304 when the client's copy is current, else None."""
+    if validator is None:
+        abort(404)
+    if not_modified(*validator):
+        return validated(Response(status=304), validator)
+    return None
+
+
+def validated(response, validator):
+    etag, last_modified = validator
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def entity_conditional(model, entity_id, build):
+    """Like conditional() for a detail page. The show partition is cached per worker, so the body
+    is built from one loaded at the versions behind the ETag, never from an older copy."""
+    row = db.session.execute(entity_versions(model, entity_id)).first()
+    version = partition_version(row)
+    return conditional(entity_validator_from(model, entity_id, row), lambda: build(entity_id, version=version))
+
+
+@api.route('/venues')
+def venues():
+    return conditional(collection_validator(['venues', 'shows'], timed=True), venue_areas)
+
+
+@api.route('/venues/nearby')
+def venues_nearby():
+    # Not cached: every location gives a different answer.
+    return jsonify(nearby_venues(*nearby_args()))
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return entity_conditional(Venue, venue_id, single_venue)
+
+
+@api.route('/artists')
+def artists():
+    return conditional(collection_validator(['artists']), artist_list)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return entity_conditional(Artist, artist_id, single_artist)
+
+
+@api.route('/shows')
+def shows():
+    return conditional(collection_validator(['venues', 'artists', 'shows']), show_list)
+
+
+@api.route('/search')
+def search():
+    search_term = request.args.get('q', '')
+    kind = request.args.get('type', 'venues')
+    if kind == 'venues':
+        build = lambda: search_results(Venue, search_term)
+    elif kind == 'artists':
+        build = lambda: search_results(Artist, search_term)
+    elif kind == 'shows':
+        build = lambda: dict(zip(('artists', 'venues'), search_show_results(search_term)))
+    else:
+        abort(400)
+    return conditional(collection_validator(['venues', 'artists', 'shows'], timed=True), build)
+
+
+def entity_availability(model, kind, entity_id):
+    """?start=<datetime>&duration=<minutes>&count=<n>; start defaults to now. Not cached: the
+    answer changes with every booking and shifts with the clock."""
+    try:
+        start = parse_start(request.args['start']) if request.args.get('start') else get_now()
+        duration = parse_duration(request.args.get('duration'))
+        count = int(request.args.get('count', 5))
+    except (TypeError, ValueError, OverflowError):
+        abort(400)
+    if db.session.query(model.id).filter(model.id == entity_id).first() is None:
+        abort(404)
+    config = current_app.config
+    count = max(1, min(count, config['AVAILABILITY_MAX_WINDOWS']))
+    horizon = timedelta(days=config['AVAILABILITY_HORIZON_DAYS'])
+    return jsonify(to_json(availability(kind, entity_id, start, duration, count, horizon)))
+
+
+@api.route('/venues/<int:venue_id>/availability')
+def venue_availability(venue_id):
+    return entity_availability(Venue, 'venue', venue_id)
+
+
+@api.route('/artists/<int:artist_id>/availability')
+def artist_availability(artist_id):
+    return entity_availability(Artist, 'artist', artist_id)
@@ -2,30 +2,44 @@
 # Imports
 # ----------------------------------------------------------------------------#
 
-import logging
-from logging import Formatter, FileHandler
+import os
+from functools import lru_cache
 
 import babel
 import dateutil.parser
-from flask import Flask, render_template, request, flash, redirect, url_for
+from flask import Blueprint, Flask, render_template, request, flash, redirect, url_for, abort, Response, \
+    stream_with_context, jsonify
 from flask_migrate import Migrate
 from flask_moment import Moment
-from sqlalchemy import func
 
 from forms import *
+from exporter import EXPORT_FORMATS, export_command, export_shows, parse_since, serialize
+from importer import import_command
 from models import *
+from aio import init_async
+from api import api
+from booking import book_shows
+from calendars import calendar
+from counters import recount_command
+from genres import set_genres
+from geocoding import geocode_command
+from recommender import recommend_command
+from instrumentation import init_instrumentation
+from replicas import init_replicas, read_only
+from cache import init_cache, render_cached
+from clock import init_clock
+from search import init_search
+from timeline import init_timeline
+from versions import current_partition_version
+from viewmodels import *
 
 # ----------------------------------------------------------------------------#
 # App Config.
 # ----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db.init_app(app)
-migrate = Migrate(app, db)
-
-now = datetime.now()
+main = Blueprint('main', __name__)
+moment = Moment()
+migrate = Migrate()
 
 
 # ----------------------------------------------------------------------------#
@@ -37,255 +51,98 @@ now = datetime.now()
 # Filters.
 # ----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+# Babel's own names for the locale's formats; they are looked up, not parsed as patterns.
+BABEL_FORMATS = ('short', 'medium', 'long', 'full')
 
 
-# ----------------------------------------------------------------------------#
-# Controllers.
-# ----------------------------------------------------------------------------#
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+    """(parsed pattern, locale); the pattern is None for one of Babel's named formats."""
+    format = DATETIME_FORMATS.get(format, format)
+    return None if format in BABEL_FORMATS else babel.dates.parse_pattern(format), babel.Locale.parse(locale)
 
-@app.route('/')
-def index():
-    return render_template('pages/home.html')
 
+@lru_cache(maxsize=4096)
+def render_datetime(date, format, locale):
+    # The same show times repeat across pages, so formatted strings are memoized.
+    pattern, locale = datetime_pattern(format, locale)
+    if pattern is None:
+        return babel.dates.format_datetime(date, format, locale=locale)
+    return pattern.apply(date, locale)
 
-def count_venue_shows(venue_id, upcoming=True):
-    if upcoming:
-        return Show.query.filter_by(venue_id=venue_id).filter(Show.start_date_time > now).count()
-    return Show.query.filter_by(venue_id=venue_id).filter(Show.start_date_time < now).count()
 
-
-def count_artist_shows(artist_id, upcoming=True):
-    if upcoming:
-        return Show.query.filter_by(artist_id=artist_id).filter(Show.start_date_time > now).count()
-    return Show.query.filter_by(artist_id=artist_id).filter(Show.start_date_time < now).count()
+def format_datetime(value, format='medium'):
+    if isinstance(value, str):
+        value = dateutil.parser.parse(value)
+    return render_datetime(value, format, 'en')
 
 
-def get_artists_shows(artist_id, upcoming=True):
-    if upcoming:
-        all_shows = db.session.query(Show, Venue).filter_by(artist_id=artist_id).outerjoin(Venue,
-                                                                                           Show.venue_id == Venue.id).filter(
-            Show.start_date_time > now).all()
-    else:
-        all_shows = db.session.query(Show, Venue).filter_by(artist_id=artist_id).outerjoin(Venue,
-                                                                                           Show.venue_id == Venue.id).filter(
-            Show.start_date_time < now).all()
-
-    data = []
-    for item in all_shows:
-        data.append({
-            "venue_id": item.Venue.id,
-            "venue_name": item.Venue.name,
-            "venue_image_link": item.Venue.image_link,
-            "start_time": str(item['0'].start_date_time)
-        })
-
-    res = dict()
-    res['total'] = len(data)
-    res['data'] = data
-
-    return res
-
-
-def get_venue_shows(venue_id, upcoming=True):
-    if upcoming:
-        all_shows = db.session.query(Show, Artist, Venue).join(Artist, Venue).filter_by(id=venue_id).filter(
-            Show.start_date_time > now).all()
-    else:
-        all_shows = db.session.query(Show, Artist, Venue).join(Artist, Venue).filter_by(id=venue_id).filter(
-            Show.start_date_time < now).all()
+main.add_app_template_filter(format_datetime, 'datetime')
 
-    data = []
-    for item in all_shows:
-        data.append({
-            "artist_id": item['Artist'].id,
-            "artist_name": item['Artist'].name,
-            "artist_image_link": "https://images.unsplash.com/photo-1558369981-f9ca78462e61?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=794&q=80",
-            "start_time": str(item['1'].start_date_time),
-        })
 
-    res = dict()
-    res['total'] = len(data)
-    res['data'] = data
+# ----------------------------------------------------------------------------#
+# Controllers.
+# ----------------------------------------------------------------------------#
 
-    return res
+@main.route('/')
+def index():
+    return render_template('pages/home.html')
 
 
 #  Venues
 #  ----------------------------------------------------------------
 
-@app.route('/venues')
+@main.route('/venues')
 def venues():
-    cities = db.session.query(Venue.city, func.count(Venue.city).label("total_counts")) \
-        .outerjoin(Show).group_by(Venue.city).all()
-
-    data = []
-    for city in cities:
-        city_data = {
-            "city": city[0],
-            "state": "",
-            "venues": []
-        }
-        cities = Venue.query.filter_by(city=city[0]).all()
-        for ci in cities:
-            city_data["state"] = ci.state
-            city_data["venues"].append({
-                "id": ci.id,
-                "name": ci.name,
-                "num_upcoming_shows": count_venue_shows(ci.id)
-            })
-        data.append(city_data)
-
-    # data = [{
-    #     "city": "San Francisco",
-    #     "state": "CA",
-    #     "venues": [{
-    #         "id": 1,
-    #         "name": "The Musical Hop",
-    #         "num_upcoming_shows": 0,
-    #     }, {
-    #         "id": 3,
-    #         "name": "Park Square Live Music & Coffee",
-    #         "num_upcoming_shows": 1,
-    #     }]
-    # }, {
-    #     "city": "New York",
-    #     "state": "NY",
-    #     "venues": [{
-    #         "id": 2,
-    #         "name": "The Dueling Pianos Bar",
-    #         "num_upcoming_shows": 0,
-    #     }]
-    # }]
-    return render_template('pages/venues.html', areas=data)
-
-
-@app.route('/venues/search', methods=['POST'])
+    return render_cached('venues', 'pages/venues.html', venue_areas)
+
+
+@main.route('/venues/nearby')
+def nearby_venues_page():
+    latitude, longitude, radius_km, limit = nearby_args()
+    response = nearby_venues(latitude, longitude, radius_km, limit)
+    return render_template('pages/nearby_venues.html', results=response, radius=radius_km)
+
+
+@main.route('/venues/search', methods=['POST'])
+@read_only
 def search_venues():
     search_term = request.form.get('search_term', '')
-    results = Venue.query.filter(Venue.name.ilike("%" + search_term + "%")).all()
-    data = []
-    response = {
-        "count": len(results),
-        "data": data
-    }
-
-    for result in results:
-        data.append({
-            "id": result.id,
-            "name": result.name,
-            "num_upcoming_shows": count_venue_shows(result.id),
-        })
-
+    response = search_results(Venue, search_term)
     return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
 
-def single_venue(venue_id, editing=False):
-    venue = Venue.query.filter_by(id=venue_id).outerjoin(Venue_Genre, Venue.id == Venue_Genre.venue_id).first()
-
-    gen = []
-    if len(venue.genres) > 0:
-        for ge in venue.genres:
-            gen.append(ge.genre)
-
-    if editing:
-        return {
-            "id": venue.id,
-            "name": venue.name,
-            "genres": gen,
-            "address": venue.address,
-            "city": venue.city,
-            "state": venue.state,
-            "phone": venue.phone,
-            "website": venue.website_link,
-            "facebook_link": venue.facebook_link,
-            "seeking_talent": venue.seeking_talent,
-            "image_link": venue.image_link,
-        }
-
-    past_shows = get_venue_shows(venue_id, upcoming=False)
-    upcoming_shows = get_venue_shows(venue_id)
-    return {
-        "id": venue.id,
-        "name": venue.name,
-        "genres": gen,
-        "address": venue.address,
-        "city": venue.city,
-        "state": venue.state,
-        "phone": venue.phone,
-        "website": venue.website_link,
-        "facebook_link": venue.facebook_link,
-        "seeking_talent": venue.seeking_talent,
-        "image_link": venue.image_link,
-        "past_shows": past_shows['data'],
-        "upcoming_shows": upcoming_shows['data'],
-        "past_shows_count": past_shows['total'],
-        "upcoming_shows_count": upcoming_shows['total']
-    }
-
-
-@app.route('/shows/search', methods=['POST'])
+@main.route('/shows/search', methods=['POST'])
+@read_only
 def search_shows():
     search_term = request.form.get('search_term', '')
-    artist_results = db.session.query(Show, Artist).join(Artist).filter(
-        Artist.name.ilike("%" + search_term + "%")).all()
-    artist_data = []
-    artist_response = {
-        "count": len(artist_results),
-        "data": artist_data
-    }
-
-    for result in artist_results:
-        artist_data.append({
-            "id": result.Artist.id,
-            "name": result.Artist.name,
-            "num_upcoming_shows": count_venue_shows(result.Artist.id),
-        })
-
-    venue_results = db.session.query(Show, Venue).join(Venue).filter(
-        Venue.name.ilike("%" + search_term + "%")).all()
-
-    venue_data = []
-    venue_response = {
-        "count": len(venue_results),
-        "data": venue_data
-    }
-
-    for result in venue_results:
-        venue_data.append({
-            "id": result.Venue.id,
-            "name": result.Venue.name,
-            "num_upcoming_shows": count_venue_shows(result.Venue.id),
-        })
-
+    artist_response, venue_response = search_show_results(search_term)
     return render_template('pages/show.html', artists=artist_response, venues=venue_response, search_term=search_term)
 
 
-@app.route('/venues/<int:venue_id>')
+@main.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
-    data = single_venue(venue_id)
-    return render_template('pages/show_venue.html', venue=data)
+    # Another worker's writes don't reach this one's show partitions; the version says when they're stale.
+    data = single_venue(venue_id, version=current_partition_version(Venue, venue_id))
+    return render_template('pages/show_venue.html', venue=data, recommended=recommended_artists(venue_id))
 
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@main.route('/venues/create', methods=['GET'])
 def create_venue_form():
     form = VenueForm()
     return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/create', methods=['POST'])
+@main.route('/venues/create', methods=['POST'])
 def create_venue_submission():
     form = VenueForm()
     if form.validate_on_submit():
@@ -315,9 +172,7 @@ def create_venue_submission():
                 seeking_description=seeking_description,
             )
 
-            for genre in genres:
-                new_genre = Venue_Genre(genre=genre)
-                new_genre.venue = venue
+            set_genres(venue, genres)
 
             data = venue
             db.session.add(venue)
@@ -335,7 +190,7 @@ def create_venue_submission():
     return render_template('forms/new_venue.html', form=form)
 
 
-@app.route('/venues/<venue_id>', methods=['POST'])
+@main.route('/venues/<venue_id>', methods=['POST'])
 def delete_venue(venue_id):
     try:
         venue = Venue.query.get(venue_id)
@@ -347,94 +202,40 @@ def delete_venue(venue_id):
         flash('An error occurred. Please try again', 'danger')
     finally:
         db.session.close()
-    return redirect(url_for("index"))
+    return redirect(url_for('main.index'))
 
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+@main.route('/artists')
 def artists():
-    data = db.session.query(Artist.id, Artist.name).all()
-    return render_template('pages/artists.html', artists=data)
+    return render_cached('artists', 'pages/artists.html', artist_list)
 
 
-@app.route('/artists/search', methods=['POST'])
+@main.route('/artists/search', methods=['POST'])
+@read_only
 def search_artists():
     search_term = request.form.get('search_term', '')
-    results = Artist.query.filter(Artist.name.ilike("%" + search_term + "%")).all()
-    data = []
-    response = {
-        "count": len(results),
-        "data": data
-    }
-
-    for result in results:
-        data.append({
-            "id": result.id,
-            "name": result.name,
-            "num_upcoming_shows": count_venue_shows(result.id),
-        })
-
+    response = search_results(Artist, search_term)
     return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
 
-def single_artist(artist_id, editing=False):
-    artist = Artist.query.filter_by(id=artist_id).outerjoin(Artist_Genre, Artist.id == Artist_Genre.artist_id).first()
-    gen = []
-    if len(artist.genres) > 0:
-        for ge in artist.genres:
-            gen.append(ge.genre)
-
-    past_shows = get_artists_shows(artist_id, upcoming=False)
-    upcoming_shows = get_artists_shows(artist_id)
-
-    if editing:
-        return {
-            "id": artist.id,
-            "name": artist.name,
-            "genres": gen,
-            "city": artist.city,
-            "state": artist.state,
-            "phone": artist.phone,
-            "website": artist.website_link,
-            "facebook_link": artist.facebook_link,
-            "seeking_venue": artist.seeking_venue,
-            "image_link": artist.image_link
-        }
-    return {
-        "id": artist.id,
-        "name": artist.name,
-        "genres": gen,
-        "city": artist.city,
-        "state": artist.state,
-        "phone": artist.phone,
-        "website": artist.website_link,
-        "facebook_link": artist.facebook_link,
-        "seeking_venue": artist.seeking_venue,
-        "image_link": artist.image_link,
-        "past_shows": past_shows['data'],
-        "upcoming_shows": upcoming_shows['data'],
-        "past_shows_count": count_artist_shows(artist_id, False),
-        "upcoming_shows_count": count_artist_shows(artist_id),
-    }
-
-
-@app.route('/artists/<int:artist_id>')
+@main.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
-    data = single_artist(artist_id)
-    return render_template('pages/show_artist.html', artist=data)
+    data = single_artist(artist_id, version=current_partition_version(Artist, artist_id))
+    return render_template('pages/show_artist.html', artist=data, recommended=recommended_venues(artist_id))
 
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@main.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
     artist = single_artist(artist_id, editing=True)
     form = ArtistForm()
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@main.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
     try:
         name = request.form.get("name")
@@ -447,21 +248,19 @@ def edit_artist_submission(artist_id):
         website_link = request.form.get("website_link")
         seeking_venue = request.form.get("seeking_venue") == 'y'
         seeking_description = request.form.get('seeking_description')
-        artist = Artist(
-            name=name,
-            city=city,
-            state=state,
-            phone=phone,
-            facebook_link=facebook_link,
-            seeking_venue=seeking_venue,
-            image_link=image_link,
-            website_link=website_link,
-            seeking_description=seeking_description,
-        )
-
-        for genre in genres:
-            new_genre = Artist_Genre(genre=genre)
-            new_genre.artist = artist
+
+        artist = Artist.query.get(artist_id)
+        artist.name = name
+        artist.city = city
+        artist.state = state
+        artist.phone = phone
+        artist.facebook_link = facebook_link
+        artist.seeking_venue = seeking_venue
+        artist.image_link = image_link
+        artist.website_link = website_link
+        artist.seeking_description = seeking_description
+
+        set_genres(artist, genres)
 
         db.session.add(artist)
         db.session.commit()
@@ -471,17 +270,17 @@ def edit_artist_submission(artist_id):
         flash('An error occurred. Artist could not be updated.', 'danger')
     finally:
         db.session.close()
-    return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('main.show_artist', artist_id=artist_id))
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@main.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
     venue = single_venue(venue_id, editing=True)
     form = VenueForm()
     return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@main.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
     try:
         name = request.form.get("name")
@@ -508,9 +307,7 @@ def edit_venue_submission(venue_id):
         venue.website_link = website_link
         venue.seeking_description = seeking_description
 
-        for genre in genres:
-            new_genre = Venue_Genre(genre=genre)
-            new_genre.venue = venue
+        set_genres(venue, genres)
 
         db.session.add(venue)
         db.session.commit()
@@ -520,19 +317,19 @@ def edit_venue_submission(venue_id):
         flash('An error occurred. Venue could not be updated.', 'danger')
     finally:
         db.session.close()
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('main.show_venue', venue_id=venue_id))
 
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@main.route('/artists/create', methods=['GET'])
 def create_artist_form():
     form = ArtistForm()
     return render_template('forms/new_artist.html', form=form)
 
 
-@app.route('/artists/create', methods=['POST'])
+@main.route('/artists/create', methods=['POST'])
 def create_artist_submission():
     form = ArtistForm()
     if form.validate_on_submit():
@@ -560,9 +357,7 @@ def create_artist_submission():
                 seeking_description=seeking_description,
             )
 
-            for genre in genres:
-                new_genre = Artist_Genre(genre=genre)
-                new_genre.artist = artist
+            set_genres(artist, genres)
 
             data = artist
             db.session.add(artist)
@@ -583,88 +378,148 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+@main.route('/shows')
 def shows():
-    all_shows = db.session.query(Show, Artist, Venue).join(Artist, Venue).all()
-    data = []
-    for item in all_shows:
-        data.append({
-            "venue_id": item['2'].id,
-            "venue_name": item['2'].name,
-            "artist_id": item['1'].id,
-            "artist_name": item['1'].name,
-            # "artist_image_link": 'https://images.unsplash.com/photo-1549213783-8284d0336c4f?ixlib=rb-1.2.1&ixid=eyJhcHBfaWQiOjEyMDd9&auto=format&fit=crop&w=300&q=80',
-            "artist_image_link": data['1'].image_link,
-            "start_time": str(item['0'].start_date_time),
-        })
-
-    return render_template('pages/shows.html', shows=data)
-
-
-@app.route('/shows/create')
+    return render_cached('shows', 'pages/shows.html', show_list)
+
+
+@main.route('/shows/export')
+def export_shows_feed():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    try:
+        since = parse_since(request.args.get('since'))
+    except (ValueError, OverflowError):
+        abort(400)
+
+    response = Response(stream_with_context(serialize(export_shows(since), fmt)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = 'attachment; filename=shows.' + fmt
+    return response
+
+
+@main.route('/shows/create')
 def create_shows():
     # renders form. do not touch.
     form = ShowForm()
     return render_template('forms/new_show.html', form=form)
 
 
-@app.route('/shows/create', methods=['POST'])
+@main.route('/shows/create', methods=['POST'])
 def create_show_submission():
-    error_message = ''
     try:
-        artist_id = request.form.get("artist_id")
-        venue_id = request.form.get("venue_id")
-        start_time = request.form.get("start_time")
+        result = book_shows([{
+            "artist_id": request.form.get("artist_id"),
+            "venue_id": request.form.get("venue_id"),
+            "start_time": request.form.get("start_time"),
+            "duration": request.form.get("duration"),
+        }])[0]
+        if result["status"] == "created":
+            flash('Show was successfully listed!', 'success')
+        else:
+            flash('An error occurred. Show could not be listed. ' + ' '.join(result["errors"]), 'danger')
+    except:
+        db.session.rollback()
+        flash('An error occurred. Show could not be listed.', 'danger')
+    finally:
+        db.session.close()
+    return render_template('pages/home.html')
 
-        check_artist = Artist.query.get(artist_id)
-        if check_artist is None:
-            error_message = error_message + " Invalid Artist ID"
 
-        check_venue = Venue.query.get(venue_id)
-        if check_venue is None:
-            error_message = error_message + " Invalid Venue ID"
+@main.route('/shows/batch')
+def create_shows_batch():
+    return render_template('forms/new_shows.html', bookings='', results=None)
 
-        show = Show(
-            artist_id=artist_id,
-            venue_id=venue_id,
-            start_date_time=start_time,
-        )
 
-        db.session.add(show)
-        db.session.commit()
-        flash('Show was successfully listed!', 'success')
+@main.route('/shows/batch', methods=['POST'])
+def create_shows_batch_submission():
+    """Books many shows at once, from a JSON list or a form textarea of "artist_id, venue_id, start time" lines."""
+    if request.is_json:
+        bookings = request.get_json()
+        if not isinstance(bookings, list) or not all(isinstance(booking, dict) for booking in bookings):
+            abort(400)
+    else:
+        bookings = []
+        for line in request.form.get('bookings', '').splitlines():
+            if line.strip():
+                fields = [field.strip() for field in line.split(',', 2)] + ['', '']
+                bookings.append({"artist_id": fields[0], "venue_id": fields[1], "start_time": fields[2]})
+
+    try:
+        results = book_shows(bookings)
     except:
         db.session.rollback()
-        flash('An error occurred. Show could not be listed. ' + error_message, 'danger')
+        results = None
     finally:
         db.session.close()
-    return render_template('pages/home.html')
+
+    if request.is_json:
+        if results is None:
+            return jsonify({"error": "Shows could not be listed."}), 500
+        return jsonify({"results": results})
+
+    if results is None:
+        flash('An error occurred. Shows could not be listed.', 'danger')
+    else:
+        created = sum(result["status"] == "created" for result in results)
+        flash(str(created) + ' of ' + str(len(results)) + ' shows were listed.', 'success' if created else 'danger')
+    return render_template('forms/new_shows.html', bookings=request.form.get('bookings', ''),
+                           results=zip(bookings, results or []))
 
 
-@app.errorhandler(404)
+@main.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
 
-@app.errorhandler(500)
+@main.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+# ----------------------------------------------------------------------------#
+# App factory.
+# ----------------------------------------------------------------------------#
+
+def create_app(config=None):
+    """Builds the app from config.py, overlaid with `config` (an object or import path) when given."""
+    app = Flask(__name__)
+    app.config.from_object('config')
+    if config is not None:
+        app.config.from_object(config)
+    if not app.config.get('SECRET_KEY'):
+        raise RuntimeError('SECRET_KEY must be set')
+
+    moment.init_app(app)
+    db.init_app(app)
+    init_replicas(app)
+    init_instrumentation(app)
+    migrate.init_app(app, db)
+    init_search(app)
+    init_clock(app)
+    init_timeline(app)
+    init_cache(app)
+    init_async(app)
+    app.register_blueprint(main)
+    app.register_blueprint(api)
+    app.register_blueprint(calendar)
+
+    app.cli.add_command(import_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(recount_command)
+    app.cli.add_command(geocode_command)
+    app.cli.add_command(recommend_command)
+
+    return app
+
 
 # ----------------------------------------------------------------------------#
 # Launch.
 # ----------------------------------------------------------------------------#
 
+# FYYUR_CONFIG picks a profile, e.g. FYYUR_CONFIG=config.ProductionConfig.
+app = create_app(os.environ.get('FYYUR_CONFIG'))
+
 # Default port:
 if __name__ == '__main__':
     app.run()
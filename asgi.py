@@ -0,0 +1,12 @@
+# ASGI entry point: uvicorn asgi:application (pip install uvicorn; see DEPLOYMENT.md).
+#
+# The read-only /api/v1 listing and detail routes run on the event loop through aio.AsyncReadApp;
+# every other request is handed to the Flask app on a thread pool.
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from aio import AsyncReadApp
+from app import app
+
+application = AsyncReadApp(app, WSGIMiddleware(app, workers=int(os.environ.get('ASGI_WSGI_THREADS', 10))))
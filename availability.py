@@ -0,0 +1,151 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+from sqlalchemy import or_, select
+
+from models import db, Show, MAX_SHOW_DURATION
+
+# ----------------------------------------------------------------------------#
+# Availability.
+# ----------------------------------------------------------------------------#
+
+# kind -> the Show column that points at the booked entity
+OWNER_KEYS = {
+    'artist': Show.artist_id,
+    'venue': Show.venue_id,
+}
+
+
+class Schedule(object):
+    """One artist's or venue's shows as half-open [start, end) intervals, sorted by start.
+
+    `reach[i]` is the latest end among the first i + 1 shows, so it never decreases even if old
+    rows overlap; a bisect on it finds the first show that can reach past a given instant. That
+    makes overlap checks and the search for free windows O(log n + k), like an interval tree,
+    with plain sorted lists. Shows are (start, end, id) tuples.
+    """
+
+    def __init__(self, shows=()):
+        self.shows = sorted(shows)
+        self.starts = [show[0] for show in self.shows]
+        self.reach = list(accumulate((show[1] for show in self.shows), max))
+
+    def add(self, start, end, show_id=None):
+        """Batch bookings add each accepted row so later rows in the batch see it.
+
+        The lists grow by one insertion each, and `reach` is only updated from the insertion point
+        until it already reaches past `end`, which is usually right away.
+        """
+        index = bisect_right(self.starts, start)
+        self.shows.insert(index, (start, end, show_id))
+        self.starts.insert(index, start)
+        reach = max(self.reach[index - 1], end) if index else end
+        self.reach.insert(index, reach)
+        for i in range(index + 1, len(self.reach)):
+            if self.reach[i] >= reach:
+                break
+            self.reach[i] = reach
+
+    def first_reaching(self, instant):
+        """Index of the first show whose interval, or an earlier one's, ends after `instant`."""
+        return bisect_right(self.reach, instant)
+
+    def conflicts(self, start, end):
+        """Shows overlapping [start, end). Empty ranges, on either side, overlap nothing."""
+        if start >= end:
+            return []
+        candidates = self.shows[self.first_reaching(start):bisect_left(self.starts, end)]
+        return [show for show in candidates if show[0] < show[1] and show[1] > start]
+
+    def is_free(self, start, end):
+        return not self.conflicts(start, end)
+
+    def free_windows(self, start, duration, until, count=5):
+        """Up to `count` gaps of at least `duration` between `start` and `until`, as (from, to) pairs."""
+        windows, cursor = [], start
+        for show_start, show_end, _ in self.shows[self.first_reaching(start):]:
+            if len(windows) == count or show_start >= until:
+                break
+            if show_end <= cursor or show_start >= show_end:
+                continue
+            if show_start - cursor >= duration:
+                windows.append((cursor, show_start))
+            cursor = max(cursor, show_end)
+        if len(windows) < count and until - cursor >= duration:
+            windows.append((cursor, until))
+        return windows
+
+
+def load_shows(criteria, start, end, connection=None):
+    """(artist_id, venue_id, start, end, id) rows matching `criteria` that can overlap [start, end).
+
+    No show lasts longer than MAX_SHOW_DURATION, so the (owner, start_date_time) indexes bound
+    the scan to starts in (start - MAX_SHOW_DURATION, end).
+    """
+    statement = select(Show.artist_id, Show.venue_id, Show.start_date_time, Show.end_date_time, Show.id) \
+        .where(criteria, Show.start_date_time > start - MAX_SHOW_DURATION, Show.start_date_time < end) \
+        .order_by(Show.start_date_time)
+    return (connection or db.session).execute(statement)
+
+
+def get_schedule(kind, entity_id, start, end):
+    """The entity's Schedule for the window [start, end)."""
+    return Schedule((show_start, show_end, show_id) for _, _, show_start, show_end, show_id
+                    in load_shows(OWNER_KEYS[kind] == entity_id, start, end))
+
+
+class BookingIndex(object):
+    """Schedules of every artist and venue in a batch of bookings, loaded with one query.
+
+    `rows` are (artist_id, venue_id, start, end) tuples; `booked` holds the (artist_id, venue_id,
+    start) of every loaded or added show, which identifies a listing. Queries run on `connection`,
+    or the session when it is None.
+    """
+
+    def __init__(self, rows, connection=None):
+        self.schedules = {}
+        self.booked = set()
+        if not rows:
+            return
+        artist_ids = {row[0] for row in rows}
+        venue_ids = {row[1] for row in rows}
+        shows = {}
+        for artist_id, venue_id, start, end, show_id in load_shows(
+                or_(Show.artist_id.in_(artist_ids), Show.venue_id.in_(venue_ids)),
+                min(row[2] for row in rows), max(row[3] for row in rows), connection):
+            self.booked.add((artist_id, venue_id, start))
+            shows.setdefault(('artist', artist_id), []).append((start, end, show_id))
+            shows.setdefault(('venue', venue_id), []).append((start, end, show_id))
+        self.schedules = {key: Schedule(intervals) for key, intervals in shows.items()}
+
+    def schedule(self, kind, entity_id):
+        key = (kind, entity_id)
+        if key not in self.schedules:
+            self.schedules[key] = Schedule()
+        return self.schedules[key]
+
+    def conflicts(self, artist_id, venue_id, start, end):
+        """{'artist': [...], 'venue': [...]} overlapping shows of a prospective booking."""
+        return {kind: self.schedule(kind, entity_id).conflicts(start, end)
+                for kind, entity_id in (('artist', artist_id), ('venue', venue_id))}
+
+    def add(self, artist_id, venue_id, start, end, show_id=None):
+        self.booked.add((artist_id, venue_id, start))
+        self.schedule('artist', artist_id).add(start, end, show_id)
+        self.schedule('venue', venue_id).add(start, end, show_id)
+
+
+def availability(kind, entity_id, start, duration, count, horizon):
+    """Whether [start, start + duration) is free for the artist or venue, what it clashes with, and
+    the next `count` free windows long enough for it within `horizon` of `start`."""
+    end, until = start + duration, start + horizon
+    schedule = get_schedule(kind, entity_id, start, until)
+    return {
+        "start_time": start,
+        "end_time": end,
+        "free": schedule.is_free(start, end),
+        "conflicts": [{"id": show_id, "start_time": show_start, "end_time": show_end}
+                      for show_start, show_end, show_id in schedule.conflicts(start, end)],
+        "next_free": [{"start_time": window_start, "end_time": window_end}
+                      for window_start, window_end in schedule.free_windows(start, duration, until, count)],
+    }
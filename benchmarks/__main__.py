@@ -0,0 +1,120 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import click
+
+from benchmarks.catalog import SIZES, generate
+from benchmarks.runner import compare, create_benchmark_app, max_rss_kb, run, uncovered_endpoints
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Command line.
+# ----------------------------------------------------------------------------#
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def log(message):
+    click.echo(message, err=True)
+
+
+@click.command()
+@click.option('--size', type=click.Choice(sorted(SIZES)), default='small', show_default=True,
+              help='Catalog preset: small, medium or large (10k venues, 100k artists, 1M shows).')
+@click.option('--venues', type=int, help='Override the preset venue count.')
+@click.option('--artists', type=int, help='Override the preset artist count.')
+@click.option('--shows', type=int, help='Override the preset show count.')
+@click.option('--seed', default=0, show_default=True, help='Seeds both the catalog and the request mix.')
+@click.option('--database', 'database_uri', default=None,
+              help='Database URI; defaults to a SQLite file per size and seed in the temp directory.')
+@click.option('--reuse/--regenerate', default=True, show_default=True,
+              help='Benchmark an existing catalog in the database instead of rebuilding it.')
+@click.option('--requests', default=50, show_default=True, help='Timed requests per scenario.')
+@click.option('--cache', type=click.Choice(['cold', 'warm']), default='cold', show_default=True,
+              help='cold clears the page cache and show partitions before every request.')
+@click.option('--only', multiple=True, help='Only scenarios whose name contains this; repeatable.')
+@click.option('--output', type=click.Path(dir_okay=False), help='Write the JSON results here instead of stdout.')
+@click.option('--baseline', type=click.File('r'), help='A previous --output to compare against.')
+@click.option('--tolerance', default=0.25, show_default=True, help='Allowed p95 slowdown against --baseline.')
+def main(size, venues, artists, shows, seed, database_uri, reuse, requests, cache, only, output, baseline,
+         tolerance):
+    """Generate a seeded synthetic catalog, drive every route through the Flask test client and report
+    p50/p95 latency, queries per request and peak memory as JSON.
+
+    Exits with status 1 when --baseline is given and a scenario got slower or runs more queries.
+    """
+    counts = dict(zip(('venues', 'artists', 'shows'), SIZES[size]))
+    counts.update({name: value for name, value in (('venues', venues), ('artists', artists), ('shows', shows))
+                   if value is not None})
+    if database_uri is None:
+        path = os.path.join(tempfile.gettempdir(), 'fyyur-bench-%d-%d-%d-%d.db' % (
+            counts['venues'], counts['artists'], counts['shows'], seed))
+        if not reuse and os.path.exists(path):
+            os.remove(path)
+        database_uri = 'sqlite:///' + path
+
+    app = create_benchmark_app(database_uri)
+    generate_seconds = None
+    with app.app_context():
+        if not reuse:
+            db.drop_all()
+        db.create_all()
+        if db.session.query(Venue.id).first() is None:
+            log('generating %(venues)d venues, %(artists)d artists, %(shows)d shows' % counts)
+            started = time.monotonic()
+            generate(db.engine, seed=seed, log=log, **counts)
+            generate_seconds = round(time.monotonic() - started, 1)
+        else:
+            log('reusing the catalog in %s' % database_uri)
+        counts = {name: db.session.query(db.func.count(model.id)).scalar()
+                  for name, model in (('venues', Venue), ('artists', Artist), ('shows', Show))}
+        db.session.remove()
+
+    results = run(app, requests=requests, cold=cache == 'cold', seed=seed, only=only, log=log)
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': db.get_engine(app).dialect.name,
+            'catalog': counts,
+            'seed': seed,
+            'requests': requests,
+            'cache': cache,
+            'generate_seconds': generate_seconds,
+            'max_rss_kb': max_rss_kb(),
+            'uncovered_endpoints': uncovered_endpoints(app),
+        },
+        'routes': results,
+    }
+    for endpoint in report['meta']['uncovered_endpoints']:
+        log('warning: no scenario for %s' % endpoint)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as stream:
+            stream.write(text + '\n')
+    else:
+        click.echo(text)
+
+    if baseline is not None:
+        regressions = compare(results, json.load(baseline), tolerance)
+        for regression in regressions:
+            log('regression: ' + regression)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
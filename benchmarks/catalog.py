@@ -0,0 +1,205 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import true
+
+from config import GAZETTEER_PATH
+from counters import recount_where
+from forms import VenueForm
+from genres import genre_ids
+from geocoding import GazetteerGeocoder
+from importer import allocate_ids, batched, write_rows
+from models import Venue, Venue_Genre, Artist, Artist_Genre, Show
+from versions import touch_versions
+
+# ----------------------------------------------------------------------------#
+# Synthetic catalog.
+# ----------------------------------------------------------------------------#
+
+# name -> (venues, artists, shows)
+SIZES = {
+    'small': (500, 2000, 20000),
+    'medium': (2000, 20000, 200000),
+    'large': (10000, 100000, 1000000),
+}
+
+# The catalog's "now": shows run from two years before it to one year after, and the benchmark
+# app's clock is pinned to it so every run splits upcoming and past shows the same way.
+EPOCH = datetime(2024, 6, 1, 12, 0)
+PAST_DAYS = 730
+FUTURE_DAYS = 365
+
+# (start, possible lengths in minutes) of the evening's shows; a slot's shows never overlap the next slot's.
+SHOW_SLOTS = [
+    (timedelta(hours=17), (60, 90, 120)),
+    (timedelta(hours=19, minutes=30), (90, 120, 150)),
+    (timedelta(hours=22), (60, 90, 120)),
+]
+
+# (city, state, weight): roughly metro population, so a few cities hold most of the catalog.
+CITIES = [
+    ('New York', 'NY', 84), ('Los Angeles', 'CA', 39), ('Chicago', 'IL', 27), ('Houston', 'TX', 23),
+    ('Phoenix', 'AZ', 16), ('Philadelphia', 'PA', 16), ('San Antonio', 'TX', 15), ('San Diego', 'CA', 14),
+    ('Dallas', 'TX', 13), ('Austin', 'TX', 10), ('San Francisco', 'CA', 9), ('Seattle', 'WA', 7),
+    ('Denver', 'CO', 7), ('Nashville', 'TN', 7), ('Boston', 'MA', 7), ('Portland', 'OR', 7),
+    ('Las Vegas', 'NV', 6), ('Detroit', 'MI', 6), ('Memphis', 'TN', 6), ('Atlanta', 'GA', 5),
+    ('Kansas City', 'MO', 5), ('Miami', 'FL', 4), ('New Orleans', 'LA', 4), ('Minneapolis', 'MN', 4),
+]
+
+# Every city above is in it; generated venues and artists are scattered around its points.
+GAZETTEER = GazetteerGeocoder({'GAZETTEER_PATH': GAZETTEER_PATH})
+
+# Relative popularity of the form's genres; the list itself comes from VenueForm.
+GENRE_WEIGHTS = {
+    'Rock n Roll': 14, 'Pop': 12, 'Hip-Hop': 11, 'Electronic': 9, 'Alternative': 8, 'Jazz': 7, 'R&B': 7,
+    'Country': 6, 'Punk': 5, 'Folk': 5, 'Blues': 4, 'Soul': 4, 'Heavy Metal': 4, 'Reggae': 3, 'Funk': 3,
+    'Classical': 3, 'Instrumental': 2, 'Other': 2, 'Musical Theatre': 1,
+}
+GENRES = [name for name, _ in VenueForm.genres.kwargs['choices']]
+
+ADJECTIVES = ['Blue', 'Golden', 'Velvet', 'Rusty', 'Electric', 'Silver', 'Crimson', 'Midnight', 'Lucky',
+              'Little', 'Grand', 'Hidden', 'Wild', 'Red', 'Black', 'Neon', 'Broken', 'Lonesome']
+VENUE_NOUNS = ['Room', 'Hall', 'Tavern', 'Lounge', 'Theatre', 'Garage', 'Cellar', 'Ballroom', 'Saloon',
+               'Club', 'Barn', 'Warehouse', 'Pavilion', 'Stage', 'Den', 'Social']
+BAND_NOUNS = ['Foxes', 'Rivers', 'Engines', 'Saints', 'Ghosts', 'Wolves', 'Pilots', 'Echoes', 'Strangers',
+              'Horses', 'Comets', 'Lanterns', 'Tigers', 'Ramblers']
+FIRST_NAMES = ['Ada', 'Ben', 'Cleo', 'Dev', 'Ella', 'Finn', 'Gia', 'Hal', 'Iris', 'Jude', 'Kai', 'Lena',
+               'Milo', 'Nina', 'Omar', 'Pia', 'Ray', 'Sade', 'Theo', 'Uma', 'Vic', 'Wren', 'Yara', 'Zeke']
+LAST_NAMES = ['Abbott', 'Banks', 'Cruz', 'Dalton', 'Ellis', 'Flores', 'Grant', 'Hayes', 'Ibarra', 'Jensen',
+              'Khan', 'Lowe', 'Moreno', 'Nash', 'Okafor', 'Price', 'Quinn', 'Reyes', 'Shaw', 'Tran']
+# Words that occur in generated names, for search benchmarks.
+SEARCH_TERMS = ADJECTIVES + VENUE_NOUNS + BAND_NOUNS + LAST_NAMES
+
+
+def zipf_weights(count, exponent=0.9):
+    """Cumulative weights of a Zipf-like popularity curve over `count` ranks, for random.choices."""
+    total, weights = 0.0, []
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** exponent
+        weights.append(total)
+    return weights
+
+
+def pick_genres(rng, genres, weights):
+    """One to three distinct genres, popular ones more often."""
+    return list(dict.fromkeys(rng.choices(genres, weights, k=rng.choice((1, 1, 2, 2, 3)))))
+
+
+def venue_row(rng, city, state):
+    name = 'The %s %s' % (rng.choice(ADJECTIVES), rng.choice(VENUE_NOUNS))
+    seeking = rng.random() < 0.3
+    return {
+        'name': name, 'city': city, 'state': state,
+        'address': '%d %s St' % (rng.randint(1, 9999), rng.choice(LAST_NAMES)),
+        'phone': '%010d' % rng.randint(2000000000, 9999999999),
+        'image_link': 'https://images.example.com/venues/%d.jpg' % rng.randint(1, 500),
+        'facebook_link': 'https://www.facebook.com/example', 'website_link': 'https://example.com',
+        'seeking_talent': seeking, 'seeking_description': 'Looking for local acts' if seeking else None,
+    }
+
+
+def artist_row(rng, city, state):
+    if rng.random() < 0.5:
+        name = 'The %s %s' % (rng.choice(ADJECTIVES), rng.choice(BAND_NOUNS))
+    else:
+        name = '%s %s' % (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES))
+    seeking = rng.random() < 0.3
+    return {
+        'name': name, 'city': city, 'state': state,
+        'phone': '%010d' % rng.randint(2000000000, 9999999999),
+        'image_link': 'https://images.example.com/artists/%d.jpg' % rng.randint(1, 500),
+        'facebook_link': 'https://www.facebook.com/example', 'website_link': 'https://example.com',
+        'seeking_venue': seeking, 'seeking_description': 'Touring this season' if seeking else None,
+    }
+
+
+def scatter(rng, point, spread=0.05):
+    """A point near `point`; 0.05 degrees is about 5 km."""
+    return point[0] + rng.gauss(0, spread), point[1] + rng.gauss(0, spread)
+
+
+def write_owners(engine, rng, model, genre_model, genre_key, make_row, count, batch_size):
+    """Writes `count` venues or artists, spread around their city centre, with their genre links;
+    returns their ids."""
+    table = model.__table__
+    cities = [(city, state) for city, state, _ in CITIES]
+    points = {(city, state): GAZETTEER.geocode(None, city, state) for city, state in cities}
+    city_weights = [weight for _, _, weight in CITIES]
+    genre_weights = [GENRE_WEIGHTS.get(name, 1) for name in GENRES]
+    all_ids = []
+    for batch in batched(range(count), batch_size):
+        with engine.begin() as connection:
+            ids = allocate_ids(connection, table, len(batch))
+            genres = genre_ids(connection, GENRES)
+            rows, genre_rows = [], []
+            for owner_id in ids:
+                city = rng.choices(cities, city_weights)[0]
+                latitude, longitude = scatter(rng, points[city])
+                rows.append(dict(make_row(rng, *city), id=owner_id, latitude=latitude, longitude=longitude))
+                genre_rows.extend([owner_id, genres[name]] for name in pick_genres(rng, GENRES, genre_weights))
+            columns = list(rows[0])
+            write_rows(connection, table, columns, [[row[column] for column in columns] for row in rows])
+            write_rows(connection, genre_model.__table__, [genre_key, 'genre_id'], genre_rows)
+        all_ids.extend(ids)
+    return all_ids
+
+
+def write_shows(engine, rng, venue_ids, artist_ids, count, now, batch_size, max_attempts=20):
+    """Books up to `count` non-overlapping shows; popular artists and venues get most of them.
+
+    Stops early once `max_attempts` draws per requested show have been spent, which only happens
+    when the catalog has too few artists and venues for that many shows.
+    """
+    artists, venues = list(artist_ids), list(venue_ids)
+    rng.shuffle(artists)
+    rng.shuffle(venues)
+    artist_weights, venue_weights = zipf_weights(len(artists)), zipf_weights(len(venues))
+    first_day = now.replace(hour=0, minute=0) - timedelta(days=PAST_DAYS)
+    slots = (PAST_DAYS + FUTURE_DAYS) * len(SHOW_SLOTS)
+
+    artist_slots, venue_slots = set(), set()
+    written = attempts = 0
+    while written < count and attempts < count * max_attempts:
+        rows = []
+        for _ in range(min(batch_size, count - written)):
+            attempts += 1
+            artist_id = rng.choices(artists, cum_weights=artist_weights)[0]
+            venue_id = rng.choices(venues, cum_weights=venue_weights)[0]
+            slot = rng.randrange(slots)
+            if (artist_id, slot) in artist_slots or (venue_id, slot) in venue_slots:
+                continue
+            artist_slots.add((artist_id, slot))
+            venue_slots.add((venue_id, slot))
+            start_time, minutes = SHOW_SLOTS[slot % len(SHOW_SLOTS)]
+            start = first_day + timedelta(days=slot // len(SHOW_SLOTS)) + start_time
+            rows.append([artist_id, venue_id, start, start + timedelta(minutes=rng.choice(minutes))])
+        with engine.begin() as connection:
+            write_rows(connection, Show.__table__, ['artist_id', 'venue_id', 'start_date_time', 'end_date_time'],
+                       rows)
+        written += len(rows)
+    return written
+
+
+def generate(engine, venues, artists, shows, seed=0, now=EPOCH, batch_size=20000, log=None):
+    """Fills an empty database with a reproducible catalog: the same seed and sizes give the same rows.
+
+    Writes go through the importer's bulk paths (COPY on Postgres), then the show counters and
+    collection versions are rebuilt in one pass.
+    """
+    rng = random.Random(seed)
+    started = time.monotonic()
+    venue_ids = write_owners(engine, rng, Venue, Venue_Genre, 'venue_id', venue_row, venues, batch_size)
+    artist_ids = write_owners(engine, rng, Artist, Artist_Genre, 'artist_id', artist_row, artists, batch_size)
+    if log:
+        log('%d venues, %d artists written (%.1fs)' % (venues, artists, time.monotonic() - started))
+    written = write_shows(engine, rng, venue_ids, artist_ids, shows, now, batch_size) if venue_ids and artist_ids else 0
+    if log:
+        log('%d shows written (%.1fs)' % (written, time.monotonic() - started))
+    with engine.begin() as connection:
+        for model in (Venue, Artist):
+            recount_where(connection, model, true(), now)
+        touch_versions(connection, ['venues', 'artists', 'shows'])
+    if log:
+        log('counters rebuilt (%.1fs)' % (time.monotonic() - started))
+    return {'venues': len(venue_ids), 'artists': len(artist_ids), 'shows': written}
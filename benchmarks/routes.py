@@ -0,0 +1,143 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from sqlalchemy import insert
+
+from benchmarks.catalog import CITIES, EPOCH, FUTURE_DAYS, GAZETTEER, GENRES, PAST_DAYS, SEARCH_TERMS, scatter
+from models import db, Venue
+
+# ----------------------------------------------------------------------------#
+# Route scenarios.
+# ----------------------------------------------------------------------------#
+
+# name: key in the results; request(rng, catalog, i) -> (url, test client kwargs);
+# setup(app, count), when given, runs untimed before the scenario and its result is passed as `catalog['setup']`.
+Scenario = namedtuple('Scenario', 'name endpoint method request setup')
+
+
+def scenario(endpoint, method, request, name=None, setup=None):
+    return Scenario(name or '%s %s' % (method, endpoint), endpoint, method, request, setup)
+
+
+def some_venue(rng, catalog):
+    return rng.randint(1, catalog['venues'])
+
+
+def some_artist(rng, catalog):
+    return rng.randint(1, catalog['artists'])
+
+
+def venue_form(rng, catalog, i):
+    return {
+        'name': 'Benchmark Venue %d' % i, 'city': 'Austin', 'state': 'TX', 'address': '%d Congress Ave' % i,
+        'phone': '5125550100', 'genres': rng.sample(GENRES, 2), 'image_link': 'https://example.com/v.jpg',
+        'facebook_link': 'https://www.facebook.com/example', 'website_link': 'https://example.com',
+        'seeking_description': '',
+    }
+
+
+def artist_form(rng, catalog, i):
+    return {
+        'name': 'Benchmark Artist %d' % i, 'city': 'Austin', 'state': 'TX', 'phone': '5125550100',
+        'genres': rng.sample(GENRES, 2), 'image_link': 'https://example.com/a.jpg',
+        'facebook_link': 'https://www.facebook.com/example', 'website_link': 'https://example.com',
+        'seeking_description': '',
+    }
+
+
+def booking(rng, catalog, i, offset=0):
+    # Half-hour morning shows, before the catalog's first evening slot, so bookings never collide with generated ones.
+    start = EPOCH.replace(hour=9) + timedelta(days=1 + (i + offset) % FUTURE_DAYS,
+                                              minutes=7 + (i + offset) // FUTURE_DAYS)
+    return {'artist_id': str(some_artist(rng, catalog)), 'venue_id': str(some_venue(rng, catalog)),
+            'start_time': start.strftime('%Y-%m-%d %H:%M:%S'), 'duration': '30'}
+
+
+def availability_query(rng, catalog, i):
+    start = EPOCH + timedelta(days=rng.randrange(FUTURE_DAYS), hours=rng.choice((5, 7, 8)))
+    return '?start=%s&duration=%d' % (start.strftime('%Y-%m-%dT%H:%M'), rng.choice((60, 120)))
+
+
+def somewhere(rng):
+    """?lat=&lng= near one of the catalog's cities, as if sent from a phone there."""
+    city, state, _ = rng.choice(CITIES)
+    latitude, longitude = scatter(rng, GAZETTEER.geocode(None, city, state), 0.1)
+    return 'lat=%.5f&lng=%.5f' % (latitude, longitude)
+
+
+def calendar_range(rng, days):
+    start = EPOCH.date() + timedelta(days=rng.randrange(-PAST_DAYS, FUTURE_DAYS - days))
+    return 'from=%s&to=%s' % (start.isoformat(), (start + timedelta(days=days)).isoformat())
+
+
+def throwaway_venues(app, count):
+    """Venues for the delete scenario to remove, so it never eats into the generated catalog."""
+    with app.app_context():
+        table = Venue.__table__
+        with db.engine.begin() as connection:
+            connection.execute(insert(table), [{'name': 'Delete me %d' % i, 'city': 'Austin', 'state': 'TX'}
+                                               for i in range(count)])
+            return [row[0] for row in connection.execute(
+                table.select().with_only_columns(table.c.id).where(table.c.name.like('Delete me %'))
+                .order_by(table.c.id.desc()).limit(count))]
+
+
+# Reads first, so every read sees the generated catalog; writes last; deletes at the very end.
+SCENARIOS = [
+    scenario('main.index', 'GET', lambda rng, catalog, i: ('/', {})),
+    scenario('main.venues', 'GET', lambda rng, catalog, i: ('/venues', {})),
+    scenario('main.venues', 'GET', lambda rng, catalog, i: ('/venues?genre=' + rng.choice(GENRES), {}),
+             name='GET main.venues?genre'),
+    scenario('main.nearby_venues_page', 'GET', lambda rng, catalog, i: ('/venues/nearby?' + somewhere(rng), {})),
+    scenario('main.show_venue', 'GET', lambda rng, catalog, i: ('/venues/%d' % some_venue(rng, catalog), {})),
+    scenario('main.artists', 'GET', lambda rng, catalog, i: ('/artists', {})),
+    scenario('main.show_artist', 'GET', lambda rng, catalog, i: ('/artists/%d' % some_artist(rng, catalog), {})),
+    scenario('main.shows', 'GET', lambda rng, catalog, i: ('/shows', {})),
+    scenario('main.export_shows_feed', 'GET', lambda rng, catalog, i: (
+        '/shows/export?format=jsonl&since=' + (EPOCH + timedelta(days=FUTURE_DAYS - 30)).strftime('%Y-%m-%d'), {})),
+    scenario('calendar.all_shows', 'GET', lambda rng, catalog, i: ('/calendar?' + calendar_range(rng, 7), {})),
+    scenario('calendar.venue', 'GET', lambda rng, catalog, i: (
+        '/venues/%d/calendar.ics?%s' % (some_venue(rng, catalog), calendar_range(rng, 90)), {})),
+    scenario('calendar.artist', 'GET', lambda rng, catalog, i: (
+        '/artists/%d/calendar?%s' % (some_artist(rng, catalog), calendar_range(rng, 90)), {})),
+    scenario('main.search_venues', 'POST', lambda rng, catalog, i: (
+        '/venues/search', {'data': {'search_term': rng.choice(SEARCH_TERMS)}})),
+    scenario('main.search_artists', 'POST', lambda rng, catalog, i: (
+        '/artists/search', {'data': {'search_term': rng.choice(SEARCH_TERMS)}})),
+    scenario('main.search_shows', 'POST', lambda rng, catalog, i: (
+        '/shows/search', {'data': {'search_term': rng.choice(SEARCH_TERMS)}})),
+    scenario('main.create_venue_form', 'GET', lambda rng, catalog, i: ('/venues/create', {})),
+    scenario('main.create_artist_form', 'GET', lambda rng, catalog, i: ('/artists/create', {})),
+    scenario('main.edit_venue', 'GET', lambda rng, catalog, i: ('/venues/%d/edit' % some_venue(rng, catalog), {})),
+    scenario('main.edit_artist', 'GET', lambda rng, catalog, i: ('/artists/%d/edit' % some_artist(rng, catalog), {})),
+    scenario('main.create_shows', 'GET', lambda rng, catalog, i: ('/shows/create', {})),
+    scenario('main.create_shows_batch', 'GET', lambda rng, catalog, i: ('/shows/batch', {})),
+    scenario('api.venues', 'GET', lambda rng, catalog, i: ('/api/v1/venues', {})),
+    scenario('api.venues_nearby', 'GET', lambda rng, catalog, i: (
+        '/api/v1/venues/nearby?radius=10&' + somewhere(rng), {})),
+    scenario('api.venue', 'GET', lambda rng, catalog, i: ('/api/v1/venues/%d' % some_venue(rng, catalog), {})),
+    scenario('api.artists', 'GET', lambda rng, catalog, i: ('/api/v1/artists', {})),
+    scenario('api.artist', 'GET', lambda rng, catalog, i: ('/api/v1/artists/%d' % some_artist(rng, catalog), {})),
+    scenario('api.venue_availability', 'GET', lambda rng, catalog, i: (
+        '/api/v1/venues/%d/availability' % some_venue(rng, catalog) + availability_query(rng, catalog, i), {})),
+    scenario('api.artist_availability', 'GET', lambda rng, catalog, i: (
+        '/api/v1/artists/%d/availability' % some_artist(rng, catalog) + availability_query(rng, catalog, i), {})),
+    scenario('api.shows', 'GET', lambda rng, catalog, i: ('/api/v1/shows', {})),
+    scenario('api.search', 'GET', lambda rng, catalog, i: (
+        '/api/v1/search?type=venues&q=' + rng.choice(SEARCH_TERMS), {})),
+
+    scenario('main.create_venue_submission', 'POST', lambda rng, catalog, i: (
+        '/venues/create', {'data': venue_form(rng, catalog, i)})),
+    scenario('main.create_artist_submission', 'POST', lambda rng, catalog, i: (
+        '/artists/create', {'data': artist_form(rng, catalog, i)})),
+    scenario('main.edit_venue_submission', 'POST', lambda rng, catalog, i: (
+        '/venues/%d/edit' % some_venue(rng, catalog), {'data': venue_form(rng, catalog, i)})),
+    scenario('main.edit_artist_submission', 'POST', lambda rng, catalog, i: (
+        '/artists/%d/edit' % some_artist(rng, catalog), {'data': artist_form(rng, catalog, i)})),
+    scenario('main.create_show_submission', 'POST', lambda rng, catalog, i: (
+        '/shows/create', {'data': booking(rng, catalog, i)})),
+    scenario('main.create_shows_batch_submission', 'POST', lambda rng, catalog, i: (
+        '/shows/batch', {'json': [booking(rng, catalog, i * 10 + k, offset=100000) for k in range(10)]})),
+    scenario('main.delete_venue', 'POST', lambda rng, catalog, i: ('/venues/%d' % catalog['setup'][i], {}),
+             setup=throwaway_venues),
+]
@@ -0,0 +1,175 @@
+import math
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import create_app
+from clock import FixedClock, init_clock
+from models import db, Venue, Artist
+from benchmarks.catalog import EPOCH
+from benchmarks.routes import SCENARIOS
+
+# ----------------------------------------------------------------------------#
+# Route benchmarks.
+# ----------------------------------------------------------------------------#
+
+
+class BenchmarkConfig(object):
+    """Overlay for the benchmark app; create_benchmark_app adds the database URI."""
+    DEBUG = False
+    TESTING = False
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    CACHE_REDIS_URL = None
+    # Query counts are measured here; keep the app from logging or raising about them.
+    SQL_QUERY_BUDGET = None
+    SLOW_QUERY_MS = None
+
+
+class QueryCounter(object):
+    """Counts statements on every engine while attached."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self.on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+
+def create_benchmark_app(database_uri):
+    app = create_app(type('BenchmarkConfig', (BenchmarkConfig,), {'SQLALCHEMY_DATABASE_URI': database_uri}))
+    init_clock(app, FixedClock(EPOCH))
+    app.logger.getChild('requests').setLevel('WARNING')
+    return app
+
+
+def catalog_size(app):
+    with app.app_context():
+        return {'venues': db.session.query(db.func.max(Venue.id)).scalar() or 0,
+                'artists': db.session.query(db.func.max(Artist.id)).scalar() or 0}
+
+
+def clear_caches(app):
+    """Drops the listing pages and show partitions, so every request runs its queries.
+
+    The in-memory search index stays: it is only rebuilt after writes, which the write scenarios cover.
+    """
+    app.extensions['page_cache'].invalidate(['venues', 'artists', 'shows'])
+    app.extensions['show_partitions'].invalidate()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def send(client, method, url, kwargs):
+    response = client.open(url, method=method, **kwargs)
+    # Streamed responses (the export) only do their work as the body is read.
+    response.get_data()
+    response.close()
+    return response.status_code
+
+
+def run_scenario(app, client, scenario, catalog, requests, cold, seed, memory_samples=5):
+    """Times `requests` calls of one scenario after a warm-up call; returns its result record."""
+    rng = random.Random('%s:%s' % (seed, scenario.name))
+    catalog = dict(catalog)
+    if scenario.setup is not None:
+        catalog['setup'] = scenario.setup(app, requests + 1 + memory_samples)
+
+    def call(i):
+        url, kwargs = scenario.request(rng, catalog, i)
+        if cold:
+            clear_caches(app)
+        with QueryCounter() as queries:
+            started = time.perf_counter()
+            status = send(client, scenario.method, url, kwargs)
+            elapsed = time.perf_counter() - started
+        return status, elapsed, queries.count
+
+    call(0)
+    timings, statuses, query_counts = [], {}, []
+    for i in range(1, requests + 1):
+        status, elapsed, count = call(i)
+        timings.append(elapsed * 1000)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        query_counts.append(count)
+
+    # Allocation tracing slows requests down, so memory is sampled in a separate, untimed pass.
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(requests + 1, requests + 1 + memory_samples):
+        call(i)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'endpoint': scenario.endpoint,
+        'method': scenario.method,
+        'requests': requests,
+        'status': statuses,
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'mean_ms': round(sum(timings) / len(timings), 2),
+        'queries_per_request': round(sum(query_counts) / len(query_counts), 2),
+        'max_queries': max(query_counts),
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def run(app, requests=50, cold=True, seed=0, only=None, log=None):
+    """Drives every scenario through the Flask test client; returns {scenario name: result}."""
+    catalog = catalog_size(app)
+    client = app.test_client()
+    results = {}
+    for scenario in SCENARIOS:
+        if only and not any(pattern in scenario.name for pattern in only):
+            continue
+        results[scenario.name] = run_scenario(app, client, scenario, catalog, requests, cold, seed)
+        if log:
+            result = results[scenario.name]
+            log('%-45s p50 %8.2fms  p95 %8.2fms  %6.1f queries  %s' % (
+                scenario.name, result['p50_ms'], result['p95_ms'], result['queries_per_request'], result['status']))
+    return results
+
+
+def uncovered_endpoints(app):
+    """Routes no scenario exercises; add one to routes.SCENARIOS when adding a route."""
+    covered = {scenario.endpoint for scenario in SCENARIOS}
+    return sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                  if rule.endpoint != 'static' and rule.endpoint not in covered)
+
+
+def max_rss_kb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def compare(results, baseline, tolerance=0.25, min_ms=1.0):
+    """Regressions of `results` against a previous run's output: slower p95 or more queries per request."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get('routes', {}).get(name)
+        if before is None:
+            continue
+        if result['queries_per_request'] > before['queries_per_request'] + 0.01:
+            regressions.append('%s: %.2f queries per request, was %.2f' % (
+                name, result['queries_per_request'], before['queries_per_request']))
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance) and result['p95_ms'] - before['p95_ms'] >= min_ms:
+            regressions.append('%s: p95 %.2fms, was %.2fms' % (name, result['p95_ms'], before['p95_ms']))
+    return regressions
@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+
+import dateutil.parser
+from flask import current_app
+
+from availability import BookingIndex
+from counters import recount
+from models import db, Venue, Artist, Show, DEFAULT_SHOW_DURATION, MAX_SHOW_DURATION
+from versions import touch_versions
+
+# ----------------------------------------------------------------------------#
+# Show booking.
+# ----------------------------------------------------------------------------#
+
+
+def parse_start(value):
+    """A datetime from a datetime or a string; raises ValueError when it isn't one."""
+    if not isinstance(value, datetime):
+        try:
+            value = dateutil.parser.parse(value)
+        except (TypeError, OverflowError) as error:
+            raise ValueError(str(error))
+    if value.tzinfo is not None:
+        # start_date_time is stored naive, in server local time like datetime.now().
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def parse_duration(value):
+    """A timedelta from a length in minutes, DEFAULT_SHOW_DURATION when blank; raises ValueError."""
+    if value is None or value == '':
+        return DEFAULT_SHOW_DURATION
+    duration = timedelta(minutes=int(value))
+    if not timedelta(0) < duration <= MAX_SHOW_DURATION:
+        raise ValueError('duration out of range')
+    return duration
+
+
+def parse_booking(booking):
+    """Returns ((artist_id, venue_id, start, end), errors) for one requested booking."""
+    errors = []
+    values = []
+    for field in ('artist_id', 'venue_id'):
+        try:
+            values.append(int(booking.get(field)))
+        except (TypeError, ValueError):
+            errors.append('Invalid ' + field.replace('_id', '').title() + ' ID')
+
+    start = duration = None
+    try:
+        start = parse_start(booking.get('start_time'))
+    except ValueError:
+        errors.append('Invalid start time')
+    try:
+        duration = parse_duration(booking.get('duration'))
+    except (TypeError, ValueError):
+        errors.append('Duration must be between 1 and %d minutes' % (MAX_SHOW_DURATION.total_seconds() // 60))
+    if errors:
+        return None, errors
+    return tuple(values) + (start, start + duration), errors
+
+
+def book_shows(bookings):
+    """Validates and inserts many bookings at once.
+
+    Artist and venue ids are checked with one IN query each, and the shows that could overlap the
+    batch are loaded with one more into a BookingIndex; every valid row goes in with a single
+    INSERT. Returns one result per booking, in order:
+    {"status": "created" | "invalid" | "duplicate" | "conflict", ...}.
+    """
+    parsed = [parse_booking(booking) for booking in bookings]
+    rows = [row for row, _ in parsed if row is not None]
+
+    artist_ids = {row[0] for row in rows}
+    venue_ids = {row[1] for row in rows}
+    known_artists = {row[0] for row in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))} \
+        if artist_ids else set()
+    known_venues = {row[0] for row in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))} \
+        if venue_ids else set()
+    index = BookingIndex(rows)
+
+    results, inserts = [], []
+    for row, errors in parsed:
+        if row is not None:
+            artist_id, venue_id, start, end = row
+            if artist_id not in known_artists:
+                errors.append('Invalid Artist ID')
+            if venue_id not in known_venues:
+                errors.append('Invalid Venue ID')
+        if errors:
+            results.append({"status": "invalid", "errors": errors})
+            continue
+        conflicts = index.conflicts(*row)
+        if (artist_id, venue_id, start) in index.booked:
+            results.append({"status": "duplicate", "errors": ['Show is already listed']})
+        elif conflicts['artist'] or conflicts['venue']:
+            errors = []
+            if conflicts['artist']:
+                errors.append('Artist is already booked at this time')
+            if conflicts['venue']:
+                errors.append('Venue is already booked at this time')
+            results.append({"status": "conflict", "errors": errors})
+        else:
+            # Later rows in the same batch are checked against this one too.
+            index.add(*row)
+            result = {"status": "created", "artist_id": artist_id, "venue_id": venue_id,
+                      "start_time": start.isoformat(), "end_time": end.isoformat()}
+            results.append(result)
+            inserts.append((result, row))
+
+    if inserts:
+        statement = Show.__table__.insert().values([
+            {"artist_id": artist_id, "venue_id": venue_id, "start_date_time": start, "end_date_time": end}
+            for _, (artist_id, venue_id, start, end) in inserts
+        ])
+        if db.engine.dialect.full_returning:
+            ids = [show_id for show_id, in db.session.execute(statement.returning(Show.id))]
+            for (result, _), show_id in zip(inserts, ids):
+                result["id"] = show_id
+        else:
+            db.session.execute(statement)
+        venue_ids, artist_ids = [row[1] for _, row in inserts], [row[0] for _, row in inserts]
+        recount(db.session, venue_ids, artist_ids)
+        touch_versions(db.session, ['shows'], venue_ids, artist_ids)
+        db.session.commit()
+        invalidate_bookings([row for _, row in inserts])
+    return results
+
+
+def invalidate_bookings(rows):
+    """Core inserts skip the session's flush events, so drop the caches they would have."""
+    extensions = current_app.extensions
+    if 'page_cache' in extensions:
+        extensions['page_cache'].invalidate(['venues', 'shows'])
+    if 'show_partitions' in extensions:
+        keys = {('artist', artist_id) for artist_id, _, *_ in rows} | {('venue', venue_id) for _, venue_id, *_ in rows}
+        extensions['show_partitions'].invalidate(keys)
@@ -0,0 +1,157 @@
+import pickle
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from flask import current_app, request, session, render_template
+from sqlalchemy import event
+
+from models import db, Venue, Venue_Genre, Artist, Artist_Genre, Show
+from replicas import primary
+from versions import collection_versions
+
+# ----------------------------------------------------------------------------#
+# Page cache.
+# ----------------------------------------------------------------------------#
+
+# Listing pages that read each model; a commit touching the model bumps their generation.
+DEPENDENT_PAGES = {
+    Venue: ('venues', 'shows'),
+    Venue_Genre: ('venues',),
+    Artist: ('artists', 'shows'),
+    Artist_Genre: ('artists',),
+    Show: ('venues', 'shows'),
+}
+
+# Collections each listing page reads. Their versions are part of the page's key, so writes made
+# by other workers or `flask import`, which this process's generations never hear of, miss it too.
+PAGE_COLLECTIONS = {
+    'venues': ('venues', 'shows'),
+    'artists': ('artists',),
+    'shows': ('venues', 'artists', 'shows'),
+}
+
+
+class LRUCache(object):
+    """In-process LRU with per-key TTL.
+
+    Implements the subset of the redis-py client used by PageCache, so it can stand in for Redis.
+    Counters are kept apart from the LRU so a generation number is never evicted.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.lock = Lock()
+
+    def get(self, name):
+        with self.lock:
+            if name in self.counters:
+                return self.counters[name]
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self.entries[name]
+                return None
+            self.entries.move_to_end(name)
+            return value
+
+    def set(self, name, value, ex=None):
+        with self.lock:
+            self.entries[name] = (value, time.monotonic() + ex if ex else None)
+            self.entries.move_to_end(name)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return True
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            return self.counters[name]
+
+    def delete(self, *names):
+        with self.lock:
+            return sum((self.entries.pop(name, None) or self.counters.pop(name, None)) is not None
+                       for name in names)
+
+
+class PageCache(object):
+    """Read-through cache of listing view models (and optionally rendered HTML).
+
+    Keys carry a per-page generation number, so invalidating a page is a single INCR
+    that every worker sharing the store sees, and the versions of the collections the page
+    reads, so a write any process commits retires it on the next request.
+    """
+
+    def __init__(self, store, ttl=60, prefix='fyyur:'):
+        self.store = store
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def generation(self, page):
+        return int(self.store.get(self.prefix + 'gen:' + page) or 0)
+
+    def versions(self, page):
+        names = PAGE_COLLECTIONS.get(page)
+        if not names:
+            return ()
+        return tuple(sorted((row.name, row.version) for row in db.session.execute(collection_versions(names))))
+
+    def get_or_build(self, page, params, build):
+        key = '%s%s:%d:%r:%r' % (self.prefix, page, self.generation(page), self.versions(page), params)
+        raw = self.store.get(key)
+        if raw is not None:
+            return pickle.loads(raw)
+        # An entry outlives replica lag, so it's built from the primary.
+        with primary():
+            value = build()
+        self.store.set(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), ex=self.ttl)
+        return value
+
+    def invalidate(self, pages):
+        for page in pages:
+            self.store.incr(self.prefix + 'gen:' + page)
+
+
+def init_cache(app):
+    url = app.config.get('CACHE_REDIS_URL')
+    if url:
+        import redis
+        store = redis.Redis.from_url(url)
+    else:
+        store = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 512))
+    app.extensions['page_cache'] = PageCache(store, ttl=app.config.get('CACHE_TTL', 60))
+    return app.extensions['page_cache']
+
+
+def render_cached(page, template, build):
+    """Renders `template` with the context returned by `build`, cached per page and query string."""
+    cache = current_app.extensions['page_cache']
+    params = tuple(sorted(request.args.items(multi=True)))
+
+    # Pending flash messages are rendered into the layout, so those responses can't be shared.
+    if current_app.config.get('CACHE_RENDERED_PAGES') and '_flashes' not in session:
+        return cache.get_or_build(page, ('html', params), lambda: render_template(template, **build()))
+    return render_template(template, **cache.get_or_build(page, ('context', params), build))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_page_changes(session, flush_context):
+    pages = session.info.setdefault('stale_pages', set())
+    for obj in session.new | session.dirty | session.deleted:
+        pages.update(DEPENDENT_PAGES.get(type(obj), ()))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_pages(session):
+    pages = session.info.pop('stale_pages', None)
+    if pages and 'page_cache' in current_app.extensions:
+        current_app.extensions['page_cache'].invalidate(pages)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_page_changes(session):
+    session.info.pop('stale_pages', None)
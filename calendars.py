@@ -0,0 +1,167 @@
+import json
+from datetime import datetime, time, timedelta, timezone
+
+import dateutil.parser
+from flask import Blueprint, Response, abort, current_app, request, stream_with_context, url_for
+
+from api import precondition, to_json, validated
+from clock import get_now
+from models import db, Venue, Artist, Show, MAX_SHOW_DURATION
+from versions import collection_validator, entity_validator, make_validator
+
+# ----------------------------------------------------------------------------#
+# Calendars.
+# ----------------------------------------------------------------------------#
+
+calendar = Blueprint('calendar', __name__)
+
+ICAL_MIMETYPE = 'text/calendar'
+
+
+def parse_range():
+    """[from, to) from ?from=&to=, as naive datetimes; defaults to CALENDAR_PAST_DAYS before today
+    through CALENDAR_FUTURE_DAYS after it. Aborts with 400 on a bad or too long range."""
+    config = current_app.config
+    today = datetime.combine(get_now().date(), time())
+    try:
+        start = dateutil.parser.parse(request.args['from']) if request.args.get('from') else \
+            today - timedelta(days=config['CALENDAR_PAST_DAYS'])
+        end = dateutil.parser.parse(request.args['to']) if request.args.get('to') else \
+            today + timedelta(days=config['CALENDAR_FUTURE_DAYS'])
+    except (ValueError, OverflowError):
+        abort(400)
+    start, end = (value.astimezone().replace(tzinfo=None) if value.tzinfo else value for value in (start, end))
+    if not start < end or end - start > timedelta(days=config['CALENDAR_MAX_DAYS']):
+        abort(400)
+    return start, end
+
+
+def calendar_shows(criteria, start, end, batch_size=1000):
+    """Shows overlapping [start, end), oldest first, streamed from a server-side cursor.
+
+    The start_date_time bounds are what the (owner, start_date_time) and start_date_time indexes
+    serve; a show can only overlap `start` if it began less than MAX_SHOW_DURATION before it.
+    """
+    query = db.session.query(Show.id, Show.start_date_time, Show.end_date_time, Show.artist_id,
+                             Artist.name.label('artist_name'), Show.venue_id, Venue.name.label('venue_name'),
+                             Venue.address, Venue.city, Venue.state) \
+        .join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id) \
+        .filter(Show.start_date_time > start - MAX_SHOW_DURATION, Show.start_date_time < end,
+                Show.end_date_time > start, *criteria) \
+        .order_by(Show.start_date_time, Show.id)
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+def to_record(row):
+    return {
+        "id": row.id,
+        "start_time": row.start_date_time,
+        "end_time": row.end_date_time,
+        "artist_id": row.artist_id,
+        "artist_name": row.artist_name,
+        "venue_id": row.venue_id,
+        "venue_name": row.venue_name,
+    }
+
+
+def serialize_json(rows, start, end):
+    """Yields the calendar as one JSON object, a show at a time."""
+    yield '{"from": %s, "to": %s, "shows": [' % (json.dumps(start.isoformat()), json.dumps(end.isoformat()))
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps(to_json(to_record(row)))
+        separator = ', '
+    yield ']}\n'
+
+
+def ical_text(value):
+    """Escapes a TEXT value (RFC 5545, 3.3.11); any line break becomes one \\n."""
+    value = value.replace('\r\n', '\n').replace('\r', '\n')
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def ical_time(value):
+    # start_date_time is naive server local time, like datetime.now(); feeds carry it as UTC.
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def ical_line(name, value):
+    """One content line, folded to at most 75 octets per line (RFC 5545, 3.1)."""
+    line = (name + ':' + value).encode('utf-8')
+    parts = []
+    while len(line) > (74 if parts else 75):
+        # Continuation lines start with a space.
+        cut = 74 if parts else 75
+        # Don't split a multi-byte character.
+        while line[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(line[:cut].decode('utf-8'))
+        line = line[cut:]
+    parts.append(line.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def serialize_ical(rows, name, stamp, host):
+    """Yields a VCALENDAR a VEVENT at a time. DTSTAMP is the calendar's last change, so an
+    unchanged ETag always means an unchanged body."""
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Fyyur//Calendar//EN\r\nCALSCALE:GREGORIAN\r\n'
+    yield ical_line('X-WR-CALNAME', ical_text(name))
+    stamp = stamp.strftime('%Y%m%dT%H%M%SZ')
+    for row in rows:
+        location = ', '.join(part for part in (row.venue_name, row.address, row.city, row.state) if part)
+        yield ''.join([
+            'BEGIN:VEVENT\r\n',
+            ical_line('UID', 'show-%d@%s' % (row.id, host)),
+            ical_line('DTSTAMP', stamp),
+            ical_line('DTSTART', ical_time(row.start_date_time)),
+            ical_line('DTEND', ical_time(row.end_date_time)),
+            ical_line('SUMMARY', ical_text('%s at %s' % (row.artist_name, row.venue_name))),
+            ical_line('LOCATION', ical_text(location)),
+            ical_line('URL', url_for('main.show_venue', venue_id=row.venue_id, _external=True)),
+            'END:VEVENT\r\n',
+        ])
+    yield 'END:VCALENDAR\r\n'
+
+
+def calendar_response(validator, criteria, name, ical):
+    """Streams the calendar for ?from=&to=; a client holding the current ETag gets a 304 for one
+    versions query, without the shows being read."""
+    start, end = parse_range()
+    if validator is not None:
+        validator = make_validator((validator[0], start, end, ical), [validator[1]])
+    response = precondition(validator)
+    if response is not None:
+        return response
+
+    rows = calendar_shows(criteria, start, end)
+    if ical:
+        stamp = validator[1] or datetime.now(timezone.utc)
+        body = serialize_ical(rows, name(), stamp, request.host.split(':')[0])
+        response = Response(stream_with_context(body), mimetype=ICAL_MIMETYPE)
+    else:
+        response = Response(stream_with_context(serialize_json(rows, start, end)), mimetype='application/json')
+    return validated(response, validator)
+
+
+def entity_name(model, entity_id):
+    return lambda: 'Fyyur: ' + db.session.query(model.name).filter(model.id == entity_id).scalar()
+
+
+@calendar.route('/calendar', defaults={'fmt': 'json'})
+@calendar.route('/calendar.<any(ics):fmt>')
+def all_shows(fmt):
+    return calendar_response(collection_validator(['venues', 'artists', 'shows']), [], lambda: 'Fyyur', fmt == 'ics')
+
+
+@calendar.route('/venues/<int:venue_id>/calendar', defaults={'fmt': 'json'})
+@calendar.route('/venues/<int:venue_id>/calendar.<any(ics):fmt>')
+def venue(venue_id, fmt):
+    return calendar_response(entity_validator(Venue, venue_id), [Show.venue_id == venue_id],
+                             entity_name(Venue, venue_id), fmt == 'ics')
+
+
+@calendar.route('/artists/<int:artist_id>/calendar', defaults={'fmt': 'json'})
+@calendar.route('/artists/<int:artist_id>/calendar.<any(ics):fmt>')
+def artist(artist_id, fmt):
+    return calendar_response(entity_validator(Artist, artist_id), [Show.artist_id == artist_id],
+                             entity_name(Artist, artist_id), fmt == 'ics')
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from flask import current_app, g
+
+# ----------------------------------------------------------------------------#
+# Clock.
+# ----------------------------------------------------------------------------#
+
+
+class Clock(object):
+    """Supplies the reference time that splits shows into upcoming and past."""
+
+    def now(self):
+        return datetime.now()
+
+
+class FixedClock(Clock):
+    """Always returns the same instant; install it with init_clock(app, FixedClock(...)) in tests."""
+
+    def __init__(self, instant):
+        self.instant = instant
+
+    def now(self):
+        return self.instant
+
+
+def init_clock(app, clock=None):
+    app.extensions['clock'] = clock or Clock()
+    return app.extensions['clock']
+
+
+def get_now():
+    """Returns the reference time, read once per request (or app context) so every query on a page agrees."""
+    if 'now' not in g:
+        g.now = current_app.extensions['clock'].now()
+    return g.now
@@ -0,0 +1,106 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, inspect, or_, select
+
+from clock import get_now
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Show counters.
+# ----------------------------------------------------------------------------#
+
+# model -> the Show column that points at it
+OWNERS = {
+    Venue: 'venue_id',
+    Artist: 'artist_id',
+}
+
+
+def counter_values(model, now):
+    """Correlated subqueries computing each counter column from the shows table."""
+    table, shows = model.__table__, Show.__table__
+    owned = shows.c[OWNERS[model]] == table.c.id
+    upcoming = shows.c.start_date_time > now
+    return {
+        'upcoming_show_count': select(func.count()).where(owned, upcoming).scalar_subquery(),
+        'past_show_count': select(func.count()).where(owned, ~upcoming).scalar_subquery(),
+        'next_show_at': select(func.min(shows.c.start_date_time)).where(owned, upcoming).scalar_subquery(),
+    }
+
+
+def recount_where(bind, model, criterion, now=None):
+    table = model.__table__
+    return bind.execute(table.update().where(criterion).values(counter_values(model, now or get_now()))).rowcount
+
+
+def recount(bind, venue_ids=(), artist_ids=()):
+    """Recomputes the counters of the given venues and artists, inside the caller's transaction."""
+    for model, ids in ((Venue, venue_ids), (Artist, artist_ids)):
+        ids = {entity_id for entity_id in ids if entity_id is not None}
+        if ids:
+            recount_where(bind, model, model.__table__.c.id.in_(ids))
+
+
+def find_drift(bind, model, now=None):
+    """Ids whose stored counters differ from a fresh count."""
+    table = model.__table__
+    computed = counter_values(model, now or get_now())
+    return [row[0] for row in bind.execute(select(table.c.id).where(or_(
+        table.c.upcoming_show_count != computed['upcoming_show_count'],
+        table.c.past_show_count != computed['past_show_count'],
+        table.c.next_show_at.is_distinct_from(computed['next_show_at']),
+    )).order_by(table.c.id))]
+
+
+def _owner_ids(obj, attribute):
+    return [obj_id for obj_id in [getattr(obj, attribute)] + list(inspect(obj).attrs[attribute].history.deleted)
+            if obj_id is not None]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _track_show_owners(session, flush_context, instances):
+    owners = session.info.setdefault('recount', {Venue: set(), Artist: set()})
+    deleted_venues = []
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Show):
+            for model, attribute in OWNERS.items():
+                owners[model].update(_owner_ids(obj, attribute))
+        elif isinstance(obj, Venue) and obj in session.deleted and obj.id is not None:
+            deleted_venues.append(obj.id)
+
+    # The database cascades a venue's shows away without the ORM seeing them.
+    if deleted_venues:
+        owners[Artist].update(row[0] for row in session.query(Show.artist_id).filter(
+            Show.venue_id.in_(deleted_venues)).distinct())
+
+
+@event.listens_for(db.session, 'after_flush')
+def _recount_show_owners(session, flush_context):
+    owners = session.info.pop('recount', None)
+    if owners:
+        recount(session, owners[Venue], owners[Artist])
+
+
+@click.command('recount')
+@click.option('--due', is_flag=True, help='Only recount rows whose next show has started; run this periodically.')
+@click.option('--dry-run', is_flag=True, help='Report drift without repairing it.')
+@with_appcontext
+def recount_command(due, dry_run):
+    """Check the denormalized show counters on venues and artists and repair any drift.
+
+    Counters stay exact until a row's next_show_at passes, so the periodic sweep (--due) only
+    touches those rows; readers recount them on the fly in the meantime.
+    """
+    with db.engine.begin() as connection:
+        for model in OWNERS:
+            table = model.__table__
+            if due:
+                ids = [row[0] for row in connection.execute(
+                    select(table.c.id).where(table.c.next_show_at <= get_now()).order_by(table.c.id))]
+                label = 'due'
+            else:
+                ids = find_drift(connection, model)
+                label = 'drifted'
+            click.echo('%s: %d %s%s' % (table.name, len(ids), label, ' %s' % ids[:20] if ids else ''))
+            if ids and not dry_run:
+                recount_where(connection, model, table.c.id.in_(ids))
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+
+import click
+import dateutil.parser
+from flask.cli import with_appcontext
+
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Bulk export.
+# ----------------------------------------------------------------------------#
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/jsonl',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_COLUMNS = ['start_date_time', 'end_date_time', 'artist_id', 'artist_name', 'venue_id', 'venue_name']
+
+
+def export_shows(since=None, batch_size=1000):
+    """Shows joined with artist and venue names, streamed from a server-side cursor.
+
+    `since` is inclusive, so an incremental export may repeat rows starting exactly at it;
+    (artist_id, venue_id, start_date_time) identifies a row.
+    """
+    query = db.session.query(Show.start_date_time, Show.end_date_time, Show.artist_id, Artist.name.label('artist_name'),
+                             Show.venue_id, Venue.name.label('venue_name')) \
+        .join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id) \
+        .order_by(Show.start_date_time, Show.artist_id, Show.venue_id)
+    if since is not None:
+        query = query.filter(Show.start_date_time >= since)
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+
+def serialize(rows, fmt):
+    """Yields the export one line at a time."""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            writer.writerow([row.start_date_time.isoformat(), row.end_date_time.isoformat(), row.artist_id,
+                             row.artist_name, row.venue_id, row.venue_name])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for row in rows:
+            record = dict(row._mapping)
+            record['start_date_time'] = row.start_date_time.isoformat()
+            record['end_date_time'] = row.end_date_time.isoformat()
+            yield json.dumps(record) + '\n'
+
+
+def parse_since(value):
+    if not value:
+        return None
+    return dateutil.parser.parse(value)
+
+
+@click.command('export')
+@click.option('--format', 'fmt', type=click.Choice(list(EXPORT_FORMATS)), default='csv', show_default=True)
+@click.option('--since', help='Only export shows starting at or after this time.')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-')
+@with_appcontext
+def export_command(fmt, since, output):
+    """Stream the show catalog, with artist and venue names, as CSV or JSON lines."""
+    try:
+        since = parse_since(since)
+    except (ValueError, OverflowError):
+        raise click.BadParameter('not a date/time', param_hint='--since')
+    for chunk in serialize(export_shows(since), fmt):
+        output.write(chunk)
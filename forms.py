@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField
-from wtforms.validators import DataRequired, AnyOf, URL, Regexp
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, BooleanField, IntegerField
+from wtforms.validators import DataRequired, AnyOf, URL, Regexp, Optional, NumberRange
 
 
 class ShowForm(FlaskForm):
@@ -16,6 +16,11 @@ class ShowForm(FlaskForm):
         validators=[DataRequired()],
         default=datetime.today()
     )
+    duration = IntegerField(
+        # minutes; booking.parse_duration applies the default and the upper bound
+        'duration',
+        validators=[Optional(), NumberRange(min=1, max=24 * 60)]
+    )
 
 
 class VenueForm(FlaskForm):
@@ -0,0 +1,63 @@
+from flask import request
+from sqlalchemy import func, select
+
+from models import db, Genre, Venue, Venue_Genre, Artist, Artist_Genre
+
+# ----------------------------------------------------------------------------#
+# Genres.
+# ----------------------------------------------------------------------------#
+
+# model -> (link model, link column pointing at the model)
+GENRE_MODELS = {
+    Venue: (Venue_Genre, Venue_Genre.venue_id),
+    Artist: (Artist_Genre, Artist_Genre.artist_id),
+}
+
+
+def requested_genres():
+    """The `?genre=` values of the current request; repeat the parameter to require several genres."""
+    return [name.strip() for name in request.args.getlist('genre') if name.strip()]
+
+
+def genre_criteria(model, names):
+    """One filter per genre name, each an IN over the (genre_id, owner) index; names match case-insensitively."""
+    link_model, owner_key = GENRE_MODELS[model]
+    # Every genre spelled like `name` in any case counts. Given statistics, the planner scans the few
+    # genre rows and searches the link table's (genre_id, owner) index with each match.
+    return [model.id.in_(select(owner_key).join(Genre, link_model.genre_id == Genre.id)
+                         .where(func.lower(Genre.name) == name.lower()))
+            for name in names]
+
+
+def get_genres(names):
+    """Genre rows for `names`, adding any that don't exist yet to the session."""
+    names = set(names)
+    genres = {genre.name: genre for genre in Genre.query.filter(Genre.name.in_(names))} if names else {}
+    for name in names - set(genres):
+        genres[name] = Genre(name=name)
+        db.session.add(genres[name])
+    return genres
+
+
+def genre_ids(bind, names):
+    """Core counterpart of get_genres for bulk writers: returns {name: id}, inserting missing genres."""
+    names = set(names)
+    if not names:
+        return {}
+    table = Genre.__table__
+    query = select(table.c.name, table.c.id).where(table.c.name.in_(names))
+    ids = dict(bind.execute(query).all())
+    missing = names - set(ids)
+    if missing:
+        bind.execute(table.insert(), [{'name': name} for name in missing])
+        ids = dict(bind.execute(query).all())
+    return ids
+
+
+def set_genres(owner, names):
+    """Makes `owner.genres` exactly `names`: missing links are added, dropped ones deleted, the rest kept."""
+    link_model, _ = GENRE_MODELS[type(owner)]
+    names = list(dict.fromkeys(names))
+    current = {link.genre.name: link for link in owner.genres}
+    genres = get_genres(set(names) - set(current))
+    owner.genres = [current.get(name) or link_model(genre=genres[name]) for name in names]
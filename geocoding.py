@@ -0,0 +1,150 @@
+import csv
+import math
+import re
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event, inspect, select
+from werkzeug.utils import import_string
+
+from models import db, Venue, Artist
+
+# ----------------------------------------------------------------------------#
+# Geocoding.
+# ----------------------------------------------------------------------------#
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Columns a provider may use; a change to any of them clears the stored coordinates.
+LOCATION_FIELDS = ('address', 'city', 'state')
+
+
+class Geocoder(object):
+    """Turns an address, city and state into (latitude, longitude), or None when it can't."""
+
+    def __init__(self, config):
+        self.config = config
+
+    def geocode(self, address, city, state):
+        raise NotImplementedError
+
+
+def place_key(name):
+    """'St. Louis', 'st louis' and 'ST LOUIS' all match."""
+    return re.sub(r'[^0-9a-z]', '', (name or '').casefold())
+
+
+class GazetteerGeocoder(Geocoder):
+    """Offline default: city centres from the GAZETTEER_PATH CSV (city, state, latitude, longitude,
+    aliases separated by ';'). Addresses are ignored, so every venue in a city gets the same point.
+
+    Without a state, a city only matches when the gazetteer has one place of that name.
+    """
+
+    def __init__(self, config):
+        super(GazetteerGeocoder, self).__init__(config)
+        self.places = {}
+        self.cities = {}
+        with open(config['GAZETTEER_PATH'], newline='', encoding='utf-8') as stream:
+            for row in csv.DictReader(stream):
+                point = (float(row['latitude']), float(row['longitude']))
+                state = row['state'].strip().upper()
+                for name in [row['city']] + (row.get('aliases') or '').split(';'):
+                    if place_key(name):
+                        self.places[(place_key(name), state)] = point
+                        self.cities.setdefault(place_key(name), set()).add(point)
+
+    def geocode(self, address, city, state):
+        key = place_key(city)
+        if state:
+            return self.places.get((key, state.strip().upper()))
+        points = self.cities.get(key, ())
+        return next(iter(points)) if len(points) == 1 else None
+
+
+GEOCODERS = {
+    'gazetteer': GazetteerGeocoder,
+}
+
+
+def get_geocoder():
+    """The GEOCODER provider: a name from GEOCODERS or an import path such as 'mypackage.geo:Provider'."""
+    name = current_app.config['GEOCODER']
+    return (GEOCODERS[name] if name in GEOCODERS else import_string(name))(current_app.config)
+
+
+def distance_km(latitude, longitude, other_latitude, other_longitude):
+    """Great-circle (haversine) distance."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (latitude, longitude, other_latitude, other_longitude))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """(south, north, [(west, east), ...]) enclosing the circle around a point.
+
+    Two longitude ranges when the circle crosses the antimeridian; all longitudes when it
+    reaches a pole.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = max(-90.0, latitude - math.degrees(angle))
+    north = min(90.0, latitude + math.degrees(angle))
+    if south == -90.0 or north == 90.0 or math.sin(angle) >= math.cos(math.radians(latitude)):
+        return south, north, [(-180.0, 180.0)]
+    spread = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(latitude))))
+    west, east = longitude - spread, longitude + spread
+    if west < -180.0:
+        return south, north, [(west + 360.0, 180.0), (-180.0, east)]
+    if east > 180.0:
+        return south, north, [(west, 180.0), (-180.0, east - 360.0)]
+    return south, north, [(west, east)]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _clear_moved_coordinates(session, flush_context, instances):
+    """An edited address invalidates the point; `flask geocode` fills it in again."""
+    for obj in session.dirty:
+        if not isinstance(obj, (Venue, Artist)):
+            continue
+        attrs = inspect(obj).attrs
+        moved = any(attrs[field].history.has_changes() for field in LOCATION_FIELDS if field in attrs)
+        if moved and not attrs.latitude.history.has_changes():
+            obj.latitude = obj.longitude = None
+
+
+@click.command('geocode')
+@click.option('--all', 'everything', is_flag=True, help='Geocode every venue and artist, not only those without '
+                                                       'coordinates.')
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def geocode_command(everything, batch_size):
+    """Fill in venue and artist coordinates with the GEOCODER provider; run after imports and edits."""
+    geocoder = get_geocoder()
+    found = {}
+    for model in (Venue, Artist):
+        table = model.__table__
+        # Artists have no street address.
+        columns = [table.c.id, table.c.city, table.c.state] + ([table.c.address] if 'address' in table.c else [])
+        query = select(*columns).order_by(table.c.id)
+        if not everything:
+            query = query.where(table.c.latitude.is_(None))
+        with db.engine.connect() as connection:
+            rows = connection.execute(query).all()
+
+        update = table.update().where(table.c.id == bindparam('row_id')) \
+            .values(latitude=bindparam('lat'), longitude=bindparam('lng'))
+        located = 0
+        for start in range(0, len(rows), batch_size):
+            values = []
+            for row_id, city, state, *address in rows[start:start + batch_size]:
+                key = (address[0] if address else None, city, state)
+                if key not in found:
+                    found[key] = geocoder.geocode(*key)
+                if found[key] is not None:
+                    values.append({'row_id': row_id, 'lat': found[key][0], 'lng': found[key][1]})
+            if values:
+                with db.engine.begin() as connection:
+                    connection.execute(update, values)
+            located += len(values)
+        click.echo('%s: %d of %d located' % (table.name, located, len(rows)))
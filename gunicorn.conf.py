@@ -0,0 +1,41 @@
+# Gunicorn settings for FYYUR_CONFIG=config.ProductionConfig; see DEPLOYMENT.md.
+#
+#   gunicorn                                  # threaded workers
+#   GUNICORN_WORKER_CLASS=gevent gunicorn     # gevent workers (pip install gevent psycogreen)
+#
+# Worker counts come from config.ProductionConfig so the pool sizes computed there always match.
+import os
+
+from config import ProductionConfig
+
+raw_env = ['FYYUR_CONFIG=config.ProductionConfig']
+wsgi_app = 'app:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:' + os.environ.get('PORT', '8000'))
+
+worker_class = ProductionConfig.WORKER_CLASS
+workers = ProductionConfig.WORKERS
+threads = ProductionConfig.THREADS
+worker_connections = ProductionConfig.WORKER_CONNECTIONS
+
+# Each worker builds its own app and connection pool after the fork; a preloaded pool's
+# sockets would be shared between processes.
+preload_app = False
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 blocks the whole worker unless its wait callback yields to the gevent hub.
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning('psycogreen is not installed; database calls will block gevent workers')
+        else:
+            patch_psycopg()
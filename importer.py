@@ -0,0 +1,275 @@
+import csv
+import io
+import json
+import time
+from datetime import timedelta
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from werkzeug.datastructures import MultiDict
+
+from availability import BookingIndex
+from counters import recount
+from forms import VenueForm, ArtistForm, ShowForm
+from genres import genre_ids
+from models import db, Venue, Venue_Genre, Artist, Artist_Genre, Show, DEFAULT_SHOW_DURATION
+from versions import touch_versions
+
+# ----------------------------------------------------------------------------#
+# Bulk import.
+# ----------------------------------------------------------------------------#
+
+# kind -> (form, model, genre model, genre foreign key, form field -> column)
+IMPORTS = {
+    'venues': (VenueForm, Venue, Venue_Genre, 'venue_id', {
+        'name': 'name', 'city': 'city', 'state': 'state', 'address': 'address', 'phone': 'phone',
+        'image_link': 'image_link', 'facebook_link': 'facebook_link', 'website_link': 'website_link',
+        'seeking_talent': 'seeking_talent', 'seeking_description': 'seeking_description',
+    }),
+    'artists': (ArtistForm, Artist, Artist_Genre, 'artist_id', {
+        'name': 'name', 'city': 'city', 'state': 'state', 'phone': 'phone',
+        'image_link': 'image_link', 'facebook_link': 'facebook_link', 'website_link': 'website_link',
+        'seeking_venue': 'seeking_venue', 'seeking_description': 'seeking_description',
+    }),
+}
+
+
+def read_records(stream, fmt):
+    """Yields (line number, record) pairs from a CSV or JSONL stream.
+
+    CSV genres are a single column separated by semicolons; JSONL genres may also be a list.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_num, line in enumerate(stream, 1):
+            if line.strip():
+                yield line_num, json.loads(line)
+
+
+def form_data(record):
+    data = MultiDict()
+    for key, value in record.items():
+        if key == 'genres' and isinstance(value, str):
+            value = [genre.strip() for genre in value.split(';') if genre.strip()]
+        if isinstance(value, list):
+            for item in value:
+                data.add(key, str(item))
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+def validate(records, form_class, rejected):
+    """Runs each record through the same form the create routes use; invalid rows go to `rejected`."""
+    for line_num, record in records:
+        form = form_class(formdata=form_data(record), meta={'csrf': False})
+        if form.validate():
+            yield line_num, form.data
+        else:
+            rejected.append((line_num, form.errors))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def allocate_ids(connection, table, count):
+    """Reserves `count` primary keys up front so genre rows can reference them in the same batch."""
+    if connection.dialect.name == 'postgresql':
+        rows = connection.execute(text(
+            "SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"
+        ), {'table': '"%s"' % table.name, 'count': count})
+        return [row[0] for row in rows]
+    start = connection.execute(text('SELECT coalesce(max(id), 0) FROM "%s"' % table.name)).scalar()
+    return list(range(start + 1, start + count + 1))
+
+
+def copy_rows(connection, table_name, columns, rows):
+    """Postgres COPY ... FROM STDIN of `rows` into `table_name`."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert('COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)' % (
+            table_name, ', '.join('"%s"' % column for column in columns)), buffer)
+    finally:
+        cursor.close()
+
+
+def write_rows(connection, table, columns, rows):
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        copy_rows(connection, table.name, columns, rows)
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def write_entities(connection, kind, batch):
+    _, model, genre_model, genre_key, fields = IMPORTS[kind]
+    table = model.__table__
+    columns = ['id'] + list(fields.values())
+
+    ids = allocate_ids(connection, table, len(batch))
+    genres = genre_ids(connection, [genre for _, data in batch for genre in data['genres']])
+    rows, genre_rows = [], []
+    for entity_id, (_, data) in zip(ids, batch):
+        rows.append([entity_id] + [data[field] for field in fields])
+        genre_rows.extend([entity_id, genres[genre]] for genre in dict.fromkeys(data['genres']))
+
+    write_rows(connection, table, columns, rows)
+    write_rows(connection, genre_model.__table__, [genre_key, 'genre_id'], genre_rows)
+    touch_versions(connection, [kind])
+    return len(rows)
+
+
+def show_end(data):
+    return data['start_time'] + (timedelta(minutes=data['duration']) if data.get('duration') else DEFAULT_SHOW_DURATION)
+
+
+def booked_between(shows):
+    start, end, _ = shows[0]
+    return 'booked from %s to %s' % (start, end)
+
+
+def write_shows(connection, batch, rejected):
+    """Writes the batch's new shows; rows that repeat or overlap a booking of the same artist or
+    venue, in the database or earlier in the batch, go to `rejected`."""
+    candidates = [(line_num, (data['artist_id'], data['venue_id'], data['start_time'], show_end(data)))
+                  for line_num, data in batch]
+    index = BookingIndex([row for _, row in candidates], connection)
+    rows = []
+    for line_num, row in candidates:
+        conflicts = index.conflicts(*row)
+        if row[:3] in index.booked:
+            rejected.append((line_num, {'start_time': ['Show is already listed']}))
+        elif conflicts['artist'] or conflicts['venue']:
+            errors = {}
+            if conflicts['artist']:
+                errors['artist_id'] = ['Artist is already %s' % booked_between(conflicts['artist'])]
+            if conflicts['venue']:
+                errors['venue_id'] = ['Venue is already %s' % booked_between(conflicts['venue'])]
+            rejected.append((line_num, errors))
+        else:
+            index.add(*row)
+            rows.append(list(row))
+    if not rows:
+        return 0
+    columns = ['artist_id', 'venue_id', 'start_date_time', 'end_date_time']
+    table = Show.__table__
+    touch_versions(connection, ['shows'], [row[1] for row in rows], [row[0] for row in rows])
+
+    if connection.dialect.name == 'postgresql':
+        # COPY can't skip conflicting rows, so stage the batch and insert what's new.
+        connection.execute(text('CREATE TEMP TABLE IF NOT EXISTS shows_import '
+                                '(LIKE shows INCLUDING DEFAULTS) ON COMMIT DELETE ROWS'))
+        copy_rows(connection, 'shows_import', columns, rows)
+        # DO NOTHING also covers the exclusion constraints, for bookings made during the import.
+        result = connection.execute(text('INSERT INTO shows (artist_id, venue_id, start_date_time, end_date_time) '
+                                         'SELECT artist_id, venue_id, start_date_time, end_date_time '
+                                         'FROM shows_import ON CONFLICT DO NOTHING'))
+    else:
+        result = connection.execute(table.insert().prefix_with('OR IGNORE', dialect='sqlite'),
+                                    [dict(zip(columns, row)) for row in rows])
+    recount(connection, [row[1] for row in rows], [row[0] for row in rows])
+    return result.rowcount
+
+
+def validate_shows(records, rejected):
+    """ShowForm validation plus a set-based check that both ids exist."""
+    artist_ids = {row[0] for row in db.session.query(Artist.id)}
+    venue_ids = {row[0] for row in db.session.query(Venue.id)}
+    db.session.close()
+
+    for line_num, record in records:
+        form = ShowForm(formdata=form_data(record), meta={'csrf': False})
+        if not form.validate():
+            rejected.append((line_num, form.errors))
+            continue
+        errors = {}
+        data = dict(form.data)
+        for field, known in (('artist_id', artist_ids), ('venue_id', venue_ids)):
+            try:
+                data[field] = int(data[field])
+            except (TypeError, ValueError):
+                errors[field] = ['Not a valid id']
+                continue
+            if data[field] not in known:
+                errors[field] = ['Unknown id %d' % data[field]]
+        if errors:
+            rejected.append((line_num, errors))
+        else:
+            yield line_num, data
+
+
+def invalidate_caches():
+    """Bulk writes bypass the ORM session, so the session-event invalidation never sees them.
+
+    This only clears the caches of the importing process. Web workers find the new rows through
+    the collection versions touch_versions() bumps, which page cache keys and the memory search
+    index include, and through the entity versions the detail pages check their show partitions against.
+    """
+    extensions = current_app.extensions
+    if 'page_cache' in extensions:
+        extensions['page_cache'].invalidate(['venues', 'artists', 'shows'])
+    if 'show_partitions' in extensions:
+        extensions['show_partitions'].invalidate()
+    if 'search' in extensions:
+        extensions['search'].invalidate()
+
+
+@click.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='Input format; guessed from the file extension when omitted.')
+@click.option('--batch-size', default=5000, show_default=True)
+@with_appcontext
+def import_command(kind, source, fmt, batch_size):
+    """Stream venues, artists or shows from a CSV/JSONL file into the database."""
+    if fmt is None:
+        fmt = 'csv' if source.name.endswith('.csv') else 'jsonl'
+
+    rejected = []
+    records = read_records(source, fmt)
+    if kind == 'shows':
+        valid = validate_shows(records, rejected)
+    else:
+        valid = validate(records, IMPORTS[kind][0], rejected)
+
+    started = time.monotonic()
+    written = skipped = 0
+    for batch in batched(valid, batch_size):
+        with db.engine.begin() as connection:
+            if kind == 'shows':
+                written += write_shows(connection, batch, rejected)
+            else:
+                written += write_entities(connection, kind, batch)
+        # Validation rejects come first, then the booking conflicts found while writing.
+        for line_num, errors in sorted(rejected, key=lambda item: item[0]):
+            click.echo('line %d rejected: %s' % (line_num, errors), err=True)
+        skipped += len(rejected)
+        del rejected[:]
+        elapsed = time.monotonic() - started
+        click.echo('%s: %d rows written (%.0f rows/s)' % (kind, written, written / elapsed if elapsed else 0))
+
+    for line_num, errors in rejected:
+        click.echo('line %d rejected: %s' % (line_num, errors), err=True)
+    skipped += len(rejected)
+    invalidate_caches()
+
+    elapsed = time.monotonic() - started
+    click.echo('%s: %d rows written, %d rejected in %.1fs (%.0f rows/s)' % (
+        kind, written, skipped, elapsed, written / elapsed if elapsed else 0))
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import time
+from logging.handlers import RotatingFileHandler
+
+from flask import current_app, g, has_app_context, request
+from jinja2 import Template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# ----------------------------------------------------------------------------#
+# SQL instrumentation.
+# ----------------------------------------------------------------------------#
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised at the first query over a request's budget when SQL_QUERY_BUDGET_RAISE is set."""
+
+
+class RequestStats(object):
+    """Query count, summed DB and template time, and the slowest statements of one request."""
+
+    def __init__(self, budget=None, keep=3):
+        self.started = time.perf_counter()
+        self.budget = budget
+        self.keep = keep
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.slowest = []
+
+    def add_query(self, statement, seconds):
+        self.db_time += seconds
+        self.slowest.append((seconds, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[self.keep:]
+
+    def over_budget(self):
+        return self.budget is not None and self.queries > self.budget
+
+    def server_timing(self, total):
+        return 'db;dur=%.1f;desc="%d queries", render;dur=%.1f, total;dur=%.1f' % (
+            self.db_time * 1000, self.queries, self.render_time * 1000, total * 1000)
+
+
+class TimedTemplate(Template):
+    """Adds each page render to the request's render time; queries lazy-loaded by the template count as both."""
+
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats = g.get('sql_stats') if has_app_context() else None
+            if stats is not None:
+                stats.render_time += time.perf_counter() - started
+
+
+def init_instrumentation(app):
+    app.jinja_env.template_class = TimedTemplate
+    app.before_request(begin_request)
+    app.after_request(end_request)
+    app.logger.getChild('requests').setLevel(logging.INFO)
+
+    slow_log = logging.getLogger(app.logger.name + '.slow_queries')
+    slow_log.propagate = False
+    filename = app.config.get('SLOW_QUERY_LOG')
+    # The logger is shared by every app with this name; one configured with another file takes it over.
+    if filename and not any(getattr(handler, 'baseFilename', None) == os.path.abspath(filename)
+                            for handler in slow_log.handlers):
+        for handler in slow_log.handlers[:]:
+            slow_log.removeHandler(handler)
+            handler.close()
+        handler = RotatingFileHandler(filename, maxBytes=app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                                      backupCount=app.config.get('SLOW_QUERY_LOG_BACKUPS', 5), delay=True)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_log.addHandler(handler)
+        slow_log.setLevel(logging.WARNING)
+    app.extensions['slow_query_log'] = slow_log
+    return slow_log
+
+
+def query_budget(limit):
+    """Overrides SQL_QUERY_BUDGET for one view, e.g. a page that legitimately needs more queries."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def begin_request():
+    view = current_app.view_functions.get(request.endpoint)
+    g.sql_stats = RequestStats(getattr(view, 'query_budget', current_app.config.get('SQL_QUERY_BUDGET')))
+
+
+def end_request(response):
+    """Adds the Server-Timing header and writes the request's log line; over-budget requests log a warning."""
+    stats = g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats.started
+    if current_app.config.get('SERVER_TIMING', True):
+        response.headers.add('Server-Timing', stats.server_timing(total))
+    current_app.logger.getChild('requests').log(logging.WARNING if stats.over_budget() else logging.INFO, json.dumps({
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status': response.status_code,
+        'queries': stats.queries,
+        'budget': stats.budget,
+        'db_ms': round(stats.db_time * 1000, 1),
+        'render_ms': round(stats.render_time * 1000, 1),
+        'total_ms': round(total * 1000, 1),
+        'slowest': [{'ms': round(seconds * 1000, 1), 'statement': statement} for seconds, statement in stats.slowest],
+    }))
+    return response
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    stats = g.get('sql_stats') if has_app_context() else None
+    if stats is not None:
+        stats.queries += 1
+        if stats.over_budget() and current_app.config.get('SQL_QUERY_BUDGET_RAISE'):
+            raise QueryBudgetExceeded('%s %s ran more than its budget of %d queries; query %d was: %s' % (
+                request.method, request.path, stats.budget, stats.queries, statement))
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _finish_query(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info['query_started'].pop()
+    if not has_app_context():
+        return
+    stats = g.get('sql_stats')
+    if stats is not None:
+        stats.add_query(statement, seconds)
+
+    threshold = current_app.config.get('SLOW_QUERY_MS')
+    slow_log = current_app.extensions.get('slow_query_log')
+    if threshold is not None and slow_log is not None and seconds * 1000 >= threshold:
+        slow_log.warning(json.dumps({
+            'ms': round(seconds * 1000, 1),
+            'path': request.path if stats is not None else None,
+            'statement': statement,
+            'parameters': repr(parameters)[:2000],
+            'executemany': executemany,
+        }))
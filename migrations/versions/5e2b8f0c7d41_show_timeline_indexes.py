@@ -0,0 +1,35 @@
+"""show timeline indexes
+
+Revision ID: 5e2b8f0c7d41
+Revises: a41c7d2e9b13
+Create Date: 2026-10-18 19:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b8f0c7d41'
+down_revision = 'a41c7d2e9b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_shows_venue_id_start_date_time', 'shows', ['venue_id', 'start_date_time'])
+    op.create_index('ix_shows_artist_id_start_date_time', 'shows', ['artist_id', 'start_date_time'])
+    op.create_index('ix_shows_start_date_time', 'shows', ['start_date_time', 'artist_id', 'venue_id'])
+    op.create_index('ix_venue__genre_venue_id', 'venue__genre', ['venue_id'])
+    op.create_index('ix_artist__genre_artist_id', 'artist__genre', ['artist_id'])
+    op.create_index('ix_venue_city_state_name', 'Venue', ['city', 'state', 'name', 'id'])
+    op.create_index('ix_artist_name', 'Artist', ['name', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_artist_name', table_name='Artist')
+    op.drop_index('ix_venue_city_state_name', table_name='Venue')
+    op.drop_index('ix_artist__genre_artist_id', table_name='artist__genre')
+    op.drop_index('ix_venue__genre_venue_id', table_name='venue__genre')
+    op.drop_index('ix_shows_start_date_time', table_name='shows')
+    op.drop_index('ix_shows_artist_id_start_date_time', table_name='shows')
+    op.drop_index('ix_shows_venue_id_start_date_time', table_name='shows')
@@ -0,0 +1,49 @@
+"""show counters
+
+Revision ID: 7a9c3e5b1d64
+Revises: e19d4b7a3c20
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a9c3e5b1d64'
+down_revision = 'e19d4b7a3c20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('upcoming_show_count', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('past_show_count', sa.Integer(), server_default='0', nullable=False))
+            batch_op.add_column(sa.Column('next_show_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(batch_op.f('ix_%s_next_show_at' % table), ['next_show_at'], unique=False)
+
+    now = datetime.now()
+    shows = sa.table('shows', sa.column('artist_id'), sa.column('venue_id'), sa.column('start_date_time'))
+    for table, key in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        owner = sa.table(table, sa.column('id'), sa.column('upcoming_show_count'), sa.column('past_show_count'),
+                         sa.column('next_show_at'))
+        owned = shows.c[key] == owner.c.id
+        upcoming = shows.c.start_date_time > now
+        op.execute(owner.update().values(
+            upcoming_show_count=sa.select(sa.func.count()).where(owned, upcoming).scalar_subquery(),
+            past_show_count=sa.select(sa.func.count()).where(owned, ~upcoming).scalar_subquery(),
+            next_show_at=sa.select(sa.func.min(shows.c.start_date_time)).where(owned, upcoming).scalar_subquery(),
+        ))
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(batch_op.f('ix_%s_next_show_at' % table))
+            batch_op.drop_column('next_show_at')
+            batch_op.drop_column('past_show_count')
+            batch_op.drop_column('upcoming_show_count')
@@ -0,0 +1,45 @@
+"""listing indexes in keyset order: show id last, NULLs first on Postgres
+
+Revision ID: 9d4e2a7c1f36
+Revises: f7a3c9d1b5e8
+Create Date: 2026-10-19 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4e2a7c1f36'
+down_revision = 'f7a3c9d1b5e8'
+branch_labels = None
+depends_on = None
+
+# name -> (table, columns); nullable columns are NULLS FIRST on Postgres, where listings order them so.
+NULLS_FIRST_INDEXES = {
+    'ix_venue_city_state_name': ('Venue', ['city', 'state', 'name', 'id']),
+    'ix_artist_name': ('Artist', ['name', 'id']),
+}
+NULLABLE = ('city', 'state', 'name')
+
+
+def upgrade():
+    op.drop_index('ix_shows_start_date_time', table_name='shows')
+    op.create_index('ix_shows_start_date_time', 'shows', ['start_date_time', 'artist_id', 'venue_id', 'id'])
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, (table, columns) in NULLS_FIRST_INDEXES.items():
+        op.drop_index(name, table_name=table)
+        op.create_index(name, table, [sa.text(column + ' NULLS FIRST') if column in NULLABLE else column
+                                      for column in columns])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for name, (table, columns) in NULLS_FIRST_INDEXES.items():
+            op.drop_index(name, table_name=table)
+            op.create_index(name, table, columns)
+
+    op.drop_index('ix_shows_start_date_time', table_name='shows')
+    op.create_index('ix_shows_start_date_time', 'shows', ['start_date_time', 'artist_id', 'venue_id'])
@@ -0,0 +1,41 @@
+"""search trigram indexes
+
+Revision ID: a41c7d2e9b13
+Revises: 339922ae977f
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c7d2e9b13'
+down_revision = '339922ae977f'
+branch_labels = None
+depends_on = None
+
+TRIGRAM_INDEXES = [
+    ('ix_venue_name_trgm', 'Venue', 'name'),
+    ('ix_venue_city_trgm', 'Venue', 'city'),
+    ('ix_artist_name_trgm', 'Artist', 'name'),
+    ('ix_artist_city_trgm', 'Artist', 'city'),
+    ('ix_venue_genre_genre_trgm', 'venue__genre', 'genre'),
+    ('ix_artist_genre_genre_trgm', 'artist__genre', 'genre'),
+]
+
+
+def upgrade():
+    # pg_trgm only exists on Postgres; other databases use the in-process search index.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.create_index(name, table, [column], postgresql_using='gin',
+                        postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, column in TRIGRAM_INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,85 @@
+"""genre lookup
+
+Revision ID: b6d1f4a8e2c9
+Revises: 7a9c3e5b1d64
+Create Date: 2026-10-18 22:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d1f4a8e2c9'
+down_revision = '7a9c3e5b1d64'
+branch_labels = None
+depends_on = None
+
+# link table -> owner column
+LINKS = [
+    ('venue__genre', 'venue_id'),
+    ('artist__genre', 'artist_id'),
+]
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    genre = op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=30), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name', name='uq_genre_name')
+    )
+    op.execute(genre.insert().from_select(['name'], sa.union(*[
+        sa.select(sa.table(table, sa.column('genre')).c.genre) for table, _ in LINKS
+    ])))
+
+    for table, owner_key in LINKS:
+        link = sa.table(table, sa.column('id'), sa.column(owner_key), sa.column('genre'), sa.column('genre_id'))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('genre_id', sa.Integer(), nullable=True))
+        op.execute(link.update().values(
+            genre_id=sa.select(genre.c.id).where(genre.c.name == link.c.genre).scalar_subquery()))
+        # Edits used to append a row per submitted genre; keep the first of each.
+        keep = sa.select(sa.func.min(link.c.id)).group_by(link.c[owner_key], link.c.genre_id)
+        op.execute(link.delete().where(link.c.id.notin_(keep)))
+
+        if postgres:
+            op.drop_index('ix_%s_genre_trgm' % table.replace('__', '_'), table_name=table)
+        op.drop_index('ix_%s_%s' % (table, owner_key), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('genre_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.create_foreign_key('fk_%s_genre_id_genre' % table, 'genre', ['genre_id'], ['id'])
+            batch_op.create_unique_constraint('uq_%s_%s_genre_id' % (table, owner_key), [owner_key, 'genre_id'])
+            batch_op.drop_column('genre')
+        op.create_index('ix_%s_genre_id_%s' % (table, owner_key), table, ['genre_id', owner_key])
+
+    if postgres:
+        op.create_index('ix_genre_name_trgm', 'genre', ['name'], postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    genre = sa.table('genre', sa.column('id'), sa.column('name'))
+    if postgres:
+        op.drop_index('ix_genre_name_trgm', table_name='genre')
+
+    for table, owner_key in reversed(LINKS):
+        link = sa.table(table, sa.column('genre'), sa.column('genre_id'))
+        op.drop_index('ix_%s_genre_id_%s' % (table, owner_key), table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('genre', sa.String(length=30), nullable=True))
+        op.execute(link.update().values(
+            genre=sa.select(genre.c.name).where(genre.c.id == link.c.genre_id).scalar_subquery()))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('genre', existing_type=sa.String(length=30), nullable=False)
+            batch_op.drop_constraint('uq_%s_%s_genre_id' % (table, owner_key), type_='unique')
+            batch_op.drop_constraint('fk_%s_genre_id_genre' % table, type_='foreignkey')
+            batch_op.drop_column('genre_id')
+        op.create_index('ix_%s_%s' % (table, owner_key), table, [owner_key])
+        if postgres:
+            op.create_index('ix_%s_genre_trgm' % table.replace('__', '_'), table, ['genre'], postgresql_using='gin',
+                            postgresql_ops={'genre': 'gin_trgm_ops'})
+
+    op.drop_table('genre')
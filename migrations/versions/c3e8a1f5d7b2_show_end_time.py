@@ -0,0 +1,68 @@
+"""show end time
+
+Revision ID: c3e8a1f5d7b2
+Revises: b6d1f4a8e2c9
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a1f5d7b2'
+down_revision = 'b6d1f4a8e2c9'
+branch_labels = None
+depends_on = None
+
+# owner column -> exclusion constraint
+EXCLUSIONS = [
+    ('artist_id', 'ex_shows_artist_during'),
+    ('venue_id', 'ex_shows_venue_during'),
+]
+
+# Existing shows get the default two hours, cut short where the same artist or venue has a later
+# show sooner, so the backfilled rows never overlap. Shows that shared a start become empty ranges.
+BACKFILL = '''
+UPDATE shows SET end_date_time = {least}({default_end},
+                                         COALESCE(timeline.next_artist_start, {default_end}),
+                                         COALESCE(timeline.next_venue_start, {default_end}))
+FROM (SELECT id, start_date_time,
+             LEAD(start_date_time) OVER (PARTITION BY artist_id ORDER BY start_date_time, id) AS next_artist_start,
+             LEAD(start_date_time) OVER (PARTITION BY venue_id ORDER BY start_date_time, id) AS next_venue_start
+      FROM shows) AS timeline
+WHERE shows.id = timeline.id
+'''
+
+
+def upgrade():
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.add_column(sa.Column('end_date_time', sa.DateTime(), nullable=True))
+    if postgres:
+        op.execute(BACKFILL.format(least='LEAST', default_end="timeline.start_date_time + interval '2 hours'"))
+    else:
+        # Keep the fractional seconds SQLAlchemy stores, so ends compare as strings like starts do.
+        op.execute(BACKFILL.format(least='MIN', default_end="datetime(timeline.start_date_time, '+2 hours') || "
+                                                            "substr(timeline.start_date_time, 20)"))
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('end_date_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint('ck_shows_end_after_start', 'end_date_time >= start_date_time')
+
+    # Exclusion constraints only exist on Postgres; elsewhere booking.book_shows checks overlaps.
+    # start_date_time is stored naive, so the ranges are tsrange rather than tstzrange.
+    if not postgres:
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for owner_key, name in EXCLUSIONS:
+        op.execute('ALTER TABLE shows ADD CONSTRAINT %s EXCLUDE USING gist '
+                   '(%s WITH =, tsrange(start_date_time, end_date_time) WITH &&)' % (name, owner_key))
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for _, name in reversed(EXCLUSIONS):
+            op.drop_constraint(name, 'shows')
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.drop_constraint('ck_shows_end_after_start', type_='check')
+        batch_op.drop_column('end_date_time')
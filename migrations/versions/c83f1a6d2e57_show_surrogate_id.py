@@ -0,0 +1,71 @@
+"""show surrogate id
+
+Revision ID: c83f1a6d2e57
+Revises: 5e2b8f0c7d41
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c83f1a6d2e57'
+down_revision = '5e2b8f0c7d41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('shows_pkey', 'shows', type_='primary')
+        op.execute('ALTER TABLE shows ADD COLUMN id SERIAL PRIMARY KEY')
+        op.create_unique_constraint('uq_shows_booking', 'shows', ['artist_id', 'venue_id', 'start_date_time'])
+        return
+
+    # SQLite can't alter a primary key in place; copy into a table with the new shape.
+    op.create_table('shows_new',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('start_date_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('artist_id', 'venue_id', 'start_date_time', name='uq_shows_booking')
+    )
+    op.execute('INSERT INTO shows_new (artist_id, venue_id, start_date_time) '
+               'SELECT artist_id, venue_id, start_date_time FROM shows')
+    op.drop_table('shows')
+    op.rename_table('shows_new', 'shows')
+    op.create_index('ix_shows_venue_id_start_date_time', 'shows', ['venue_id', 'start_date_time'])
+    op.create_index('ix_shows_artist_id_start_date_time', 'shows', ['artist_id', 'start_date_time'])
+    op.create_index('ix_shows_start_date_time', 'shows', ['start_date_time', 'artist_id', 'venue_id'])
+
+
+def downgrade():
+    # Repeat bookings of an artist/venue pair can't survive the old composite key; keep the earliest.
+    op.execute('DELETE FROM shows WHERE id NOT IN '
+               '(SELECT min(id) FROM shows GROUP BY artist_id, venue_id)')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('uq_shows_booking', 'shows', type_='unique')
+        op.drop_constraint('shows_pkey', 'shows', type_='primary')
+        op.drop_column('shows', 'id')
+        op.create_primary_key('shows_pkey', 'shows', ['artist_id', 'venue_id'])
+        return
+
+    op.create_table('shows_old',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('start_date_time', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'venue_id')
+    )
+    op.execute('INSERT INTO shows_old (artist_id, venue_id, start_date_time) '
+               'SELECT artist_id, venue_id, start_date_time FROM shows')
+    op.drop_table('shows')
+    op.rename_table('shows_old', 'shows')
+    op.create_index('ix_shows_venue_id_start_date_time', 'shows', ['venue_id', 'start_date_time'])
+    op.create_index('ix_shows_artist_id_start_date_time', 'shows', ['artist_id', 'start_date_time'])
+    op.create_index('ix_shows_start_date_time', 'shows', ['start_date_time', 'artist_id', 'venue_id'])
@@ -0,0 +1,33 @@
+"""venue and artist coordinates
+
+Revision ID: d5f2b7c9e4a1
+Revises: c3e8a1f5d7b2
+Create Date: 2026-10-19 00:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f2b7c9e4a1'
+down_revision = 'c3e8a1f5d7b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows stay NULL until `flask geocode` runs.
+    for table in ('Venue', 'Artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+    op.create_index('ix_venue_latitude_longitude', 'Venue', ['latitude', 'longitude'])
+
+
+def downgrade():
+    op.drop_index('ix_venue_latitude_longitude', table_name='Venue')
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
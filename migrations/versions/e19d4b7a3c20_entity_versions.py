@@ -0,0 +1,38 @@
+"""entity versions
+
+Revision ID: e19d4b7a3c20
+Revises: c83f1a6d2e57
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e19d4b7a3c20'
+down_revision = 'c83f1a6d2e57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('Venue', 'Artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False))
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('name', sa.String(length=30), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(catalog_version, [{'name': 'venues'}, {'name': 'artists'}, {'name': 'shows'}])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
+            batch_op.drop_column('version')
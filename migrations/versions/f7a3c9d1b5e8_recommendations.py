@@ -0,0 +1,50 @@
+"""precomputed artist and venue recommendations
+
+Revision ID: f7a3c9d1b5e8
+Revises: d5f2b7c9e4a1
+Create Date: 2026-10-19 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7a3c9d1b5e8'
+down_revision = 'd5f2b7c9e4a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL means never scored, so the first `flask recommend` covers every row.
+    for table in ('Venue', 'Artist'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('recommended_version', sa.Integer(), nullable=True))
+
+    op.create_table('venue__recommendation',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id', 'rank')
+    )
+    op.create_table('artist__recommendation',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['Artist.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['venue_id'], ['Venue.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'rank')
+    )
+
+
+def downgrade():
+    op.drop_table('artist__recommendation')
+    op.drop_table('venue__recommendation')
+    for table in ('Artist', 'Venue'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('recommended_version')
@@ -1,16 +1,42 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime, timedelta
+
+from replicas import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+class Genre(db.Model):
+    __tablename__ = 'genre'
+    __table_args__ = (
+        db.UniqueConstraint('name', name='uq_genre_name'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(30), nullable=False)
+
+    def __repr__(self):
+        return f'<Genre {self.id} {self.name}>'
 
-db = SQLAlchemy()
 
 class Venue_Genre(db.Model):
     __table_name__ = 'venue_genres'
+    __table_args__ = (
+        db.UniqueConstraint('venue_id', 'genre_id', name='uq_venue__genre_venue_id_genre_id'),
+        # Serves ?genre= filters: the venues carrying a genre.
+        db.Index('ix_venue__genre_genre_id_venue_id', 'genre_id', 'venue_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id", ondelete="CASCADE"), nullable=False)
-    genre = db.Column(db.String(30), nullable=False)
+    genre_id = db.Column(db.Integer, db.ForeignKey("genre.id"), nullable=False)
+    genre = db.relationship("Genre", lazy="joined")
 
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        # Serves the city/state grouping and keyset order of the /venues listing.
+        db.Index('ix_venue_city_state_name', 'city', 'state', 'name', 'id'),
+        # Bounding-box scans of /venues/nearby: a latitude range, longitude checked in the index.
+        db.Index('ix_venue_latitude_longitude', 'latitude', 'longitude'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
@@ -21,8 +47,20 @@ class Venue(db.Model):
     facebook_link = db.Column(db.String(120))
     website_link = db.Column(db.String, nullable=True)
     seeking_description = db.Column(db.String(255))
+    # Filled in by `flask geocode`; cleared when the address, city or state changes.
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
     seeking_talent = db.Column(db.Boolean, default=False, server_default="false")
-    genres = db.relationship("Venue_Genre", backref="venue", passive_deletes=True, lazy=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, server_default=db.func.now())
+    # Maintained on write by counters.py; exact until next_show_at passes.
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    past_show_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    next_show_at = db.Column(db.DateTime, nullable=True, index=True)
+    # The version the stored recommendations were computed from; `flask recommend` redoes rows where it differs.
+    recommended_version = db.Column(db.Integer, nullable=True)
+    genres = db.relationship("Venue_Genre", backref="venue", cascade="all, delete-orphan", passive_deletes=True,
+                             lazy=True, order_by="Venue_Genre.id")
     shows = db.relationship("Show", backref="venue", passive_deletes=True, lazy=True)
 
     def __repr__(self):
@@ -31,13 +69,21 @@ class Venue(db.Model):
 
 class Artist_Genre(db.Model):
     __table_name__ = 'artist_genres'
+    __table_args__ = (
+        db.UniqueConstraint('artist_id', 'genre_id', name='uq_artist__genre_artist_id_genre_id'),
+        db.Index('ix_artist__genre_genre_id_artist_id', 'genre_id', 'artist_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id", ondelete="CASCADE"), nullable=False)
-    genre = db.Column(db.String(30), nullable=False)
+    genre_id = db.Column(db.Integer, db.ForeignKey("genre.id"), nullable=False)
+    genre = db.relationship("Genre", lazy="joined")
 
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_artist_name', 'name', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
@@ -48,12 +94,81 @@ class Artist(db.Model):
     website_link = db.Column(db.String, nullable=True)
     seeking_venue = db.Column(db.Boolean, nullable=True, default=False)
     seeking_description = db.Column(db.String(500))
-    genres = db.relationship("Artist_Genre", backref="artist", passive_deletes=True, lazy=True)
+    # Home location, filled in by `flask geocode` from city and state.
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, server_default=db.func.now())
+    # Maintained on write by counters.py; exact until next_show_at passes.
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    past_show_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    next_show_at = db.Column(db.DateTime, nullable=True, index=True)
+    # The version the stored recommendations were computed from; `flask recommend` redoes rows where it differs.
+    recommended_version = db.Column(db.Integer, nullable=True)
+    genres = db.relationship("Artist_Genre", backref="artist", cascade="all, delete-orphan", passive_deletes=True,
+                             lazy=True, order_by="Artist_Genre.id")
     shows = db.relationship("Show", backref="artist", passive_deletes=True, lazy=True)
 
 
+# Shows without an explicit length run this long; none may run longer than the maximum, which
+# bounds how far back an overlap check has to look.
+DEFAULT_SHOW_DURATION = timedelta(hours=2)
+MAX_SHOW_DURATION = timedelta(hours=24)
+
+
+def default_show_end(context):
+    return context.get_current_parameters()['start_date_time'] + DEFAULT_SHOW_DURATION
+
+
 class Show(db.Model):
     __tablename__ = "shows"
-    artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id"), primary_key=True)
-    venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id", ondelete="CASCADE"), primary_key=True)
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_date_time', 'venue_id', 'start_date_time'),
+        db.Index('ix_shows_artist_id_start_date_time', 'artist_id', 'start_date_time'),
+        # Time-range scans and the keyset order of the /shows listing.
+        db.Index('ix_shows_start_date_time', 'start_date_time', 'artist_id', 'venue_id', 'id'),
+        db.UniqueConstraint('artist_id', 'venue_id', 'start_date_time', name='uq_shows_booking'),
+        db.CheckConstraint('end_date_time >= start_date_time', name='ck_shows_end_after_start'),
+        # Postgres also has exclusion constraints against overlapping shows of one artist or venue;
+        # they live only in the migration, like the trigram indexes.
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    # active_history loads the old owner before a change, even on an expired show, so the counters,
+    # versions and show partitions of the side it leaves are updated too.
+    artist_id = db.column_property(db.Column(db.Integer, db.ForeignKey("Artist.id"), nullable=False),
+                                   active_history=True)
+    venue_id = db.column_property(db.Column(db.Integer, db.ForeignKey("Venue.id", ondelete="CASCADE"), nullable=False),
+                                  active_history=True)
     start_date_time = db.Column(db.DateTime, nullable=False)
+    end_date_time = db.Column(db.DateTime, nullable=False, default=default_show_end)
+
+
+class Venue_Recommendation(db.Model):
+    """Top artists for a venue, written by `flask recommend`; rank 1 is the best match."""
+    __tablename__ = 'venue__recommendation'
+    venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id", ondelete="CASCADE"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id", ondelete="CASCADE"), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class Artist_Recommendation(db.Model):
+    """Top venues for an artist, written by `flask recommend`; rank 1 is the best match."""
+    __tablename__ = 'artist__recommendation'
+    artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id", ondelete="CASCADE"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id", ondelete="CASCADE"), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+
+class Catalog_Version(db.Model):
+    """One row per collection ('venues', 'artists', 'shows'), bumped by every commit that changes it."""
+    __tablename__ = 'catalog_version'
+    name = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now, server_default=db.func.now())
+
+
+# Show.venue and Show.artist are backrefs; configure them now so the first request of a fresh
+# worker can reference them in query options.
+db.configure_mappers()
@@ -0,0 +1,91 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import abort, current_app, request
+from sqlalchemy import DateTime, and_, false, or_, tuple_
+
+from models import db
+
+# ----------------------------------------------------------------------------#
+# Keyset pagination.
+# ----------------------------------------------------------------------------#
+
+# Dialects whose ascending order puts NULLs last; listings ask them for NULLs first, like the rest.
+NULLS_LAST_DIALECTS = ('postgresql', 'oracle')
+
+
+def encode_cursor(values):
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [datetime.fromisoformat(value) if isinstance(key.type, DateTime) else value
+                for key, value in zip(keys, values)]
+    except (ValueError, TypeError):
+        abort(400)
+
+
+def page_size():
+    default = current_app.config.get('PAGE_SIZE', 50)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', 200)
+    per_page = request.args.get('per_page', default, type=int)
+    return max(1, min(per_page, maximum))
+
+
+def order_keys(keys, dialect):
+    """ORDER BY terms for `keys`, NULLs first on every database (the Postgres listing indexes match)."""
+    if dialect.name not in NULLS_LAST_DIALECTS:
+        return list(keys)
+    return [key.asc().nulls_first() if getattr(key, 'nullable', True) else key for key in keys]
+
+
+def after_cursor(keys, values):
+    """Rows that come after `values` in the NULLs-first order of `keys`.
+
+    A row comparison is unknown as soon as either side holds a NULL. Rows with a NULL where the
+    cursor has a value sort before it anyway, so that only matters when the cursor itself holds
+    a NULL; then each key is compared on its own, or the listing would end at the first NULL.
+    """
+    if None not in values:
+        return tuple_(*keys) > tuple_(*values)
+    after = false()
+    for key, value in reversed(list(zip(keys, values))):
+        if value is None:
+            after = or_(key.isnot(None), and_(key.is_(None), after))
+        else:
+            after = or_(key > value, and_(key == value, after))
+    return after
+
+
+def keyset_query(query, keys):
+    """Applies the `?after=` cursor, order and page limit to a select(); returns (query, per_page)."""
+    per_page = page_size()
+    after = request.args.get('after')
+    if after:
+        query = query.filter(after_cursor(keys, decode_cursor(after, keys)))
+    return query.order_by(*order_keys(keys, db.engine.dialect)).limit(per_page + 1), per_page
+
+
+def keyset_rows(rows, keys, per_page):
+    """Trims the look-ahead row off a page fetched with keyset_query; returns (rows, next_cursor)."""
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor([rows[-1]._mapping[key] for key in keys])
+
+
+def keyset_page(query, keys):
+    """Returns one page of the select() `query` ordered by `keys`, starting after the `?after=` cursor.
+
+    Every key column must be selected by the query. The returned cursor is None on the last page.
+    """
+    query, per_page = keyset_query(query, keys)
+    return keyset_rows(db.session.execute(query).all(), keys, per_page)
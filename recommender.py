@@ -0,0 +1,218 @@
+import math
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, or_, select
+
+from clock import get_now
+from geocoding import EARTH_RADIUS_KM, place_key
+from models import db, Genre, Venue, Venue_Genre, Artist, Artist_Genre, Show, Venue_Recommendation, \
+    Artist_Recommendation
+
+# ----------------------------------------------------------------------------#
+# Recommendations.
+# ----------------------------------------------------------------------------#
+
+# Score = genre similarity + location + track record, boosted when both sides are looking.
+GENRE_WEIGHT = 0.6
+LOCATION_WEIGHT = 0.3
+ACTIVITY_WEIGHT = 0.1
+SEEKING_BONUS = 0.25
+# How much the genres of who a venue booked (or where an artist played) count next to its own.
+HISTORY_WEIGHT = 0.5
+# Location score halves about every 35 km.
+LOCATION_SCALE_KM = 50.0
+# Cells of an owners x candidates block scored at once; bounds memory to a few hundred MB.
+BLOCK_CELLS = 2000000
+
+# owner model -> (candidate model, genre link model, link key, recommendation model, candidate key)
+SIDES = {
+    Venue: (Artist, Venue_Genre, 'venue_id', Venue_Recommendation, 'artist_id'),
+    Artist: (Venue, Artist_Genre, 'artist_id', Artist_Recommendation, 'venue_id'),
+}
+
+
+def load_side(connection, np, model, genre_positions):
+    """Everything the scores need about every venue or artist, as arrays in id order.
+
+    Genres are a dense rows x genres float32 matrix, not a sparse one: with a few dozen genres that is
+    about 100 bytes a row, and it keeps the profile arithmetic and the genre similarity plain matmuls.
+    """
+    _, genre_model, owner_key, _, _ = SIDES[model]
+    table, links = model.__table__, genre_model.__table__
+    seeking = table.c.seeking_talent if model is Venue else table.c.seeking_venue
+    rows = connection.execute(select(table.c.id, table.c.version, table.c.recommended_version, table.c.city,
+                                     table.c.state, table.c.latitude, table.c.longitude, seeking)
+                              .order_by(table.c.id)).all()
+    ids = np.array([row.id for row in rows], dtype=np.int64)
+    cities = {}
+    side = {
+        'ids': ids,
+        'version': np.array([row.version for row in rows], dtype=np.int64),
+        'stale': np.array([row.recommended_version != row.version for row in rows], dtype=bool),
+        'latitude': np.radians(np.array([row.latitude if row.latitude is not None else np.nan for row in rows])),
+        'longitude': np.radians(np.array([row.longitude if row.longitude is not None else np.nan for row in rows])),
+        # Same-city match for rows that have no coordinates yet; -1 never matches.
+        'city': np.array([cities.setdefault((place_key(row.city), (row.state or '').upper()), len(cities))
+                          if row.city else -1 for row in rows], dtype=np.int64),
+        'seeking': np.array([bool(row[-1]) for row in rows], dtype=bool),
+    }
+
+    link_rows = connection.execute(select(links.c[owner_key], links.c.genre_id)).all()
+    genres = np.zeros((len(ids), len(genre_positions)), dtype=np.float32)
+    if link_rows:
+        owners, genre_ids = np.array([tuple(row) for row in link_rows], dtype=np.int64).T
+        genres[np.searchsorted(ids, owners), [genre_positions[genre_id] for genre_id in genre_ids]] = 1.0
+    side['genres'] = genres
+    return side
+
+
+def load_shows(connection, np, venues, artists, now):
+    """Past (venue, artist) booking counts and upcoming pairs, as sparse coordinate arrays of positions."""
+    shows = Show.__table__
+    past = select(shows.c.venue_id, shows.c.artist_id, db.func.count()).where(shows.c.start_date_time <= now) \
+        .group_by(shows.c.venue_id, shows.c.artist_id)
+    upcoming = select(shows.c.venue_id, shows.c.artist_id).where(shows.c.start_date_time > now).distinct()
+
+    def positions(rows, width):
+        array = np.array([tuple(row) for row in rows], dtype=np.int64).reshape(-1, width)
+        return np.searchsorted(venues['ids'], array[:, 0]), np.searchsorted(artists['ids'], array[:, 1]), array
+
+    venue_pos, artist_pos, array = positions(connection.execute(past).all(), 3)
+    upcoming_venue_pos, upcoming_artist_pos, _ = positions(connection.execute(upcoming).all(), 2)
+    return {'venue': venue_pos, 'artist': artist_pos, 'count': array[:, 2].astype(np.float32),
+            'upcoming_venue': upcoming_venue_pos, 'upcoming_artist': upcoming_artist_pos}
+
+
+def add_profiles(np, side, other, own_pos, other_pos, counts):
+    """Genre profile: own genres plus the average genres of the other side it has shows with,
+    scaled to unit length so a dot product is a cosine similarity. Also a 0..1 activity score."""
+    history = np.zeros_like(side['genres'])
+    np.add.at(history, own_pos, other['genres'][other_pos] * counts[:, None])
+    shows = np.zeros(len(side['ids']), dtype=np.float32)
+    np.add.at(shows, own_pos, counts)
+    profile = side['genres'] + HISTORY_WEIGHT * history / np.maximum(shows, 1)[:, None]
+    norms = np.linalg.norm(profile, axis=1)
+    side['profile'] = profile / np.where(norms > 0, norms, 1)[:, None]
+    side['activity'] = (np.log1p(shows) / math.log1p(shows.max())).astype(np.float32) if len(shows) and shows.max() \
+        else shows
+
+
+def score_block(np, owners, candidates, rows):
+    """Scores of the owners at positions `rows` against every candidate, as a len(rows) x candidates array."""
+    genre = owners['profile'][rows] @ candidates['profile'].T
+
+    lat1, lng1 = owners['latitude'][rows][:, None], owners['longitude'][rows][:, None]
+    lat2, lng2 = candidates['latitude'][None, :], candidates['longitude'][None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    same_city = (owners['city'][rows][:, None] == candidates['city'][None, :]) & (owners['city'][rows][:, None] >= 0)
+    location = np.where(np.isnan(distance), same_city, np.exp(-distance / LOCATION_SCALE_KM))
+
+    score = GENRE_WEIGHT * genre + LOCATION_WEIGHT * location + ACTIVITY_WEIGHT * candidates['activity'][None, :]
+    seeking = owners['seeking'][rows][:, None] & candidates['seeking'][None, :]
+    return (score * np.where(seeking, 1 + SEEKING_BONUS, 1.0)).astype(np.float32)
+
+
+def top_candidates(np, scores, count):
+    """(positions, scores) of the best `count` candidates of each row, best first; unusable ones are -inf."""
+    count = min(count, scores.shape[1])
+    best = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+    best_scores = np.take_along_axis(scores, best, axis=1)
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return np.take_along_axis(best, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def recommend_side(np, model, owners, candidates, owner_upcoming, candidate_upcoming, count, everything, log=None):
+    """Rewrites the recommendations of every stale owner (all of them with `everything`), a block at a time."""
+    _, _, owner_key, recommendation_model, candidate_key = SIDES[model]
+    table, recommendations = model.__table__, recommendation_model.__table__
+    stale = np.arange(len(owners['ids'])) if everything else np.flatnonzero(owners['stale'])
+    if not len(stale) or not len(candidates['ids']):
+        return 0
+
+    # Shows already booked between a pair make the recommendation moot.
+    booked = {}
+    for owner_pos, candidate_pos in zip(owner_upcoming.tolist(), candidate_upcoming.tolist()):
+        booked.setdefault(owner_pos, []).append(candidate_pos)
+
+    mark = table.update().where(table.c.id == bindparam('row_id'), table.c.version == bindparam('scored')) \
+        .values(recommended_version=bindparam('scored'))
+    block_size = max(1, BLOCK_CELLS // len(candidates['ids']))
+    for start in range(0, len(stale), block_size):
+        rows = stale[start:start + block_size]
+        scores = score_block(np, owners, candidates, rows)
+        for i, owner_pos in enumerate(rows.tolist()):
+            scores[i, booked.get(owner_pos, [])] = -np.inf
+        best, best_scores = top_candidates(np, scores, count)
+
+        owner_ids = owners['ids'][rows]
+        values = [{owner_key: int(owner_id), 'rank': rank + 1, candidate_key: int(candidates['ids'][position]),
+                   'score': round(float(score), 4)}
+                  for owner_id, positions, row_scores in zip(owner_ids, best, best_scores)
+                  for rank, (position, score) in enumerate(zip(positions, row_scores)) if score > 0]
+        with db.engine.begin() as connection:
+            connection.execute(recommendations.delete().where(
+                recommendations.c[owner_key].in_(owner_ids.tolist())))
+            if values:
+                connection.execute(recommendations.insert(), values)
+            # Only mark rows whose version is still the one scored; rows edited meanwhile stay stale.
+            connection.execute(mark, [{'row_id': owner_id, 'scored': version} for owner_id, version
+                                      in zip(owner_ids.tolist(), owners['version'][rows].tolist())])
+        if log and (start // block_size) % 50 == 0:
+            log('%s: %d of %d' % (table.name, min(start + block_size, len(stale)), len(stale)))
+    return len(stale)
+
+
+def stale_rows(connection, model):
+    table = model.__table__
+    stale = or_(table.c.recommended_version.is_(None), table.c.recommended_version != table.c.version)
+    return connection.execute(select(table.c.id).where(stale).limit(1)).first() is not None
+
+
+def recommend(count, everything=False, log=None):
+    """Recomputes venue and artist recommendations; returns {model name: owners rewritten}."""
+    try:
+        import numpy as np
+    except ImportError:
+        raise click.ClickException('flask recommend needs NumPy: pip install -r requirements-recommend.txt')
+
+    with db.engine.connect() as connection:
+        # Incremental runs are cheap when nothing changed: skip loading the whole catalog.
+        if not everything and not any(stale_rows(connection, model) for model in SIDES):
+            return {model.__name__: 0 for model in SIDES}
+        genre_ids = [row[0] for row in connection.execute(select(Genre.id).order_by(Genre.id))]
+        genre_positions = {genre_id: position for position, genre_id in enumerate(genre_ids)}
+        venues = load_side(connection, np, Venue, genre_positions)
+        artists = load_side(connection, np, Artist, genre_positions)
+        shows = load_shows(connection, np, venues, artists, get_now())
+    add_profiles(np, venues, artists, shows['venue'], shows['artist'], shows['count'])
+    add_profiles(np, artists, venues, shows['artist'], shows['venue'], shows['count'])
+
+    return {
+        'Venue': recommend_side(np, Venue, venues, artists, shows['upcoming_venue'], shows['upcoming_artist'],
+                                count, everything, log),
+        'Artist': recommend_side(np, Artist, artists, venues, shows['upcoming_artist'], shows['upcoming_venue'],
+                                 count, everything, log),
+    }
+
+
+@click.command('recommend')
+@click.option('--all', 'everything', is_flag=True,
+              help='Rescore every venue and artist, not only those changed since their last run.')
+@click.option('--count', type=int, help='Recommendations kept per venue and artist; defaults to RECOMMENDATION_COUNT.')
+@with_appcontext
+def recommend_command(everything, count):
+    """Precompute "artists for this venue" and "venues for this artist" for the detail pages.
+
+    Incremental runs only rescore venues and artists whose version changed (edits, genres, bookings);
+    run with --all now and then so everyone also sees newly added candidates.
+    """
+    started = time.monotonic()
+    counts = recommend(count or current_app.config['RECOMMENDATION_COUNT'], everything,
+                       log=lambda message: click.echo(message, err=True))
+    for name, rewritten in counts.items():
+        click.echo('%s: %d rescored' % (name, rewritten))
+    click.echo('done in %.1fs' % (time.monotonic() - started))
@@ -0,0 +1,103 @@
+import random
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import event, orm
+
+# ----------------------------------------------------------------------------#
+# Read replicas.
+# ----------------------------------------------------------------------------#
+
+# Set after a request writes; while it lives, that browser reads from the primary.
+PRIMARY_COOKIE = 'fyyur_primary'
+
+
+class RoutingSession(SignallingSession):
+    """Sends queries to the replica bind chosen for the request, and flushes to the primary."""
+
+    def get_bind(self, mapper=None, clause=None):
+        bind_key = g.get('db_bind') if has_app_context() else None
+        if bind_key is not None and not self._flushing:
+            return get_state(self.app).db.get_engine(self.app, bind=bind_key)
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def init_replicas(app):
+    """Registers SQLALCHEMY_REPLICA_URIS as binds replica_0, replica_1, ...; without any, everything
+    uses the primary."""
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    keys = []
+    for index, uri in enumerate(app.config.get('SQLALCHEMY_REPLICA_URIS') or ()):
+        keys.append('replica_%d' % index)
+        binds[keys[-1]] = uri
+    app.config['SQLALCHEMY_BINDS'] = binds
+    app.extensions['replicas'] = keys
+    if keys:
+        app.before_request(_choose_replica)
+        app.after_request(_stick_to_primary)
+    return keys
+
+
+def read_only(view):
+    """Marks a non-GET view that never writes (e.g. a search form POST), so it may read from a replica."""
+    view.read_only = True
+    return view
+
+
+def replica_for_request():
+    """A random replica bind key for a read-only request, or None when it must use the primary."""
+    keys = current_app.extensions.get('replicas')
+    if not keys or request.cookies.get(PRIMARY_COOKIE):
+        return None
+    if request.method not in ('GET', 'HEAD') \
+            and not getattr(current_app.view_functions.get(request.endpoint), 'read_only', False):
+        return None
+    return random.choice(keys)
+
+
+@contextmanager
+def primary():
+    """Reads inside the block go to the primary, e.g. to fill a cache that outlives replica lag."""
+    bind_key = g.pop('db_bind', None)
+    try:
+        yield
+    finally:
+        if bind_key is not None and not g.get('db_wrote'):
+            g.db_bind = bind_key
+
+
+def _choose_replica():
+    g.db_bind = replica_for_request()
+
+
+def _stick_to_primary(response):
+    if g.get('db_wrote'):
+        seconds = current_app.config.get('REPLICA_STICKY_SECONDS', 5)
+        response.set_cookie(PRIMARY_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+    return response
+
+
+def _mark_write():
+    # The rest of the request, and the browser's next few, read what was just written.
+    if has_request_context():
+        g.pop('db_bind', None)
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _track_write(session, flush_context):
+    _mark_write()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _track_statement_write(orm_execute_state):
+    # Core writes through session.execute() (bookings, recounts, version bumps) never flush.
+    # This runs before the bind is chosen, so the write itself also goes to the primary.
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
@@ -0,0 +1,162 @@
+from collections import defaultdict, namedtuple
+
+from flask import current_app
+from sqlalchemy import event, func, or_
+
+from genres import GENRE_MODELS
+from models import db, Genre, Venue, Venue_Genre, Artist, Artist_Genre, Catalog_Version
+from replicas import primary
+from versions import COLLECTIONS
+
+# ----------------------------------------------------------------------------#
+# Search backends.
+# ----------------------------------------------------------------------------#
+
+SearchHit = namedtuple('SearchHit', ['id', 'name'])
+
+
+class SearchBackend(object):
+    """Matches a search term against the name, city and genres of venues or artists."""
+
+    def search(self, model, term):
+        raise NotImplementedError
+
+    def invalidate(self):
+        pass
+
+
+class TrigramSearchBackend(SearchBackend):
+    """Postgres backend; the ILIKE filters are served by the pg_trgm GIN indexes."""
+
+    def search(self, model, term):
+        genre_model, genre_key = GENRE_MODELS[model]
+        pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        genre_match = db.session.query(genre_key).join(Genre, genre_model.genre_id == Genre.id) \
+            .filter(Genre.name.ilike(pattern, escape='\\'))
+
+        query = db.session.query(model.id, model.name).filter(or_(
+            model.name.ilike(pattern, escape='\\'),
+            model.city.ilike(pattern, escape='\\'),
+            model.id.in_(genre_match),
+        ))
+        if term:
+            query = query.order_by(func.similarity(model.name, term).desc(), model.name)
+        else:
+            query = query.order_by(model.name)
+        return [SearchHit(row.id, row.name) for row in query.all()]
+
+
+class NgramIndex(object):
+    """Inverted index from every 1..n character gram to the documents containing it."""
+
+    def __init__(self, n=3):
+        self.n = n
+        self.names = {}
+        self.texts = {}
+        self.postings = defaultdict(set)
+
+    def grams(self, text):
+        for size in range(1, self.n + 1):
+            for i in range(len(text) - size + 1):
+                yield text[i:i + size]
+
+    def add(self, doc_id, name, texts):
+        texts = [text.lower() for text in texts if text]
+        self.names[doc_id] = name
+        self.texts[doc_id] = texts
+        for text in texts:
+            for gram in self.grams(text):
+                self.postings[gram].add(doc_id)
+
+    def search(self, term):
+        term = term.lower()
+        if not term:
+            candidates = set(self.names)
+        elif len(term) <= self.n:
+            return set(self.postings.get(term, ()))
+        else:
+            grams = [term[i:i + self.n] for i in range(len(term) - self.n + 1)]
+            postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+            candidates = set.intersection(*postings)
+        return {doc_id for doc_id in candidates if any(term in text for text in self.texts[doc_id])}
+
+
+class MemorySearchBackend(SearchBackend):
+    """In-process fallback for SQLite/test deployments.
+
+    The index is built on first use and remembers the collection version it was built at. Every
+    search reads that version, so writes from other workers and `flask import` trigger a rebuild.
+    Commits in this process also drop it.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        # model -> (collection version, NgramIndex)
+        self.indexes = {}
+
+    def build(self, model):
+        genre_model, genre_key = GENRE_MODELS[model]
+        genres = defaultdict(list)
+        links = db.session.query(genre_key, Genre.name).join(Genre, genre_model.genre_id == Genre.id)
+        for owner_id, genre in links:
+            genres[owner_id].append(genre)
+
+        index = NgramIndex(self.n)
+        for row in db.session.query(model.id, model.name, model.city):
+            index.add(row.id, row.name, [row.name, row.city] + genres[row.id])
+        return index
+
+    def search(self, model, term):
+        # A lagging replica would report an old version, or build an index that misses rows.
+        with primary():
+            version = db.session.query(Catalog_Version.version) \
+                .filter(Catalog_Version.name == COLLECTIONS[model]).scalar()
+            entry = self.indexes.get(model)
+            if entry is None or entry[0] != version:
+                entry = self.indexes[model] = (version, self.build(model))
+        index = entry[1]
+        hits = [SearchHit(doc_id, index.names[doc_id]) for doc_id in index.search(term)]
+        return sorted(hits, key=lambda hit: (hit.name or '', hit.id))
+
+    def invalidate(self):
+        self.indexes.clear()
+
+
+BACKENDS = {
+    'postgres': TrigramSearchBackend,
+    'memory': MemorySearchBackend,
+}
+
+INDEXED_MODELS = (Venue, Venue_Genre, Artist, Artist_Genre)
+
+
+def init_search(app):
+    name = app.config.get('SEARCH_BACKEND')
+    if name is None:
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        name = 'postgres' if uri.startswith('postgres') else 'memory'
+    backend = BACKENDS[name]()
+    app.extensions['search'] = backend
+    return backend
+
+
+def get_search_backend():
+    return current_app.extensions['search']
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_indexed_changes(session, flush_context):
+    changed = any(isinstance(obj, INDEXED_MODELS) for obj in session.new | session.dirty | session.deleted)
+    if changed:
+        session.info['search_dirty'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_search(session):
+    if session.info.pop('search_dirty', False) and 'search' in current_app.extensions:
+        current_app.extensions['search'].invalidate()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_search_changes(session):
+    session.info.pop('search_dirty', None)
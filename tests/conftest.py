@@ -0,0 +1,73 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from benchmarks.catalog import EPOCH, generate
+from clock import FixedClock, init_clock
+from models import db
+
+
+class TestConfig(object):
+    """Overlay for the test apps; each test adds its own SQLite file."""
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    CACHE_REDIS_URL = None
+    SLOW_QUERY_MS = None
+    SLOW_QUERY_LOG = None
+    # An N+1 loop fails the test at the first query over budget.
+    SQL_QUERY_BUDGET_RAISE = True
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """make_app(venues, artists, shows) -> an app on a fresh SQLite file, seeded with the benchmark
+    catalog and its clock pinned to the catalog's "now". Keyword arguments override config values.
+
+    make_app(worker_of=app) is another worker process on the same database: its own caches, no seeding.
+    """
+    apps = []
+
+    def make_app(venues=0, artists=0, shows=0, seed=0, worker_of=None, **config):
+        if worker_of is not None:
+            config.setdefault('SQLALCHEMY_DATABASE_URI', worker_of.config['SQLALCHEMY_DATABASE_URI'])
+        else:
+            config.setdefault('SQLALCHEMY_DATABASE_URI', 'sqlite:///%s' % (tmp_path / ('fyyur-%d.db' % len(apps))))
+        app = create_app(type('TestConfig', (TestConfig,), config))
+        init_clock(app, FixedClock(EPOCH))
+        if worker_of is None:
+            with app.app_context():
+                db.create_all()
+                generate(db.engine, venues, artists, shows, seed)
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+@contextmanager
+def recorded_statements(app):
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def count_queries():
+    """`with count_queries(app) as statements:` collects the (SQL, parameters) the app sends to the
+    driver inside the block."""
+    return recorded_statements
@@ -0,0 +1,55 @@
+import asyncio
+from datetime import timedelta
+
+import httpx
+from a2wsgi import WSGIMiddleware
+
+from aio import AsyncReadApp
+from benchmarks.catalog import EPOCH
+from genres import set_genres
+from models import db, Venue, Artist, Show
+
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+YESTERDAY = TOMORROW - timedelta(days=2)
+
+
+def fetch_async(app, paths, headers=None):
+    async def fetch():
+        transport = httpx.ASGITransport(app=AsyncReadApp(app, WSGIMiddleware(app)))
+        async with httpx.AsyncClient(transport=transport, base_url='http://localhost') as client:
+            return [await client.get(path, headers=headers) for path in paths]
+
+    return asyncio.run(fetch())
+
+
+def test_sync_and_async_details_are_identical(make_app):
+    app = make_app(4, 6)
+    with app.app_context():
+        venue, artist = db.session.get(Venue, 1), db.session.get(Artist, 1)
+        # Genres whose link order differs from their name and id order.
+        set_genres(venue, ['Zydeco', 'Ambient', 'Jazz'])
+        set_genres(artist, ['Soul', 'Blues'])
+        # Several shows at one instant, booked in descending id order of the counterpart.
+        for artist_id in (6, 3, 5, 2):
+            db.session.add(Show(artist_id=artist_id, venue_id=1, start_date_time=TOMORROW))
+        for venue_id in (4, 2, 3):
+            db.session.add(Show(artist_id=1, venue_id=venue_id, start_date_time=YESTERDAY))
+        db.session.commit()
+
+    paths = ['/api/v1/venues/1', '/api/v1/artists/1', '/api/v1/venues/2', '/api/v1/artists/6']
+    client = app.test_client()
+    for path, response in zip(paths, fetch_async(app, paths)):
+        expected = client.get(path)
+        assert response.status_code == expected.status_code == 200
+        assert response.headers['ETag'] == expected.headers['ETag']
+        assert response.content == expected.data
+
+    # A validator from one path is honoured by the other.
+    etag = client.get(paths[0]).headers['ETag']
+    assert fetch_async(app, paths[:1], {'If-None-Match': etag})[0].status_code == 304
+
+
+def test_async_details_404(make_app):
+    app = make_app(1, 1)
+    assert [response.status_code for response in fetch_async(app, ['/api/v1/venues/9', '/api/v1/artists/9'])] == \
+        [404, 404]
@@ -0,0 +1,43 @@
+from sqlalchemy import func
+
+from clock import get_now
+from models import db, Show
+from viewmodels import single_artist
+
+
+def busiest_artist():
+    return db.session.query(Show.artist_id).group_by(Show.artist_id).order_by(func.count().desc()).limit(1).scalar()
+
+
+def test_single_artist_is_two_statements_cold_and_warm(make_app, count_queries):
+    app = make_app(20, 20, 300)
+    with app.test_request_context():
+        artist_id = busiest_artist()
+        with count_queries(app) as cold:
+            data = single_artist(artist_id)
+        # The second call finds the show partition cached and only loads the artist and genres.
+        with count_queries(app) as warm:
+            again = single_artist(artist_id)
+    assert len(cold) == 2
+    assert len(warm) == 2
+    assert again == data
+    # Genres are loaded on their own, not joined against every show.
+    shows, genres = cold
+    assert 'shows' in shows[0] and 'artist__genre' not in shows[0]
+    assert 'artist__genre' in genres[0] and 'shows' not in genres[0]
+
+
+def test_single_artist_splits_shows_at_now(make_app):
+    app = make_app(20, 20, 300)
+    with app.test_request_context():
+        artist_id = busiest_artist()
+        now = get_now()
+        past = Show.query.filter(Show.artist_id == artist_id, Show.start_date_time <= now).count()
+        upcoming = Show.query.filter(Show.artist_id == artist_id, Show.start_date_time > now).count()
+        data = single_artist(artist_id)
+    assert (data['past_shows_count'], data['upcoming_shows_count']) == (past, upcoming)
+    assert len(data['past_shows']) == past and len(data['upcoming_shows']) == upcoming
+    assert all(show['start_time'] <= now for show in data['past_shows'])
+    assert all(show['start_time'] > now for show in data['upcoming_shows'])
+    starts = [show['start_time'] for show in data['past_shows'] + data['upcoming_shows']]
+    assert starts == sorted(starts)
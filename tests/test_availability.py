@@ -0,0 +1,94 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from availability import Schedule
+from benchmarks.catalog import EPOCH
+from models import db, Show
+
+HOUR = timedelta(hours=1)
+
+
+def at(hours):
+    return EPOCH + hours * HOUR
+
+
+def interval(start, end, show_id=None):
+    return at(start), at(end), show_id
+
+
+def test_adding_shows_keeps_the_lists_consistent():
+    rng = random.Random(4)
+    shows = []
+    schedule = Schedule()
+    starts, reach = schedule.starts, schedule.reach
+    for show_id in range(300):
+        start = rng.randrange(0, 500)
+        show = interval(start, start + rng.choice((1, 2, 3, 40)), show_id)
+        shows.append(show)
+        schedule.add(*show)
+        # Shows sharing a start may sit in any order; reach is the running maximum of whatever it is.
+        assert schedule.starts == sorted(schedule.starts) == [show[0] for show in schedule.shows]
+        assert schedule.reach == list(accumulate((show[1] for show in schedule.shows), max))
+    assert sorted(schedule.shows) == Schedule(shows).shows
+    # Updated in place, not rebuilt per row.
+    assert schedule.starts is starts and schedule.reach is reach
+
+
+def test_conflicts_are_half_open():
+    schedule = Schedule([interval(10, 12, 1), interval(14, 16, 2)])
+    assert schedule.conflicts(at(12), at(14)) == []
+    assert schedule.is_free(at(8), at(10))
+    assert [show[2] for show in schedule.conflicts(at(11), at(15))] == [1, 2]
+    assert [show[2] for show in schedule.conflicts(at(15), at(20))] == [2]
+    # Empty ranges overlap nothing.
+    assert schedule.conflicts(at(11), at(11)) == []
+
+
+def test_a_long_show_is_found_behind_later_short_ones():
+    # The festival starts first and outlasts everything after it; only `reach` knows it is still on.
+    schedule = Schedule([interval(0, 30, 'festival'), interval(1, 2, 'a'), interval(3, 4, 'b')])
+    assert [show[2] for show in schedule.conflicts(at(20), at(21))] == ['festival']
+    schedule.add(*interval(5, 6, 'c'))
+    assert [show[2] for show in schedule.conflicts(at(25), at(40))] == ['festival']
+    assert schedule.is_free(at(30), at(31))
+
+
+def test_free_windows():
+    schedule = Schedule([interval(10, 12), interval(13, 14), interval(20, 22)])
+    windows = schedule.free_windows(at(9), 2 * HOUR, at(30))
+    assert windows == [(at(14), at(20)), (at(22), at(30))]
+    assert schedule.free_windows(at(9), HOUR, at(30)) == [(at(9), at(10)), (at(12), at(13)), (at(14), at(20)),
+                                                          (at(22), at(30))]
+    assert schedule.free_windows(at(9), HOUR, at(30), count=2) == [(at(9), at(10)), (at(12), at(13))]
+    assert schedule.free_windows(at(11), 20 * HOUR, at(30)) == []
+
+
+def test_free_windows_skip_the_whole_of_a_long_overlap():
+    schedule = Schedule([interval(0, 30), interval(2, 3), interval(10, 11), interval(35, 36)])
+    assert schedule.free_windows(at(5), 2 * HOUR, at(40)) == [(at(30), at(35)), (at(36), at(40))]
+
+
+def test_availability_endpoints(make_app):
+    app = make_app(2, 2)
+    with app.app_context():
+        db.session.add_all([Show(artist_id=1, venue_id=1, start_date_time=at(2), end_date_time=at(4)),
+                            Show(artist_id=2, venue_id=1, start_date_time=at(6), end_date_time=at(7))])
+        db.session.commit()
+    client = app.test_client()
+
+    data = client.get('/api/v1/venues/1/availability?start=%s&duration=90&count=2' % at(3).isoformat()).get_json()
+    assert data['free'] is False
+    assert [conflict['start_time'] for conflict in data['conflicts']] == [at(2).isoformat()]
+    horizon = at(3) + timedelta(days=30)
+    assert data['next_free'] == [{'start_time': at(4).isoformat(), 'end_time': at(6).isoformat()},
+                                 {'start_time': at(7).isoformat(), 'end_time': horizon.isoformat()}]
+
+    # start defaults to the clock's now.
+    data = client.get('/api/v1/artists/2/availability').get_json()
+    assert data['start_time'] == EPOCH.isoformat() and data['free'] is True
+
+    assert client.get('/api/v1/venues/99/availability').status_code == 404
+    assert client.get('/api/v1/venues/1/availability?duration=0').status_code == 400
+    assert client.get('/api/v1/venues/1/availability?start=never').status_code == 400
+    assert client.get('/api/v1/artists/1/availability?count=x').status_code == 400
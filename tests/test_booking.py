@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from benchmarks.catalog import EPOCH
+from booking import book_shows
+from models import db, Venue, Artist, Show, Catalog_Version
+
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+
+
+def booking(artist_id, venue_id, start, duration=None):
+    return {"artist_id": artist_id, "venue_id": venue_id, "start_time": str(start), "duration": duration}
+
+
+def shows_version():
+    return db.session.query(Catalog_Version.version).filter(Catalog_Version.name == 'shows').scalar()
+
+
+def test_batch_is_one_multi_row_insert(make_app, count_queries):
+    app = make_app(3, 3)
+    with app.test_request_context():
+        with count_queries(app) as statements:
+            results = book_shows([booking(1, 1, TOMORROW), booking(2, 2, TOMORROW), booking(3, 3, TOMORROW)])
+        assert [result['status'] for result in results] == ['created'] * 3
+        assert Show.query.count() == 3
+    inserts = [statement for statement, _ in statements if statement.startswith('INSERT INTO shows')]
+    assert len(inserts) == 1
+
+
+def test_batch_rejects_invalid_duplicate_and_overlapping_rows_with_reasons(make_app):
+    app = make_app(3, 3)
+    with app.test_request_context():
+        book_shows([booking(1, 1, TOMORROW)])
+        results = book_shows([
+            booking(1, 1, TOMORROW),
+            booking(1, 2, TOMORROW + timedelta(hours=1)),
+            booking(2, 1, TOMORROW + timedelta(minutes=30)),
+            booking(99, 1, 'soon'),
+            booking(2, 2, TOMORROW, duration=0),
+            booking(1, 1, TOMORROW + timedelta(hours=2)),
+        ])
+    assert results[0] == {"status": "duplicate", "errors": ['Show is already listed']}
+    assert results[1] == {"status": "conflict", "errors": ['Artist is already booked at this time']}
+    assert results[2] == {"status": "conflict", "errors": ['Venue is already booked at this time']}
+    assert results[3]["status"] == "invalid" and results[3]["errors"][0] == 'Invalid start time'
+    assert results[4] == {"status": "invalid", "errors": ['Duration must be between 1 and 1440 minutes']}
+    # Shows are half-open: one that starts as the last one ends doesn't overlap it.
+    assert results[5]["status"] == "created"
+
+
+def test_rows_in_one_batch_see_each_other(make_app):
+    app = make_app(3, 3)
+    with app.test_request_context():
+        results = book_shows([
+            booking(1, 1, TOMORROW),
+            booking(1, 1, TOMORROW),
+            booking(1, 2, TOMORROW + timedelta(hours=1)),
+            booking(2, 1, TOMORROW + timedelta(hours=1)),
+            booking(2, 2, TOMORROW + timedelta(hours=1)),
+        ])
+        assert Show.query.count() == 2
+    assert [result['status'] for result in results] == ['created', 'duplicate', 'conflict', 'conflict', 'created']
+
+
+def test_batch_updates_counters_and_versions(make_app):
+    app = make_app(3, 3)
+    with app.test_request_context():
+        venue_version, artist_version = db.session.get(Venue, 1).version, db.session.get(Artist, 2).version
+        collection_version = shows_version()
+        db.session.remove()
+        book_shows([booking(2, 1, TOMORROW), booking(2, 1, TOMORROW + timedelta(days=1))])
+
+        venue, artist = db.session.get(Venue, 1), db.session.get(Artist, 2)
+        assert (venue.upcoming_show_count, venue.next_show_at) == (2, TOMORROW)
+        assert (artist.upcoming_show_count, artist.next_show_at) == (2, TOMORROW)
+        assert venue.version == venue_version + 1 and artist.version == artist_version + 1
+        assert shows_version() == collection_version + 1
+        assert db.session.get(Venue, 2).upcoming_show_count == 0
+
+
+def test_batch_endpoint_takes_json_and_form_lines(make_app):
+    client = make_app(3, 3).test_client()
+    response = client.post('/shows/batch', json=[booking(1, 1, TOMORROW), booking(1, 1, TOMORROW)])
+    assert [result['status'] for result in response.get_json()['results']] == ['created', 'duplicate']
+    assert client.post('/shows/batch', json={"artist_id": 1}).status_code == 400
+
+    lines = '2, 2, %s\n\n3, 3, not a date\n' % TOMORROW.isoformat()
+    response = client.post('/shows/batch', data={'bookings': lines})
+    assert b'1 of 2 shows were listed.' in response.data
+
+
+def test_show_schema_constraints(make_app):
+    app = make_app(3, 3)
+    with app.app_context():
+        assert Show.__table__.c.id.primary_key
+        show = Show(artist_id=1, venue_id=1, start_date_time=TOMORROW)
+        db.session.add(show)
+        db.session.commit()
+        assert show.id is not None and show.end_date_time == TOMORROW + timedelta(hours=2)
+
+        db.session.add(Show(artist_id=1, venue_id=1, start_date_time=TOMORROW))
+        with pytest.raises(IntegrityError, match='UNIQUE'):
+            db.session.commit()
+        db.session.rollback()
+
+        db.session.add(Show(artist_id=2, venue_id=2, start_date_time=TOMORROW, end_date_time=TOMORROW - timedelta(1)))
+        with pytest.raises(IntegrityError, match='ck_shows_end_after_start'):
+            db.session.commit()
+        db.session.rollback()
@@ -0,0 +1,110 @@
+from datetime import timedelta, timezone
+
+import pytest
+
+from benchmarks.catalog import EPOCH
+from calendars import ical_line, ical_text
+from models import db, Venue, Artist, Show
+
+FROM = EPOCH.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+TO = FROM + timedelta(days=1)
+
+
+def shows_in(client, path):
+    return [show['id'] for show in client.get(path).get_json()['shows']]
+
+
+def unfold(body):
+    return body.replace('\r\n ', '').split('\r\n')
+
+
+def test_range_includes_shows_overlapping_it(make_app):
+    app = make_app(2, 3)
+    with app.app_context():
+        shows = [
+            Show(artist_id=1, venue_id=1, start_date_time=FROM - timedelta(hours=3),
+                 end_date_time=FROM + timedelta(hours=1)),
+            Show(artist_id=2, venue_id=1, start_date_time=FROM - timedelta(hours=2), end_date_time=FROM),
+            Show(artist_id=3, venue_id=1, start_date_time=FROM + timedelta(hours=20)),
+            Show(artist_id=1, venue_id=1, start_date_time=TO),
+            Show(artist_id=2, venue_id=2, start_date_time=FROM + timedelta(hours=12)),
+        ]
+        db.session.add_all(shows)
+        db.session.commit()
+        ids = [show.id for show in shows]
+    client = app.test_client()
+    query = '?from=%s&to=%s' % (FROM.isoformat(), TO.isoformat())
+    # Half-open: the show still on at `from` is in, the one ending at it and the one starting at `to` are out.
+    assert shows_in(client, '/venues/1/calendar' + query) == [ids[0], ids[2]]
+    assert shows_in(client, '/artists/2/calendar' + query) == [ids[4]]
+    assert shows_in(client, '/calendar' + query) == [ids[0], ids[4], ids[2]]
+
+    data = client.get('/calendar').get_json()
+    assert data['from'] == (FROM - timedelta(days=31)).isoformat()
+    assert data['to'] == (FROM + timedelta(days=364)).isoformat()
+    assert len(data['shows']) == 5
+
+
+@pytest.mark.parametrize('query', ['from=yesterday', 'from=2024-06-02&to=2024-06-01', 'from=2024-06-01&to=2024-06-01',
+                                   'from=2020-01-01&to=2024-01-01'])
+def test_bad_ranges_are_400(make_app, query):
+    assert make_app(1, 1).test_client().get('/calendar?' + query).status_code == 400
+
+
+def test_missing_owner_calendars_are_404(make_app):
+    client = make_app(1, 1).test_client()
+    assert client.get('/venues/9/calendar.ics').status_code == 404
+    assert client.get('/artists/9/calendar').status_code == 404
+
+
+def test_ical_text_escaping():
+    assert ical_text('Rock; Roll, \\ and\nmore\r\nstill\rend') == 'Rock\\; Roll\\, \\\\ and\\nmore\\nstill\\nend'
+
+
+@pytest.mark.parametrize('value', ['x' * 200, 'é' * 100, 'a' + '€' * 80, 'short'])
+def test_ical_lines_fold_at_75_octets(value):
+    line = ical_line('SUMMARY', value)
+    assert line.endswith('\r\n')
+    physical = line[:-2].split('\r\n')
+    assert all(len(part.encode('utf-8')) <= 75 for part in physical)
+    assert all(part.startswith(' ') for part in physical[1:])
+    # Unfolding gives back the value; a multi-byte character is never split across lines.
+    assert unfold(line) == ['SUMMARY:' + value, '']
+
+
+def test_ical_feed(make_app):
+    app = make_app(1, 1)
+    with app.app_context():
+        venue, artist = db.session.get(Venue, 1), db.session.get(Artist, 1)
+        venue.name, venue.address = 'Café; Bar, Grill', '1 Main St'
+        artist.name = ' '.join(['Ünïcødé'] * 12)
+        db.session.add(Show(artist_id=1, venue_id=1, start_date_time=FROM + timedelta(hours=20)))
+        db.session.commit()
+        name, city, state = artist.name, venue.city, venue.state
+    response = app.test_client().get('/venues/1/calendar.ics?from=%s&to=%s' % (FROM.isoformat(), TO.isoformat()))
+    assert response.mimetype == 'text/calendar'
+    body = response.get_data(as_text=True)
+    assert all(len(line.encode('utf-8')) <= 75 for line in body.split('\r\n'))
+
+    lines = unfold(body)
+    assert lines[0] == 'BEGIN:VCALENDAR' and lines[-2:] == ['END:VCALENDAR', '']
+    assert 'X-WR-CALNAME:Fyyur: Café\\; Bar\\, Grill' in lines
+    assert 'SUMMARY:%s at Café\\; Bar\\, Grill' % name in lines
+    assert 'LOCATION:Café\\; Bar\\, Grill\\, 1 Main St\\, %s\\, %s' % (city, state) in lines
+    start = (FROM + timedelta(hours=20)).astimezone(timezone.utc)
+    assert 'DTSTART:' + start.strftime('%Y%m%dT%H%M%SZ') in lines
+    assert 'DTEND:' + (start + timedelta(hours=2)).strftime('%Y%m%dT%H%M%SZ') in lines
+    assert lines.count('BEGIN:VEVENT') == 1
+
+
+def test_calendar_revalidates_without_reading_shows(make_app, count_queries):
+    app = make_app(3, 3, 20)
+    client = app.test_client()
+    response = client.get('/venues/1/calendar.ics')
+    with count_queries(app) as statements:
+        again = client.get('/venues/1/calendar.ics', headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304 and len(statements) == 1
+    # The range is part of the ETag.
+    other = client.get('/venues/1/calendar.ics?from=%s' % FROM.isoformat(),
+                       headers={'If-None-Match': response.headers['ETag']})
+    assert other.status_code == 200
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import EPOCH
+from clock import FixedClock
+from models import db, Venue, Artist, Show
+
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+
+
+def revalidate(app, count_queries, path, response):
+    """Status and statements of a request that sends back `response`'s ETag."""
+    with count_queries(app) as statements:
+        again = app.test_client().get(path, headers={'If-None-Match': response.headers['ETag']})
+    return again, statements
+
+
+@pytest.mark.parametrize('path', ['/api/v1/venues/1', '/api/v1/artists/1', '/api/v1/venues', '/api/v1/artists',
+                                  '/api/v1/shows'])
+def test_304_comes_from_the_versions_alone(make_app, count_queries, path):
+    app = make_app(5, 5, 20)
+    response = app.test_client().get(path)
+    assert response.status_code == 200
+    assert response.headers['ETag'] and response.headers['Last-Modified']
+    assert 'no-cache' in response.headers['Cache-Control']
+
+    again, statements = revalidate(app, count_queries, path, response)
+    assert again.status_code == 304 and again.data == b''
+    assert again.headers['ETag'] == response.headers['ETag']
+    # Only the version row(s) were read; nothing was rendered.
+    assert len(statements) == 1
+
+    since = app.test_client().get(path, headers={'If-Modified-Since': response.headers['Last-Modified']})
+    assert since.status_code == 304
+
+
+def test_writes_change_the_etag(make_app, count_queries):
+    app = make_app(3, 3)
+    client = app.test_client()
+    venue, venues = client.get('/api/v1/venues/1'), client.get('/api/v1/venues')
+    with app.app_context():
+        db.session.get(Venue, 1).name = 'Renamed Hall'
+        db.session.commit()
+    for path, response in (('/api/v1/venues/1', venue), ('/api/v1/venues', venues)):
+        again, _ = revalidate(app, count_queries, path, response)
+        assert again.status_code == 200 and again.headers['ETag'] != response.headers['ETag']
+    assert 'Renamed Hall' in again.get_data(as_text=True)
+
+
+def test_counterpart_names_and_bookings_change_the_etag(make_app, count_queries):
+    app = make_app(3, 3)
+    client = app.test_client()
+    with app.app_context():
+        db.session.add(Show(artist_id=2, venue_id=1, start_date_time=TOMORROW))
+        db.session.commit()
+    venue = client.get('/api/v1/venues/1')
+    with app.app_context():
+        # The artist's name is on the venue's show tile.
+        db.session.get(Artist, 2).name = 'Renamed Artist'
+        db.session.commit()
+    again, _ = revalidate(app, count_queries, '/api/v1/venues/1', venue)
+    assert again.status_code == 200
+    assert again.get_json()['upcoming_shows'][0]['artist_name'] == 'Renamed Artist'
+
+    client.post('/shows/batch', json=[{'artist_id': 3, 'venue_id': 1, 'start_time': str(TOMORROW + timedelta(days=1))}])
+    assert revalidate(app, count_queries, '/api/v1/venues/1', again)[0].status_code == 200
+
+
+def test_etag_changes_when_a_show_starts(make_app, count_queries):
+    app = make_app(3, 3)
+    with app.app_context():
+        db.session.add(Show(artist_id=1, venue_id=1, start_date_time=TOMORROW))
+        db.session.commit()
+    client = app.test_client()
+    responses = {path: client.get(path) for path in ('/api/v1/venues/1', '/api/v1/venues', '/api/v1/artists/1')}
+    app.extensions['clock'] = FixedClock(TOMORROW)
+    for path, response in responses.items():
+        again, _ = revalidate(app, count_queries, path, response)
+        assert again.status_code == 200, path
+    assert again.get_json()['past_shows_count'] == 1
+    # A detail page with no shows doesn't change.
+    artist = client.get('/api/v1/artists/2')
+    assert revalidate(app, count_queries, '/api/v1/artists/2', artist)[0].status_code == 304
+
+
+def test_missing_entities_are_404_whatever_the_validator(make_app):
+    client = make_app(1, 1).test_client()
+    assert client.get('/api/v1/venues/9', headers={'If-None-Match': '*'}).status_code == 404
+    assert client.get('/api/v1/artists/9').status_code == 404
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from benchmarks.catalog import EPOCH
+from clock import FixedClock
+from counters import find_drift
+from models import db, Venue, Artist, Show
+
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+
+
+def counters(model, entity_id):
+    row = db.session.get(model, entity_id)
+    db.session.refresh(row)
+    return row.upcoming_show_count, row.past_show_count, row.next_show_at
+
+
+def drift(app):
+    with app.app_context(), db.engine.connect() as connection:
+        return find_drift(connection, Venue), find_drift(connection, Artist)
+
+
+def run(app, *args):
+    result = app.test_cli_runner().invoke(args=['recount'] + list(args))
+    assert result.exit_code == 0, result.output
+    return result.stdout.splitlines()
+
+
+def test_orm_writes_keep_both_sides_counters_exact(make_app):
+    app = make_app(3, 3)
+    with app.app_context():
+        show = Show(artist_id=1, venue_id=1, start_date_time=TOMORROW)
+        db.session.add_all([show, Show(artist_id=2, venue_id=1, start_date_time=EPOCH - timedelta(days=1))])
+        db.session.commit()
+        show_id = show.id
+        assert counters(Venue, 1) == (1, 1, TOMORROW)
+        assert counters(Artist, 1) == (1, 0, TOMORROW)
+    client = app.test_client()
+    assert client.get('/api/v1/venues/1').get_json()['upcoming_shows_count'] == 1
+
+    with app.app_context():
+        # Moving an expired show recounts the side it left as well as the one it joined.
+        show = db.session.get(Show, show_id)
+        db.session.expire(show)
+        show.venue_id = 2
+        db.session.commit()
+        assert counters(Venue, 1) == (0, 1, None)
+        assert counters(Venue, 2) == (1, 0, TOMORROW)
+    # The venue's cached show partition went with it.
+    assert client.get('/api/v1/venues/1').get_json()['upcoming_shows_count'] == 0
+
+    with app.app_context():
+        db.session.delete(db.session.get(Show, show_id))
+        db.session.commit()
+        assert counters(Venue, 2) == (0, 0, None) and counters(Artist, 1) == (0, 0, None)
+    assert drift(app) == ([], [])
+
+
+def test_recount_finds_and_repairs_drift(make_app):
+    app = make_app(5, 5, 40)
+    assert drift(app) == ([], [])
+    with app.app_context(), db.engine.begin() as connection:
+        # Core writes that skip the recount, as a hand-edited database would.
+        connection.execute(Venue.__table__.update().where(Venue.id.in_([2, 4])).values(upcoming_show_count=99))
+        connection.execute(Artist.__table__.update().where(Artist.id == 3).values(next_show_at=TOMORROW))
+    assert drift(app) == ([2, 4], [3])
+
+    assert run(app, '--dry-run') == ['Venue: 2 drifted [2, 4]', 'Artist: 1 drifted [3]']
+    assert drift(app) == ([2, 4], [3])
+    run(app)
+    assert drift(app) == ([], [])
+    assert run(app) == ['Venue: 0 drifted', 'Artist: 0 drifted']
+
+
+def test_recount_due_only_touches_rows_whose_next_show_started(make_app):
+    app = make_app(3, 3)
+    with app.app_context():
+        db.session.add_all([Show(artist_id=1, venue_id=1, start_date_time=TOMORROW),
+                            Show(artist_id=1, venue_id=1, start_date_time=TOMORROW + timedelta(days=7)),
+                            Show(artist_id=2, venue_id=2, start_date_time=TOMORROW + timedelta(days=3))])
+        db.session.commit()
+
+    # A day later the first show has started: venue 1 and artist 1 are due, the others not yet.
+    app.extensions['clock'] = FixedClock(TOMORROW + timedelta(hours=1))
+    assert drift(app) == ([1], [1])
+    assert run(app, '--due', '--dry-run') == ['Venue: 1 due [1]', 'Artist: 1 due [1]']
+    assert drift(app) == ([1], [1])
+    run(app, '--due')
+    assert drift(app) == ([], [])
+    with app.app_context():
+        assert counters(Venue, 1) == (1, 1, TOMORROW + timedelta(days=7))
+        assert counters(Venue, 2) == (1, 0, TOMORROW + timedelta(days=3))
+    assert run(app, '--due') == ['Venue: 0 due', 'Artist: 0 due']
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+
+from exporter import EXPORT_COLUMNS
+from models import db, Artist, Show
+
+
+def expected_shows(since=None):
+    query = Show.query.order_by(Show.start_date_time, Show.artist_id, Show.venue_id)
+    if since is not None:
+        query = query.filter(Show.start_date_time >= since)
+    return [(show.start_date_time.isoformat(), show.artist_id, show.venue_id) for show in query]
+
+
+def test_csv_export_streams_every_show_in_order(make_app):
+    app = make_app(50, 50, 3000)
+    with app.app_context():
+        db.session.get(Artist, 1).name = 'Smith, "Junior"\nand band'
+        db.session.commit()
+        expected = expected_shows()
+    response = app.test_client().get('/shows/export')
+    assert response.is_streamed and response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=shows.csv'
+    # Written out in chunks of about 64KB, not built up in memory.
+    chunks = [chunk for chunk in response.response if chunk]
+    assert len(chunks) > 2 and all(len(chunk) < 70 * 1024 for chunk in chunks)
+
+    header, *rows = csv.reader(io.StringIO(b''.join(chunks).decode()))
+    assert header == EXPORT_COLUMNS
+    assert [(row[0], int(row[2]), int(row[4])) for row in rows] == expected
+    assert 'Smith, "Junior"\nand band' in {row[3] for row in rows}
+
+
+def test_json_lines_export_and_since(make_app):
+    app = make_app(10, 10, 100)
+    with app.app_context():
+        everything = expected_shows()
+        since = Show.query.order_by(Show.start_date_time).offset(40).first().start_date_time
+        expected = expected_shows(since)
+    client = app.test_client()
+    for fmt, mimetype in (('jsonl', 'application/jsonl'), ('ndjson', 'application/x-ndjson')):
+        response = client.get('/shows/export?format=%s&since=%s' % (fmt, since.isoformat()))
+        assert response.mimetype == mimetype
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert set(records[0]) == set(EXPORT_COLUMNS)
+        assert [(record['start_date_time'], record['artist_id'], record['venue_id']) for record in records] == expected
+    # `since` is inclusive: the show starting at it is in.
+    assert expected[0][0] == since.isoformat() and len(expected) < len(everything)
+
+    assert client.get('/shows/export?format=xml').status_code == 400
+    assert client.get('/shows/export?since=not-a-date').status_code == 400
+
+
+def test_export_command(make_app, tmp_path):
+    app = make_app(5, 5, 30)
+    with app.app_context():
+        since = Show.query.order_by(Show.start_date_time).offset(10).first().start_date_time
+        expected = expected_shows(since)
+    output = tmp_path / 'shows.jsonl'
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['export', '--format', 'jsonl', '--since', since.isoformat(), '-o', str(output)])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [(record['start_date_time'], record['artist_id'], record['venue_id']) for record in records] == expected
+
+    result = runner.invoke(args=['export', '--since', 'whenever'])
+    assert result.exit_code == 2 and 'not a date/time' in result.stderr
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import babel.dates
+import pytest
+
+from app import DATETIME_FORMATS, format_datetime
+
+TIMES = [datetime(2024, 6, 1, 20, 5), datetime(2019, 12, 31, 0, 0), datetime(2025, 2, 9, 12, 30, 45)]
+
+
+def unmemoized(value, format):
+    """The filter as it was before patterns were cached: Babel formats the string every time."""
+    return babel.dates.format_datetime(value, DATETIME_FORMATS.get(format, format), locale='en')
+
+
+@pytest.mark.parametrize('format', ['short', 'medium', 'long', 'full', 'yyyy-MM-dd HH:mm', "EEE 'at' h a"])
+def test_datetime_filter_matches_babel(format):
+    for value in TIMES:
+        assert format_datetime(value, format) == unmemoized(value, format)
+        assert format_datetime(str(value), format) == unmemoized(value, format)
+
+
+def test_named_formats_are_not_parsed_as_patterns():
+    assert format_datetime(TIMES[0], 'short') == '6/1/24, 8:05 PM'
+    assert format_datetime(TIMES[0]) == 'Sat 06, 01, 2024 8:05PM'
@@ -0,0 +1,74 @@
+from genres import set_genres
+from models import db, Genre, Venue, Venue_Genre, Artist
+
+
+def genre_names(owner):
+    return sorted(link.genre.name for link in owner.genres)
+
+
+def test_set_genres_only_touches_the_difference(make_app):
+    app = make_app()
+    with app.app_context():
+        venue = Venue(name='Cactus Cafe', city='Austin', state='TX')
+        set_genres(venue, ['Jazz', 'Blues', 'Jazz'])
+        db.session.add(venue)
+        db.session.commit()
+        assert genre_names(venue) == ['Blues', 'Jazz']
+        jazz = next(link for link in venue.genres if link.genre.name == 'Jazz')
+        jazz_id, genre_count = jazz.id, Genre.query.count()
+
+        set_genres(venue, ['Folk', 'Jazz'])
+        db.session.commit()
+        assert genre_names(venue) == ['Folk', 'Jazz']
+        # The kept link is the same row; the dropped one is deleted, not orphaned.
+        assert next(link.id for link in venue.genres if link.genre.name == 'Jazz') == jazz_id
+        assert Venue_Genre.query.filter_by(venue_id=venue.id).count() == 2
+        # Existing genres are reused.
+        assert Genre.query.count() == genre_count + 1
+
+        set_genres(venue, [])
+        db.session.commit()
+        assert Venue_Genre.query.filter_by(venue_id=venue.id).count() == 0
+
+
+def test_set_genres_bumps_the_owner_version(make_app):
+    app = make_app()
+    with app.app_context():
+        artist = Artist(name='Ruby Lark', city='Austin', state='TX')
+        set_genres(artist, ['Folk'])
+        db.session.add(artist)
+        db.session.commit()
+        version = artist.version
+        set_genres(artist, ['Folk'])
+        db.session.commit()
+        assert artist.version == version
+        set_genres(artist, ['Folk', 'Soul'])
+        db.session.commit()
+        assert artist.version == version + 1
+
+
+def venue_ids(client, query):
+    data = client.get('/api/v1/venues?per_page=100&' + query).get_json()
+    return sorted(venue['id'] for area in data['areas'] for venue in area['venues'])
+
+
+def test_genre_filter_matches_any_case_and_requires_every_genre(make_app):
+    app = make_app(30, 10)
+    with app.app_context():
+        def owners(name):
+            return sorted(link.venue_id for link in Venue_Genre.query.join(Genre).filter(Genre.name == name))
+
+        jazz, blues = owners('Jazz'), owners('Blues')
+        assert jazz and blues
+        # Names differing only in case are separate genres; the filter matches them all.
+        venue = Venue(name='Lowercase Lounge', city='Austin', state='TX')
+        venue.genres = [Venue_Genre(genre=Genre(name='jazz'))]
+        db.session.add(venue)
+        db.session.commit()
+        lowercase = venue.id
+    client = app.test_client()
+    assert venue_ids(client, 'genre=Jazz') == sorted(jazz + [lowercase])
+    assert venue_ids(client, 'genre=JAZZ') == sorted(jazz + [lowercase])
+    assert venue_ids(client, 'genre=Jazz&genre=Blues') == sorted(set(jazz) & set(blues))
+    assert venue_ids(client, 'genre=Polka') == []
+    assert venue_ids(client, 'genre=+') == venue_ids(client, '')
@@ -0,0 +1,103 @@
+import math
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import EPOCH
+from geocoding import EARTH_RADIUS_KM, bounding_box, distance_km
+from models import db, Venue, Show
+
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+
+
+def destination(latitude, longitude, bearing, km):
+    """The point `km` away along `bearing` degrees, longitude normalized to [-180, 180)."""
+    lat1, lng1, theta, angle = math.radians(latitude), math.radians(longitude), math.radians(bearing), \
+        km / EARTH_RADIUS_KM
+    lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(theta))
+    lng2 = lng1 + math.atan2(math.sin(theta) * math.sin(angle) * math.cos(lat1),
+                             math.cos(angle) - math.sin(lat1) * math.sin(lat2))
+    return math.degrees(lat2), (math.degrees(lng2) + 540.0) % 360.0 - 180.0
+
+
+def inside(box, latitude, longitude, slack=1e-9):
+    south, north, ranges = box
+    return south - slack <= latitude <= north + slack and \
+        any(west - slack <= longitude <= east + slack for west, east in ranges)
+
+
+def test_distance_km():
+    assert distance_km(51.5074, -0.1278, 48.8566, 2.3522) == pytest.approx(343.5, abs=0.5)
+    assert distance_km(10, 20, 10, 20) == 0
+    # Across the antimeridian the short way round.
+    assert distance_km(0, 179.5, 0, -179.5) == pytest.approx(111.2, abs=0.1)
+    assert distance_km(90, 0, -90, 0) == pytest.approx(math.pi * EARTH_RADIUS_KM)
+
+
+@pytest.mark.parametrize('latitude, longitude, radius_km', [
+    (30.27, -97.74, 25), (0, 0, 500), (-33.87, 151.21, 300),
+    (-17.7, 179.9, 200), (64.0, -179.95, 80), (10.0, -179.0, 400),
+    (89.5, 45, 100), (-89.9, -120, 30), (88.0, 0, 250),
+])
+def test_bounding_box_holds_the_whole_circle(latitude, longitude, radius_km):
+    box = bounding_box(latitude, longitude, radius_km)
+    south, north, ranges = box
+    assert -90 <= south <= north <= 90
+    assert all(-180 <= west <= east <= 180 for west, east in ranges)
+    for bearing in range(0, 360, 5):
+        for fraction in (0.5, 0.999):
+            point = destination(latitude, longitude, bearing, radius_km * fraction)
+            assert inside(box, *point), (bearing, fraction, point)
+
+
+def test_bounding_box_splits_at_the_antimeridian():
+    south, north, ranges = bounding_box(-17.7, 179.9, 200)
+    (west, end), (start, east) = ranges
+    assert end == 180.0 and start == -180.0
+    assert 177 < west < 179.9 and -180 < east < -177
+    assert bounding_box(-17.7, -179.9, 200)[2][1][0] == -180.0
+
+
+def test_bounding_box_covers_every_longitude_at_a_pole():
+    assert bounding_box(89.9, 10, 50) == (pytest.approx(89.9 - math.degrees(50 / EARTH_RADIUS_KM)), 90.0,
+                                          [(-180.0, 180.0)])
+    assert bounding_box(-89.99, 0, 5)[0] == -90.0
+    # Not touching the pole but wide enough to wrap all the way round.
+    assert bounding_box(86, 0, 500)[2] == [(-180.0, 180.0)]
+    assert len(bounding_box(85, 0, 500)[2]) == 1
+    assert len(bounding_box(60, 0, 500)[2]) == 1
+
+
+def add_venue(name, latitude, longitude):
+    venue = Venue(name=name, city='Suva', state='FJ', latitude=latitude, longitude=longitude)
+    db.session.add(venue)
+    db.session.flush()
+    db.session.add(Show(artist_id=1, venue_id=venue.id, start_date_time=TOMORROW))
+    return venue
+
+
+def test_nearby_venues_across_the_antimeridian(make_app):
+    app = make_app(0, 1)
+    center = (-17.0, 179.9)
+    with app.app_context():
+        ids = {}
+        for name, (bearing, km) in {'east': (90, 40), 'west': (270, 10), 'north': (0, 95),
+                                    'corner': (45, 130), 'far': (180, 300)}.items():
+            ids[name] = add_venue(name, *destination(*center, bearing, km)).id
+        quiet = Venue(name='quiet', city='Suva', state='FJ', latitude=center[0], longitude=center[1])
+        db.session.add(quiet)
+        db.session.commit()
+        # The corner venue is inside the bounding box but outside the circle.
+        assert inside(bounding_box(*center, 100), *destination(*center, 45, 130))
+
+    client = app.test_client()
+    data = client.get('/api/v1/venues/nearby?lat=%s&lng=%s&radius=100' % center).get_json()
+    # Nearest first, on both sides of 180°; only venues with upcoming shows.
+    assert [row['id'] for row in data['data']] == [ids['west'], ids['east'], ids['north']]
+    assert [row['distance_km'] for row in data['data']] == pytest.approx([10, 40, 95], abs=0.01)
+    assert data['count'] == 3
+    assert client.get('/api/v1/venues/nearby?lat=%s&lng=%s&radius=100&limit=1' % center).get_json()['count'] == 1
+
+    for query in ('lat=-17', 'lat=91&lng=0', 'lat=0&lng=181', 'lat=0&lng=0&radius=0', 'lat=0&lng=0&radius=501',
+                  'lat=x&lng=0'):
+        assert client.get('/api/v1/venues/nearby?' + query).status_code == 400
@@ -0,0 +1,91 @@
+import json
+from datetime import timedelta
+
+import importer
+from availability import BookingIndex
+from benchmarks.catalog import EPOCH
+from counters import find_drift
+from importer import allocate_ids, write_shows
+from models import db, Venue, Artist, Show
+
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+
+VENUE_HEADER = 'name,city,state,address,phone,genres,image_link,facebook_link,website_link\n'
+VENUE_LINE = '%s,Austin,TX,1 Main St,%s,Jazz;Blues,https://example.com/a.jpg,https://www.facebook.com/a,' \
+             'https://example.com\n'
+
+
+def run_import(app, tmp_path, kind, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    result = app.test_cli_runner().invoke(args=['import', kind, str(path), '--batch-size', '2'])
+    assert result.exception is None, result.output
+    return result
+
+
+def test_import_writes_valid_rows_and_reports_rejects_by_line(make_app, tmp_path):
+    app = make_app()
+    content = VENUE_HEADER + VENUE_LINE % ('Cactus Cafe', '5125550100') + VENUE_LINE % ('No Phone', '') \
+        + VENUE_LINE % ('Elephant Room', 'not a number') + VENUE_LINE % ('Continental Club', '5125550101')
+    result = run_import(app, tmp_path, 'venues', 'venues.csv', content)
+    assert 'line 3 rejected' in result.stderr and 'line 4 rejected' in result.stderr
+    assert 'Invalid Phone Number' in result.stderr
+    assert 'venues: 2 rows written, 2 rejected' in result.stdout
+    with app.app_context():
+        venues = Venue.query.order_by(Venue.id).all()
+        assert [venue.name for venue in venues] == ['Cactus Cafe', 'Continental Club']
+        assert sorted(link.genre.name for link in venues[0].genres) == ['Blues', 'Jazz']
+
+
+def test_allocate_ids_continues_after_the_highest_id(make_app):
+    app = make_app(5, 3)
+    with app.app_context(), db.engine.begin() as connection:
+        assert allocate_ids(connection, Venue.__table__, 3) == [6, 7, 8]
+        assert allocate_ids(connection, Artist.__table__, 1) == [4]
+
+
+def test_show_import_rejects_duplicates_and_overlaps_and_recounts(make_app, tmp_path):
+    app = make_app(3, 3)
+    lines = [
+        {"artist_id": 1, "venue_id": 1, "start_time": str(TOMORROW), "duration": 120},
+        {"artist_id": 1, "venue_id": 1, "start_time": str(TOMORROW), "duration": 120},
+        {"artist_id": 2, "venue_id": 1, "start_time": str(TOMORROW + timedelta(hours=1))},
+        {"artist_id": 2, "venue_id": 2, "start_time": str(TOMORROW)},
+        {"artist_id": 9, "venue_id": 2, "start_time": str(TOMORROW)},
+    ]
+    result = run_import(app, tmp_path, 'shows', 'shows.jsonl', ''.join(json.dumps(line) + '\n' for line in lines))
+    assert "line 2 rejected: {'start_time': ['Show is already listed']}" in result.stderr
+    assert "line 3 rejected: {'venue_id': ['Venue is already booked from" in result.stderr
+    assert "line 5 rejected: {'artist_id': ['Unknown id 9']}" in result.stderr
+    assert 'shows: 2 rows written, 3 rejected' in result.stdout
+    with app.app_context():
+        assert Show.query.count() == 2
+        assert db.session.get(Venue, 1).upcoming_show_count == 1
+        assert find_drift(db.session, Venue) == [] and find_drift(db.session, Artist) == []
+
+
+def test_shows_booked_during_an_import_are_skipped(make_app, monkeypatch):
+    app = make_app(3, 3)
+    with app.app_context():
+        db.session.add(Show(artist_id=1, venue_id=1, start_date_time=TOMORROW))
+        db.session.commit()
+    # The index was loaded before the booking above committed, so only INSERT OR IGNORE catches it.
+    monkeypatch.setattr(importer, 'BookingIndex', lambda rows, connection: BookingIndex([]))
+    batch = [(1, {"artist_id": 1, "venue_id": 1, "start_time": TOMORROW, "duration": None}),
+             (2, {"artist_id": 2, "venue_id": 2, "start_time": TOMORROW, "duration": None})]
+    rejected = []
+    with app.app_context(), db.engine.begin() as connection:
+        assert write_shows(connection, batch, rejected) == 1
+    assert rejected == []
+    with app.app_context():
+        assert Show.query.count() == 2
+
+
+def test_other_workers_serve_imported_rows_before_the_cache_ttl(make_app, tmp_path):
+    app = make_app(3, 3, CACHE_TTL=3600)
+    client = app.test_client()
+    assert 'Cactus Cafe' not in client.get('/venues').get_data(as_text=True)
+    # The import runs in its own process, with its own page cache.
+    run_import(make_app(worker_of=app), tmp_path, 'venues', 'venues.csv',
+               VENUE_HEADER + VENUE_LINE % ('Cactus Cafe', '5125550100'))
+    assert 'Cactus Cafe' in client.get('/venues').get_data(as_text=True)
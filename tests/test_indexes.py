@@ -0,0 +1,64 @@
+import re
+
+import pytest
+
+from models import db
+from viewmodels import venue_partition, artist_partition, single_venue, venue_areas, artist_list, show_list, \
+    count_upcoming_shows
+
+# Tables whose full scan a hot statement must never need.
+SCANNED = re.compile(r'^SCAN (shows|Venue|Artist|venue__genre|artist__genre)\b(?!.* USING )')
+
+# name -> (request path, code that runs the statements, index one of their plans must use)
+HOT_STATEMENTS = {
+    'venue timeline': ('/', lambda: venue_partition(1), 'ix_shows_venue_id_start_date_time'),
+    'artist timeline': ('/', lambda: artist_partition(1), 'ix_shows_artist_id_start_date_time'),
+    'venue detail': ('/', lambda: single_venue(1), 'ix_shows_venue_id_start_date_time'),
+    'venue areas': ('/venues', venue_areas, 'ix_venue_city_state_name'),
+    'venue areas by genre': ('/venues?genre=Jazz', venue_areas, 'ix_venue__genre_genre_id_venue_id'),
+    'artists by genre': ('/artists?genre=Jazz', artist_list, 'ix_artist__genre_genre_id_artist_id'),
+    'show list': ('/shows', show_list, 'ix_shows_start_date_time'),
+    'venue upcoming counts': ('/', lambda: count_upcoming_shows(venue_ids=[1, 2, 3]),
+                              'ix_shows_venue_id_start_date_time'),
+    'artist upcoming counts': ('/', lambda: count_upcoming_shows(artist_ids=[1, 2, 3]),
+                               'ix_shows_artist_id_start_date_time'),
+}
+
+
+def query_plan(engine, statement, parameters):
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+
+
+@pytest.fixture
+def catalog(make_app):
+    app = make_app(200, 400, 4000)
+    with app.app_context():
+        # Give the planner real statistics, as a production database would have.
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('ANALYZE')
+    return app
+
+
+@pytest.mark.parametrize('name', sorted(HOT_STATEMENTS))
+def test_hot_statement_uses_an_index(catalog, count_queries, name):
+    path, run, index = HOT_STATEMENTS[name]
+    with catalog.test_request_context(path):
+        engine = db.engine
+        # The exact SQL and parameters the code sends, not a copy of the query.
+        with count_queries(catalog) as calls:
+            run()
+    selects = [(statement, parameters) for statement, parameters in calls
+               if statement.lstrip().upper().startswith('SELECT')]
+    assert selects
+
+    plans = [query_plan(engine, statement, parameters) for statement, parameters in selects]
+    for plan in plans:
+        assert not [line for line in plan if SCANNED.match(line)], plan
+    assert any(index in line for plan in plans for line in plan), plans
+
+
+def test_full_scans_are_detected(catalog):
+    with catalog.app_context():
+        plan = query_plan(db.engine, 'SELECT * FROM shows WHERE end_date_time > ?', ('2024-01-01',))
+        assert [line for line in plan if SCANNED.match(line)]
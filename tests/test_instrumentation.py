@@ -0,0 +1,86 @@
+import json
+import logging
+import re
+
+import pytest
+
+from instrumentation import QueryBudgetExceeded, query_budget
+from models import Venue
+
+SERVER_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries", render;dur=[\d.]+, total;dur=[\d.]+$')
+
+
+def add_counting_view(app, queries, budget=None):
+    """A /count view running `queries` statements, with its own budget when given."""
+    def count():
+        for _ in range(queries):
+            Venue.query.count()
+        return 'ok'
+
+    app.add_url_rule('/count', 'count', count if budget is None else query_budget(budget)(count))
+
+
+def test_server_timing_reports_the_request_queries(make_app, count_queries):
+    app = make_app(3, 3, 5)
+    client = app.test_client()
+    for path in ('/api/v1/venues/1', '/venues'):
+        with count_queries(app) as statements:
+            response = client.get(path)
+        match = SERVER_TIMING.match(response.headers['Server-Timing'])
+        assert match and int(match.group(1)) == len(statements) > 0
+
+    app = make_app(1, 1, SERVER_TIMING=False)
+    assert 'Server-Timing' not in app.test_client().get('/api/v1/venues/1').headers
+
+
+def test_query_over_budget_raises(make_app):
+    app = make_app(1, 1, SQL_QUERY_BUDGET=2)
+    add_counting_view(app, 3)
+    with pytest.raises(QueryBudgetExceeded, match='GET /count ran more than its budget of 2 queries; query 3'):
+        app.test_client().get('/count')
+
+
+def test_view_budget_overrides_the_default(make_app):
+    app = make_app(1, 1, SQL_QUERY_BUDGET=2)
+    add_counting_view(app, 3, budget=3)
+    assert app.test_client().get('/count').status_code == 200
+
+
+def test_query_over_budget_logs_a_warning(make_app, caplog):
+    app = make_app(1, 1, SQL_QUERY_BUDGET=2, SQL_QUERY_BUDGET_RAISE=False)
+    add_counting_view(app, 3)
+    with caplog.at_level(logging.INFO, logger=app.logger.name + '.requests'):
+        assert app.test_client().get('/count').status_code == 200
+    record = caplog.records[-1]
+    line = json.loads(record.getMessage())
+    assert record.levelno == logging.WARNING
+    assert (line['path'], line['queries'], line['budget']) == ('/count', 3, 2)
+    assert len(line['slowest']) == 3
+
+
+def test_slow_queries_go_to_a_rotating_log(make_app, tmp_path):
+    log = tmp_path / 'slow.log'
+    app = make_app(2, 2, SLOW_QUERY_MS=0, SLOW_QUERY_LOG=str(log), SLOW_QUERY_LOG_MAX_BYTES=2000,
+                   SLOW_QUERY_LOG_BACKUPS=2)
+    client = app.test_client()
+    client.get('/api/v1/venues/1')
+    entry = json.loads(log.read_text().splitlines()[0].split(' ', 2)[2])
+    assert entry['path'] == '/api/v1/venues/1' and entry['statement'].startswith('SELECT')
+    assert set(entry) == {'ms', 'path', 'statement', 'parameters', 'executemany'}
+
+    for _ in range(20):
+        client.get('/api/v1/venues/1')
+    assert sorted(path.name for path in tmp_path.glob('slow.log*')) == ['slow.log', 'slow.log.1', 'slow.log.2']
+    assert all(path.stat().st_size <= 2000 for path in tmp_path.glob('slow.log*'))
+
+    # Another app with its own file takes the log over.
+    other = tmp_path / 'other.log'
+    make_app(worker_of=app, SLOW_QUERY_MS=0, SLOW_QUERY_LOG=str(other)).test_client().get('/api/v1/venues/1')
+    assert other.read_text()
+
+
+def test_slow_query_threshold(make_app, tmp_path):
+    log = tmp_path / 'slow.log'
+    app = make_app(2, 2, SLOW_QUERY_MS=60 * 1000, SLOW_QUERY_LOG=str(log))
+    app.test_client().get('/api/v1/venues/1')
+    assert not log.exists() or log.read_text() == ''
@@ -0,0 +1,117 @@
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import EPOCH
+from booking import book_shows
+from models import db, Venue, Artist
+
+PAGES = ('venues', 'artists', 'shows')
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+
+VENUE_FORM = {
+    'name': 'Gruene Hall', 'city': 'New Braunfels', 'state': 'TX', 'address': '1281 Gruene Rd',
+    'phone': '8306065000', 'genres': ['Country', 'Folk'], 'image_link': 'https://example.com/gruene.jpg',
+    'facebook_link': 'https://www.facebook.com/gruene', 'website_link': 'https://example.com',
+}
+ARTIST_FORM = {
+    'name': 'Ruby Lark', 'city': 'Austin', 'state': 'TX', 'phone': '5125550100', 'genres': ['Folk'],
+    'image_link': 'https://example.com/lark.jpg', 'facebook_link': 'https://www.facebook.com/lark',
+    'website_link': 'https://example.com',
+}
+
+
+@pytest.fixture
+def site(make_app):
+    """A three-venue, three-artist catalog with one show, every listing page cached."""
+    app = make_app(3, 3)
+    with app.test_request_context():
+        book_shows([{"artist_id": 1, "venue_id": 1, "start_time": str(TOMORROW)}])
+    client = app.test_client()
+    for page in PAGES:
+        assert client.get('/' + page).status_code == 200
+    return app, client
+
+
+def generations(app):
+    cache = app.extensions['page_cache']
+    return {page: cache.generation(page) for page in PAGES}
+
+
+def stale_after(site, action):
+    """Runs `action(client)`; returns the pages whose cached copy it invalidated."""
+    app, client = site
+    before = generations(app)
+    action(client)
+    after = generations(app)
+    return {page for page in PAGES if after[page] != before[page]}
+
+
+def page(client, name):
+    return client.get('/' + name).get_data(as_text=True)
+
+
+def test_creating_a_venue_invalidates_the_venue_listing(site):
+    _, client = site
+    assert stale_after(site, lambda client: client.post('/venues/create', data=VENUE_FORM)) >= {'venues'}
+    assert 'Gruene Hall' in page(client, 'venues')
+
+
+def test_editing_a_venue_invalidates_the_venue_and_show_listings(site):
+    _, client = site
+    form = dict(VENUE_FORM, name='Renamed Hall')
+    assert stale_after(site, lambda client: client.post('/venues/1/edit', data=form)) == {'venues', 'shows'}
+    assert 'Renamed Hall' in page(client, 'venues')
+    assert 'Renamed Hall' in page(client, 'shows')
+
+
+def test_deleting_a_venue_invalidates_the_venue_listing(site):
+    app, client = site
+    with app.app_context():
+        name = db.session.get(Venue, 3).name
+    assert name in page(client, 'venues')
+    assert stale_after(site, lambda client: client.post('/venues/3')) >= {'venues'}
+    with app.app_context():
+        assert db.session.get(Venue, 3) is None
+        # Generated names repeat; the page must have lost exactly this venue.
+        remaining = Venue.query.filter(Venue.name == name).count()
+    assert page(client, 'venues').count('<h5>%s</h5>' % name) == remaining
+
+
+def test_creating_an_artist_invalidates_the_artist_listing(site):
+    _, client = site
+    assert stale_after(site, lambda client: client.post('/artists/create', data=ARTIST_FORM)) >= {'artists'}
+    assert 'Ruby Lark' in page(client, 'artists')
+
+
+def test_editing_an_artist_invalidates_the_artist_and_show_listings(site):
+    _, client = site
+    form = dict(ARTIST_FORM, name='Renamed Lark')
+    assert stale_after(site, lambda client: client.post('/artists/1/edit', data=form)) == {'artists', 'shows'}
+    assert 'Renamed Lark' in page(client, 'artists')
+    assert 'Renamed Lark' in page(client, 'shows')
+
+
+def test_creating_a_show_invalidates_the_show_and_venue_listings(site):
+    app, client = site
+    with app.app_context():
+        artist = db.session.get(Artist, 2).name
+    assert artist not in page(client, 'shows')
+    form = {'artist_id': 2, 'venue_id': 2, 'start_time': str(TOMORROW)}
+    assert stale_after(site, lambda client: client.post('/shows/create', data=form)) == {'venues', 'shows'}
+    assert artist in page(client, 'shows')
+
+
+def test_batch_booking_invalidates_like_an_orm_write(site):
+    # The batch goes in with a Core INSERT, which fires no session events; invalidate_bookings stands in.
+    app, client = site
+    with app.app_context():
+        artist = db.session.get(Artist, 3).name
+    bookings = [{"artist_id": 3, "venue_id": 3, "start_time": str(TOMORROW)}]
+    assert stale_after(site, lambda client: client.post('/shows/batch', json=bookings)) == {'venues', 'shows'}
+    assert artist in page(client, 'shows')
+
+
+def test_rejected_batch_leaves_the_cache_alone(site):
+    bookings = [{"artist_id": 1, "venue_id": 1, "start_time": str(TOMORROW)}]
+    assert stale_after(site, lambda client: client.post('/shows/batch', json=bookings)) == set()
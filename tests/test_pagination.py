@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import db, Venue, Artist, Show
+from pagination import decode_cursor, encode_cursor, order_keys
+from viewmodels import VENUE_AREA_KEYS, SHOW_LIST_KEYS
+
+
+def walk(client, path, items):
+    """Every item of a paginated API listing, following next_cursor; also returns the page count."""
+    seen, cursor, pages = [], None, 0
+    while True:
+        data = client.get(path + ('&after=' + cursor if cursor else '')).get_json()
+        seen.extend(items(data))
+        pages += 1
+        cursor = data['next_cursor']
+        if cursor is None:
+            return seen, pages
+
+
+def test_cursor_round_trip():
+    values = [datetime(2024, 6, 1, 20, 30), 7, None, 'Café / Bar']
+    keys = [Show.start_date_time, Show.id, Venue.city, Venue.name]
+    cursor = encode_cursor(values)
+    assert '=' not in cursor and '/' not in cursor
+    assert decode_cursor(cursor, keys) == values
+
+
+def test_bad_cursors_are_rejected(make_app):
+    client = make_app(3, 3).test_client()
+    good = client.get('/api/v1/artists?per_page=1').get_json()['next_cursor']
+    assert client.get('/api/v1/artists?after=' + good).status_code == 200
+    for cursor in ('garbage', encode_cursor(['only one value']), encode_cursor({'a': 1})):
+        assert client.get('/api/v1/artists?after=' + cursor).status_code == 400
+
+
+def test_venue_pages_cover_null_areas_and_names_once(make_app):
+    app = make_app(20, 5, 50)
+    with app.app_context():
+        db.session.add_all([Venue(name=None, city=None, state=None), Venue(name='No City', city=None, state='TX'),
+                            Venue(name=None, city='Austin', state=None), Venue(name='No State', city='Austin'),
+                            Venue(name=None, city='Austin', state='TX'), Venue(name=None, city=None, state=None)])
+        db.session.commit()
+        expected = sorted(((venue.city is not None, venue.city or '', venue.state is not None, venue.state or '',
+                            venue.name is not None, venue.name or '', venue.id) for venue in Venue.query))
+    venues, pages = walk(app.test_client(), '/api/v1/venues?per_page=2',
+                         lambda data: [venue['id'] for area in data['areas'] for venue in area['venues']])
+    assert pages == 13
+    # NULLs first, then values, column by column.
+    assert venues == [key[-1] for key in expected]
+
+
+def test_artist_pages_cover_null_names_once(make_app):
+    app = make_app(5, 9)
+    with app.app_context():
+        db.session.add_all([Artist(name=None), Artist(name=None), Artist(name='Aardvark')])
+        db.session.commit()
+        expected = [artist.id for artist in Artist.query.order_by(Artist.name, Artist.id)]
+    artists, _ = walk(app.test_client(), '/api/v1/artists?per_page=1', lambda data: [a['id'] for a in data['artists']])
+    assert artists == expected and len(expected) == 12
+
+
+def test_show_pages_break_start_time_ties(make_app):
+    app = make_app(10, 10, 60)
+    with app.app_context():
+        start = db.session.query(Show.start_date_time).first()[0]
+        # Several shows at one instant, on either side of page boundaries.
+        for artist_id, venue_id in ((1, 2), (2, 1), (3, 3), (4, 4)):
+            if not Show.query.filter_by(artist_id=artist_id, start_date_time=start).count() and \
+                    not Show.query.filter_by(venue_id=venue_id, start_date_time=start).count():
+                db.session.add(Show(artist_id=artist_id, venue_id=venue_id, start_date_time=start))
+        db.session.commit()
+        expected = [(show.start_date_time.isoformat(), show.artist_id, show.venue_id)
+                    for show in Show.query.order_by(*SHOW_LIST_KEYS)]
+    shows, _ = walk(app.test_client(), '/api/v1/shows?per_page=3',
+                    lambda data: [(show['start_time'], show['artist_id'], show['venue_id']) for show in data['shows']])
+    assert shows == expected
+
+
+def test_nullable_keys_sort_nulls_first_on_every_database():
+    def compiled(dialect):
+        return [str(term.compile(dialect=dialect)) for term in order_keys(VENUE_AREA_KEYS, dialect)]
+
+    assert compiled(sqlite.dialect()) == ['"Venue".city', '"Venue".state', '"Venue".name', '"Venue".id']
+    assert compiled(postgresql.dialect()) == ['"Venue".city ASC NULLS FIRST', '"Venue".state ASC NULLS FIRST',
+                                              '"Venue".name ASC NULLS FIRST', '"Venue".id']
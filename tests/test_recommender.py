@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import EPOCH
+from genres import set_genres
+from models import db, Venue, Artist, Show, Venue_Recommendation, Artist_Recommendation
+from recommender import GENRE_WEIGHT, LOCATION_WEIGHT, SEEKING_BONUS, recommend
+
+AUSTIN, SEATTLE = ('Austin', 'TX', 30.27, -97.74), ('Seattle', 'WA', 47.61, -122.33)
+
+
+def place(owner, name, genres, city):
+    owner.name = name
+    owner.city, owner.state, owner.latitude, owner.longitude = city
+    set_genres(owner, genres)
+    db.session.add(owner)
+    return owner
+
+
+@pytest.fixture
+def catalog(make_app):
+    """Two Austin venues, one seeking talent, and three artists: Austin jazz (seeking), Austin rock,
+    and Seattle jazz."""
+    app = make_app()
+    with app.app_context():
+        place(Venue(seeking_talent=True), 'Jazz Club', ['Jazz'], AUSTIN)
+        place(Venue(seeking_talent=False), 'Rock Bar', ['Rock'], AUSTIN)
+        place(Artist(seeking_venue=True), 'Austin Jazz', ['Jazz'], AUSTIN)
+        place(Artist(seeking_venue=False), 'Austin Rock', ['Rock'], AUSTIN)
+        place(Artist(seeking_venue=False), 'Seattle Jazz', ['Jazz'], SEATTLE)
+        db.session.commit()
+    return app
+
+
+def ranked(model, owner_id):
+    key, candidate = ('venue_id', 'artist_id') if model is Venue_Recommendation else ('artist_id', 'venue_id')
+    rows = model.query.filter_by(**{key: owner_id}).order_by(model.rank)
+    return [(getattr(row, candidate), row.score) for row in rows]
+
+
+def test_ranking_and_seeking_bonus(catalog):
+    with catalog.app_context():
+        assert recommend(10, everything=True) == {'Venue': 2, 'Artist': 3}
+        jazz_club = ranked(Venue_Recommendation, 1)
+        # Same genre and city, both seeking; then the genre from afar; then the city alone.
+        assert [artist_id for artist_id, _ in jazz_club] == [1, 3, 2]
+        assert jazz_club[0][1] == pytest.approx((GENRE_WEIGHT + LOCATION_WEIGHT) * (1 + SEEKING_BONUS), abs=1e-3)
+        assert jazz_club[1][1] == pytest.approx(GENRE_WEIGHT, abs=1e-3)
+        assert jazz_club[2][1] == pytest.approx(LOCATION_WEIGHT, abs=1e-3)
+        # Without both sides seeking there is no bonus.
+        assert ranked(Venue_Recommendation, 2)[0] == (2, pytest.approx(GENRE_WEIGHT + LOCATION_WEIGHT, abs=1e-3))
+        assert ranked(Artist_Recommendation, 3)[0] == (1, pytest.approx(GENRE_WEIGHT, abs=1e-3))
+
+
+def test_booked_pairs_are_left_out(catalog):
+    with catalog.app_context():
+        db.session.add(Show(venue_id=1, artist_id=1, start_date_time=EPOCH + timedelta(days=1)))
+        db.session.commit()
+        recommend(10, everything=True)
+        assert 1 not in [artist_id for artist_id, _ in ranked(Venue_Recommendation, 1)]
+        assert 1 not in [venue_id for venue_id, _ in ranked(Artist_Recommendation, 1)]
+
+
+def test_incremental_runs_rescore_changed_rows_only(catalog, count_queries):
+    with catalog.app_context():
+        assert recommend(10) == {'Venue': 2, 'Artist': 3}
+        assert recommend(10) == {'Venue': 0, 'Artist': 0}
+        jazz_club = ranked(Venue_Recommendation, 1)
+
+        set_genres(db.session.get(Venue, 2), ['Jazz'])
+        db.session.commit()
+        with count_queries(catalog) as statements:
+            assert recommend(10) == {'Venue': 1, 'Artist': 0}
+        # Only the changed venue's rows were rewritten, and it now ranks jazz first.
+        deletes = [parameters for statement, parameters in statements if statement.startswith('DELETE')]
+        assert deletes == [(2,)]
+        assert ranked(Venue_Recommendation, 1) == jazz_club
+        assert [artist_id for artist_id, _ in ranked(Venue_Recommendation, 2)][:2] == [1, 3]
+        assert recommend(10) == {'Venue': 0, 'Artist': 0}
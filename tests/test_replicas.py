@@ -0,0 +1,98 @@
+import shutil
+from datetime import timedelta
+
+import pytest
+from flask import g
+from sqlalchemy import func, select
+
+from benchmarks.catalog import EPOCH
+from models import db, Venue, Show
+from replicas import PRIMARY_COOKIE, primary
+
+TOMORROW = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+
+
+@pytest.fixture
+def replicated(make_app, tmp_path):
+    """An app whose one replica is a copy of the primary's SQLite file; writes after the copy are "lag"."""
+    replica = tmp_path / 'replica.db'
+    app = make_app(3, 3, SQLALCHEMY_REPLICA_URIS=['sqlite:///%s' % replica])
+    shutil.copy(app.config['SQLALCHEMY_DATABASE_URI'][len('sqlite:///'):], replica)
+    return app
+
+
+def upcoming(client, venue_id=1):
+    return client.get('/api/v1/venues/%d' % venue_id).get_json()['upcoming_shows_count']
+
+
+def replica_shows(app):
+    with app.app_context(), db.get_engine(app, bind='replica_0').connect() as connection:
+        return connection.execute(select(func.count()).select_from(Show.__table__)).scalar()
+
+
+def test_reads_go_to_the_replica(replicated):
+    with replicated.app_context():
+        db.session.add(Venue(name='Only On The Primary', city='Austin', state='TX'))
+        db.session.commit()
+        venue_id = Venue.query.filter_by(name='Only On The Primary').one().id
+    client = replicated.test_client()
+    assert client.get('/api/v1/venues/%d' % venue_id).status_code == 404
+    with replicated.test_request_context('/api/v1/venues'):
+        replicated.preprocess_request()
+        assert g.db_bind == 'replica_0'
+
+
+def test_orm_write_sticks_the_writer_to_the_primary(replicated):
+    writer, reader = replicated.test_client(), replicated.test_client()
+    response = writer.post('/shows/create', data={'artist_id': 1, 'venue_id': 1, 'start_time': str(TOMORROW)})
+    assert PRIMARY_COOKIE in response.headers['Set-Cookie']
+    assert 'Max-Age=5' in response.headers['Set-Cookie']
+    assert upcoming(writer) == 1
+    # Everyone else reads the lagging replica.
+    assert reader.get('/api/v1/shows').get_json()['shows'] == []
+    assert replica_shows(replicated) == 0
+
+
+def test_core_write_sticks_the_writer_to_the_primary(replicated):
+    writer = replicated.test_client()
+    response = writer.post('/shows/batch', json=[{'artist_id': 2, 'venue_id': 2, 'start_time': str(TOMORROW)}])
+    assert response.get_json()['results'][0]['status'] == 'created'
+    # The batch never flushes: the INSERT, recount and version bumps are Core statements.
+    assert PRIMARY_COOKIE in response.headers['Set-Cookie']
+    assert replica_shows(replicated) == 0
+    assert upcoming(writer, 2) == 1
+
+
+def test_read_only_requests_set_no_cookie(replicated):
+    client = replicated.test_client()
+    assert 'Set-Cookie' not in client.get('/venues').headers
+    assert 'Set-Cookie' not in client.post('/venues/search', data={'search_term': 'the'}).headers
+
+
+def test_primary_block_reads_the_primary(replicated):
+    with replicated.app_context():
+        db.session.add(Show(artist_id=1, venue_id=1, start_date_time=TOMORROW))
+        db.session.commit()
+    with replicated.test_request_context('/shows'):
+        replicated.preprocess_request()
+        assert Show.query.count() == 0
+        with primary():
+            assert g.get('db_bind') is None
+            assert Show.query.count() == 1
+        assert g.db_bind == 'replica_0'
+        # A write inside the block keeps the rest of the request on the primary.
+        with primary():
+            db.session.add(Show(artist_id=2, venue_id=2, start_date_time=TOMORROW))
+            db.session.flush()
+        assert g.get('db_bind') is None and g.db_wrote
+        db.session.rollback()
+
+
+def test_partitions_are_built_from_the_primary(replicated):
+    writer, reader = replicated.test_client(), replicated.test_client()
+    writer.post('/shows/create', data={'artist_id': 1, 'venue_id': 1, 'start_time': str(TOMORROW)})
+    # A reader on the lagging replica misses the cached partition first; what it caches is current.
+    reader.get('/venues/1')
+    partition = replicated.extensions['show_partitions'].peek(('venue', 1))
+    assert [show['start_time'] for show in partition.shows] == [TOMORROW]
+    assert upcoming(writer) == 1
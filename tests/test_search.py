@@ -0,0 +1,164 @@
+import os
+from datetime import timedelta
+
+import pytest
+
+from benchmarks.catalog import EPOCH
+from clock import FixedClock
+from models import db, Venue, Artist, Show
+from search import MemorySearchBackend, NgramIndex, TrigramSearchBackend
+from versions import touch_versions
+from viewmodels import count_upcoming_shows, search_results, search_show_results
+
+
+def add_venue(name, city='Austin', state='TX'):
+    venue = Venue(name=name, city=city, state=state)
+    db.session.add(venue)
+    db.session.commit()
+    return venue.id
+
+
+def test_ngram_index_matches_partial_terms_case_insensitively():
+    index = NgramIndex(n=3)
+    index.add(1, 'The Musical Hop', ['The Musical Hop', 'San Francisco', 'Jazz'])
+    index.add(2, 'Park Square Live Music & Coffee', ['Park Square Live Music & Coffee', 'New York', 'Folk'])
+    index.add(3, 'The Dueling Pianos Bar', ['The Dueling Pianos Bar', 'New York', None])
+
+    assert index.search('hop') == {1}
+    assert index.search('MUSIC') == {1, 2}
+    assert index.search('new york') == {2, 3}
+    # Longer than a gram: every trigram must match, then the whole term is checked.
+    assert index.search('usical h') == {1}
+    assert index.search('music hop') == set()
+    assert index.search('jAzZ') == {1}
+    assert index.search('') == {1, 2, 3}
+    assert index.search('xyz') == set()
+
+
+def test_memory_search_matches_name_city_and_genre(make_app):
+    app = make_app(10, 10, 50)
+    with app.test_request_context():
+        hop = add_venue('The Musical Hop', city='San Francisco')
+        results = search_results(Venue, 'musical h')
+        assert [row['id'] for row in results['data']] == [hop]
+        assert search_results(Venue, 'MUSICAL HOP') == results
+        by_city = search_results(Venue, 'san fran')['data']
+        assert hop in [row['id'] for row in by_city]
+        by_genre = search_results(Artist, 'jazz')['data']
+        assert by_genre and len(by_genre) < Artist.query.count()
+
+
+def test_memory_search_rebuilds_after_another_worker_writes(make_app):
+    app = make_app(10, 10, 50)
+    other = make_app(worker_of=app)
+    with app.test_request_context():
+        assert search_results(Venue, 'musical')['count'] == 0
+    with other.test_request_context():
+        hop = add_venue('The Musical Hop')
+    with app.test_request_context():
+        assert [row['id'] for row in search_results(Venue, 'musical')['data']] == [hop]
+
+    # Core writes bump the collection version themselves, like `flask import` does.
+    with app.app_context(), db.engine.begin() as connection:
+        connection.execute(Venue.__table__.insert().values(name='Musical Chairs Hall', city='Austin', state='TX'))
+        touch_versions(connection, ['venues'])
+    with app.test_request_context():
+        names = [row['name'] for row in search_results(Venue, 'musical')['data']]
+    assert names == ['Musical Chairs Hall', 'The Musical Hop']
+
+
+def test_memory_search_keeps_its_index_while_the_version_holds(make_app, count_queries):
+    app = make_app(20, 20, 100)
+    with app.test_request_context():
+        backend = app.extensions['search']
+        assert isinstance(backend, MemorySearchBackend)
+        backend.search(Venue, 'the')
+        index = backend.indexes[Venue][1]
+        with count_queries(app) as statements:
+            backend.search(Venue, 'the')
+        assert backend.indexes[Venue][1] is index
+    # Only the collection version is read.
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize('term', ['the', 'blue', 'zzz'])
+def test_search_results_query_count_does_not_grow_with_hits(make_app, count_queries, term):
+    counts = []
+    for venues in (30, 300):
+        app = make_app(venues, venues, venues * 5)
+        with app.test_request_context():
+            search_results(Venue, term)
+            with count_queries(app) as statements:
+                search_results(Venue, term)
+        counts.append(len(statements))
+    assert counts[0] == counts[1] <= 2
+
+
+def book_crossed_shows():
+    """Artist 1 plays venue 2 twice and artist 2 plays venue 1 once, so ids 1 and 2 have different
+    counts as artists and as venues; the past show counts for neither."""
+    tomorrow = EPOCH.replace(hour=20, minute=0) + timedelta(days=1)
+    db.session.add_all([Show(artist_id=1, venue_id=2, start_date_time=tomorrow),
+                        Show(artist_id=1, venue_id=2, start_date_time=tomorrow + timedelta(days=1)),
+                        Show(artist_id=2, venue_id=1, start_date_time=tomorrow),
+                        Show(artist_id=1, venue_id=1, start_date_time=tomorrow - timedelta(days=3))])
+    db.session.commit()
+    return tomorrow
+
+
+def test_upcoming_counts_are_one_query_per_side(make_app, count_queries):
+    app = make_app(3, 3)
+    with app.test_request_context():
+        book_crossed_shows()
+        with count_queries(app) as statements:
+            assert count_upcoming_shows(artist_ids=[1, 2, 3]) == {1: 2, 2: 1}
+            assert count_upcoming_shows(venue_ids=[1, 2, 3]) == {1: 1, 2: 2}
+            assert count_upcoming_shows(artist_ids=[]) == {}
+    assert len(statements) == 2
+
+
+def test_search_counts_artists_by_artist(make_app, count_queries):
+    app = make_app(3, 3)
+    with app.app_context():
+        for model in (Venue, Artist):
+            for row in model.query:
+                row.name = 'Crossed %s %d' % (model.__name__, row.id)
+        db.session.commit()
+    with app.test_request_context():
+        tomorrow = book_crossed_shows()
+
+        def counts(results):
+            return {row['id']: row['num_upcoming_shows'] for row in results['data']}
+
+        assert counts(search_results(Artist, 'crossed')) == {1: 2, 2: 1, 3: 0}
+        assert counts(search_results(Venue, 'crossed')) == {1: 1, 2: 2, 3: 0}
+        artists, venues = search_show_results('crossed')
+        assert (counts(artists), counts(venues)) == ({1: 2, 2: 1}, {1: 1, 2: 2})
+
+    # Once the first shows start, the stale counters are recounted together, still by the right key.
+    app.extensions['clock'] = FixedClock(tomorrow)
+    with app.test_request_context():
+        with count_queries(app) as statements:
+            assert counts(search_results(Artist, 'crossed')) == {1: 1, 2: 0, 3: 0}
+    assert len([statement for statement, _ in statements if 'GROUP BY' in statement]) == 1
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_POSTGRES_URL'),
+                    reason='set TEST_POSTGRES_URL to a scratch Postgres database with pg_trgm')
+def test_trigram_search_matches_like_the_memory_backend(make_app):
+    app = make_app(SQLALCHEMY_DATABASE_URI=os.environ['TEST_POSTGRES_URL'], SEARCH_BACKEND='postgres')
+    try:
+        with app.test_request_context():
+            hop = add_venue('The Musical Hop', city='San Francisco')
+            add_venue('100% Pure_Jazz Club')
+            backend = app.extensions['search']
+            assert isinstance(backend, TrigramSearchBackend)
+            assert [hit.id for hit in backend.search(Venue, 'MUSICAL h')] == [hop]
+            assert [hit.id for hit in backend.search(Venue, 'san fran')] == [hop]
+            # LIKE wildcards in the term match literally.
+            assert [hit.name for hit in backend.search(Venue, '0% p')] == ['100% Pure_Jazz Club']
+            assert backend.search(Venue, 'pure%club') == []
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+from benchmarks.catalog import EPOCH
+from clock import Clock, FixedClock, get_now, init_clock
+from models import db, Venue, Artist, Show
+from viewmodels import single_venue
+
+BEFORE, AFTER = EPOCH - timedelta(hours=1), EPOCH + timedelta(hours=1)
+
+
+class TickingClock(Clock):
+    """Moves a minute forward every time it is read."""
+
+    def __init__(self):
+        self.instant = EPOCH
+
+    def now(self):
+        self.instant += timedelta(minutes=1)
+        return self.instant
+
+
+def book(venue_id, artist_id, *starts):
+    for start in starts:
+        db.session.add(Show(venue_id=venue_id, artist_id=artist_id, start_date_time=start))
+    db.session.commit()
+
+
+def split(data):
+    return [show['start_time'] for show in data['past_shows']], [show['start_time'] for show in data['upcoming_shows']]
+
+
+def test_clock_is_read_once_per_request(make_app):
+    app = make_app()
+    assert isinstance(Clock().now(), datetime)
+    clock = init_clock(app, TickingClock())
+    with app.test_request_context():
+        first = get_now()
+        assert get_now() == first
+    with app.test_request_context():
+        assert get_now() == first + timedelta(minutes=1)
+    assert clock.instant == first + timedelta(minutes=1)
+
+
+def test_fixed_clock_splits_shows_at_now(make_app):
+    app = make_app(2, 2)
+    with app.test_request_context():
+        book(1, 1, BEFORE, EPOCH, AFTER)
+        # A show starting exactly now has started.
+        assert split(single_venue(1)) == ([BEFORE, EPOCH], [AFTER])
+
+
+def test_cached_partition_resplits_when_the_clock_passes_a_show(make_app, count_queries):
+    app = make_app(2, 2)
+    with app.test_request_context():
+        book(1, 1, BEFORE, AFTER)
+        assert split(single_venue(1)) == ([BEFORE], [AFTER])
+    app.extensions['clock'] = FixedClock(AFTER + timedelta(minutes=1))
+    with app.test_request_context():
+        with count_queries(app) as statements:
+            data = single_venue(1)
+    assert split(data) == ([BEFORE, AFTER], [])
+    # The partition was reused: only the venue and its genres were loaded.
+    assert len(statements) == 2
+
+
+def test_show_writes_invalidate_both_sides_partitions(make_app):
+    app = make_app(2, 2)
+    client = app.test_client()
+    with app.test_request_context():
+        book(1, 1, BEFORE)
+    assert client.get('/api/v1/venues/1').get_json()['upcoming_shows_count'] == 0
+    assert client.get('/api/v1/artists/1').get_json()['upcoming_shows_count'] == 0
+    with app.test_request_context():
+        book(1, 1, AFTER)
+    assert client.get('/api/v1/venues/1').get_json()['upcoming_shows_count'] == 1
+    assert client.get('/api/v1/artists/1').get_json()['upcoming_shows_count'] == 1
+
+
+def test_renaming_a_venue_invalidates_artist_partitions(make_app):
+    app = make_app(2, 2)
+    client = app.test_client()
+    with app.test_request_context():
+        book(1, 1, AFTER)
+    client.get('/artists/1')
+    with app.test_request_context():
+        db.session.get(Venue, 1).name = 'Renamed Hall'
+        db.session.commit()
+    assert 'Renamed Hall' in client.get('/artists/1').get_data(as_text=True)
+
+
+def test_detail_pages_see_other_workers_writes(make_app):
+    app = make_app(2, 2)
+    other = make_app(worker_of=app)
+    client = app.test_client()
+    with app.test_request_context():
+        name = db.session.get(Artist, 2).name
+    assert name not in client.get('/venues/1').get_data(as_text=True)
+    with other.test_request_context():
+        book(1, 2, AFTER)
+    # No session event reached this worker; the venue's version moved, so its partition is reloaded.
+    assert name in client.get('/venues/1').get_data(as_text=True)
+    client.get('/artists/2')
+    with other.test_request_context():
+        db.session.get(Venue, 1).name = 'Renamed Hall'
+        db.session.commit()
+    assert 'Renamed Hall' in client.get('/artists/2').get_data(as_text=True)
@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.parametrize('path', ['/venues', '/venues?genre=Jazz', '/api/v1/venues'])
+def test_venue_listing_query_count_does_not_grow_with_venues(make_app, count_queries, path):
+    counts = []
+    for venues in (30, 300):
+        app = make_app(venues, venues, venues * 5)
+        with count_queries(app) as statements:
+            response = app.test_client().get(path)
+        assert response.status_code == 200
+        counts.append(len(statements))
+    assert counts[0] == counts[1]
+
+
+def test_venue_listing_groups_every_venue_under_its_area(make_app):
+    app = make_app(40, 40, 200)
+    data = app.test_client().get('/api/v1/venues?per_page=100').get_json()
+    venues = [venue for area in data['areas'] for venue in area['venues']]
+    assert len(venues) == 40
+    assert len({(area['city'], area['state']) for area in data['areas']}) == len(data['areas'])
@@ -0,0 +1,128 @@
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from threading import Lock
+
+from flask import current_app
+from sqlalchemy import event, inspect
+
+from models import db, Venue, Artist, Show
+
+# ----------------------------------------------------------------------------#
+# Upcoming/past show partitions.
+# ----------------------------------------------------------------------------#
+
+
+class ShowPartition(object):
+    """An entity's shows in start order, split at the last reference time it was asked about.
+
+    The split is only recomputed once `now` leaves the window between the last past show
+    and the first upcoming one, i.e. when a show's start time has crossed it. `version` is
+    whatever the caller read alongside the shows (see api.entity_conditional).
+    """
+
+    def __init__(self, shows, version=None):
+        self.starts = [start for start, _ in shows]
+        self.shows = [show for _, show in shows]
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.index = None
+        self.valid_from = None
+        self.valid_until = None
+
+    def split(self, now):
+        if self.index is None or (self.valid_from is not None and now < self.valid_from) \
+                or (self.valid_until is not None and now >= self.valid_until):
+            self.index = bisect_right(self.starts, now)
+            self.valid_from = self.starts[self.index - 1] if self.index > 0 else None
+            self.valid_until = self.starts[self.index] if self.index < len(self.starts) else None
+        return self.shows[:self.index], self.shows[self.index:]
+
+
+class ShowPartitionCache(object):
+    """Bounded LRU of ShowPartitions keyed by ('artist' | 'venue', id).
+
+    Entries are dropped when a flush touches their shows, and expire after `max_age` seconds
+    so other worker processes' writes are picked up. A caller that knows the current version
+    passes it, and an entry loaded at another version is a miss regardless of its age.
+    """
+
+    def __init__(self, maxsize=1024, max_age=60):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def peek(self, key, version=None):
+        with self.lock:
+            partition = self.entries.get(key)
+            if partition is not None and time.monotonic() - partition.loaded_at < self.max_age \
+                    and (version is None or partition.version == version):
+                self.entries.move_to_end(key)
+                return partition
+        return None
+
+    def get(self, key, load, version=None):
+        partition = self.peek(key, version)
+        if partition is not None:
+            return partition
+
+        partition = ShowPartition(load(), version)
+        with self.lock:
+            self.entries[key] = partition
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return partition
+
+    def invalidate(self, keys=None):
+        with self.lock:
+            if keys is None:
+                self.entries.clear()
+            else:
+                for key in keys:
+                    self.entries.pop(key, None)
+
+
+def init_timeline(app):
+    app.extensions['show_partitions'] = ShowPartitionCache(
+        maxsize=app.config.get('SHOW_PARTITION_CACHE_SIZE', 1024),
+        max_age=app.config.get('SHOW_PARTITION_MAX_AGE', 60),
+    )
+    return app.extensions['show_partitions']
+
+
+def get_partition(kind, entity_id, load, version=None):
+    return current_app.extensions['show_partitions'].get((kind, entity_id), load, version)
+
+
+def peek_partition(kind, entity_id, version=None):
+    return current_app.extensions['show_partitions'].peek((kind, entity_id), version)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _track_show_changes(session, flush_context):
+    stale = session.info.setdefault('stale_partitions', set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, Show):
+            state = inspect(obj)
+            for artist_id in [obj.artist_id] + list(state.attrs.artist_id.history.deleted):
+                stale.add(('artist', artist_id))
+            for venue_id in [obj.venue_id] + list(state.attrs.venue_id.history.deleted):
+                stale.add(('venue', venue_id))
+        elif isinstance(obj, (Venue, Artist)):
+            # Names and images are copied into the other side's show tiles.
+            stale.add(None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_partitions(session):
+    stale = session.info.pop('stale_partitions', None)
+    if stale and 'show_partitions' in current_app.extensions:
+        cache = current_app.extensions['show_partitions']
+        cache.invalidate(None if None in stale else stale)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_show_changes(session):
+    session.info.pop('stale_partitions', None)
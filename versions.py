@@ -0,0 +1,162 @@
+import hashlib
+from datetime import datetime, timezone
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm.util import identity_key
+
+from clock import get_now
+from models import db, Venue, Venue_Genre, Artist, Artist_Genre, Show, Catalog_Version
+
+# ----------------------------------------------------------------------------#
+# Versions and validators.
+# ----------------------------------------------------------------------------#
+
+COLLECTIONS = {
+    Venue: 'venues',
+    Venue_Genre: 'venues',
+    Artist: 'artists',
+    Artist_Genre: 'artists',
+    Show: 'shows',
+}
+
+
+def touch_versions(bind, collections, venue_ids=(), artist_ids=()):
+    """Bumps collection and entity versions; runs after every flush and after bulk Core writes."""
+    now = datetime.now()
+    for model, ids in ((Venue, venue_ids), (Artist, artist_ids)):
+        ids = {entity_id for entity_id in ids if entity_id is not None}
+        if ids:
+            table = model.__table__
+            bind.execute(table.update().where(table.c.id.in_(ids)).values(
+                version=table.c.version + 1, updated_at=now))
+
+    collections = set(collections)
+    if collections:
+        table = Catalog_Version.__table__
+        result = bind.execute(table.update().where(table.c.name.in_(collections)).values(
+            version=table.c.version + 1, updated_at=now))
+        if result.rowcount < len(collections):
+            existing = {row.name for row in bind.execute(select(table.c.name).where(table.c.name.in_(collections)))}
+            missing = collections - existing
+            bind.execute(table.insert(), [{"name": name, "version": 1, "updated_at": now} for name in missing])
+
+
+def _owner_ids(obj, attribute):
+    return [obj_id for obj_id in [getattr(obj, attribute)] + list(inspect(obj).attrs[attribute].history.deleted)
+            if obj_id is not None]
+
+
+@event.listens_for(db.session, 'before_flush')
+def _bump_entity_versions(session, flush_context, instances):
+    now = datetime.now()
+    collections = session.info.setdefault('touched_collections', set())
+    pending = session.info.setdefault('touched_entities', {Venue: set(), Artist: set()})
+
+    owners = []
+    for obj in session.new | session.dirty | session.deleted:
+        collection = COLLECTIONS.get(type(obj))
+        if collection is None:
+            continue
+        collections.add(collection)
+        if isinstance(obj, (Venue, Artist)):
+            if obj in session.dirty and session.is_modified(obj):
+                owners.append(obj)
+        elif isinstance(obj, Show):
+            pending[Venue].update(_owner_ids(obj, 'venue_id'))
+            pending[Artist].update(_owner_ids(obj, 'artist_id'))
+        else:
+            # Genres attached through the relationship don't have their foreign key set until the flush.
+            owner_model, attribute = (Venue, 'venue') if isinstance(obj, Venue_Genre) else (Artist, 'artist')
+            owner = obj.__dict__.get(attribute)
+            if owner is not None:
+                owners.append(owner)
+            else:
+                pending[owner_model].update(_owner_ids(obj, attribute + '_id'))
+
+    # Owners already in the session get their bump in this flush; the rest are updated after it.
+    for model in (Venue, Artist):
+        for entity_id in list(pending[model]):
+            obj = session.identity_map.get(identity_key(model, entity_id))
+            if obj is not None:
+                owners.append(obj)
+                pending[model].discard(entity_id)
+    for obj in owners:
+        if obj not in session.deleted and obj not in session.new:
+            obj.version = type(obj).version + 1
+            obj.updated_at = now
+
+
+@event.listens_for(db.session, 'after_flush')
+def _bump_collection_versions(session, flush_context):
+    collections = session.info.pop('touched_collections', set())
+    pending = session.info.pop('touched_entities', {})
+    if collections:
+        touch_versions(session, collections, pending.get(Venue, ()), pending.get(Artist, ()))
+
+
+def _last_started(*criteria):
+    """The latest show start at or before now; it moves exactly when a show crosses into the past."""
+    return select(func.max(Show.start_date_time)).where(Show.start_date_time <= get_now(), *criteria) \
+        .scalar_subquery()
+
+
+def make_validator(parts, updated):
+    """Returns (etag, last_modified) for a version tuple and the times the content last changed."""
+    etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    updated = [value for value in updated if value is not None]
+    last_modified = max(updated).astimezone(timezone.utc) if updated else None
+    return etag, last_modified
+
+
+def collection_versions(names, timed=False):
+    query = select(Catalog_Version.name, Catalog_Version.version, Catalog_Version.updated_at) \
+        .where(Catalog_Version.name.in_(names))
+    if timed:
+        query = query.add_columns(_last_started().label('last_started'))
+    return query
+
+
+def collection_validator_from(rows, timed=False):
+    rows = sorted(rows)
+    updated = [row.updated_at for row in rows]
+    if timed and rows:
+        updated.append(rows[0].last_started)
+    return make_validator([tuple(row) for row in rows], updated)
+
+
+def collection_validator(names, timed=False):
+    """Validator for pages built from whole collections; `timed` pages also change as shows start."""
+    return collection_validator_from(db.session.execute(collection_versions(names, timed)).all(), timed)
+
+
+def entity_versions(model, entity_id):
+    # Show tiles carry the other side's names and images, so that whole collection's version counts too.
+    owner, counterpart = (Show.venue_id, 'artists') if model is Venue else (Show.artist_id, 'venues')
+    counterpart_version = select(Catalog_Version.version, Catalog_Version.updated_at) \
+        .where(Catalog_Version.name == counterpart)
+    return select(model.version, model.updated_at,
+                  counterpart_version.with_only_columns(Catalog_Version.version).scalar_subquery(),
+                  counterpart_version.with_only_columns(Catalog_Version.updated_at).scalar_subquery(),
+                  _last_started(owner == entity_id)) \
+        .where(model.id == entity_id)
+
+
+def partition_version(row):
+    """What a cached show partition must have been loaded at to serve a page that read `row`: the
+    entity's own version moves with its shows, the counterpart collection's with the names on them."""
+    return None if row is None else (row[0], row[2])
+
+
+def current_partition_version(model, entity_id):
+    return partition_version(db.session.execute(entity_versions(model, entity_id)).first())
+
+
+def entity_validator_from(model, entity_id, row):
+    if row is None:
+        return None
+    return make_validator((model.__tablename__, entity_id) + tuple(row), row[1:2] + row[3:])
+
+
+def entity_validator(model, entity_id):
+    """Validator for a detail page; None when the entity doesn't exist."""
+    return entity_validator_from(model, entity_id, db.session.execute(entity_versions(model, entity_id)).first())
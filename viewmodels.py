@@ -0,0 +1,422 @@
+from contextlib import nullcontext
+
+from flask import abort, current_app, request
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from clock import get_now
+from genres import genre_criteria, requested_genres
+from geocoding import bounding_box, distance_km
+from models import db, Venue, Artist, Show, Venue_Recommendation, Artist_Recommendation
+from pagination import keyset_page
+from replicas import primary
+from search import get_search_backend
+from timeline import get_partition, peek_partition
+
+# ----------------------------------------------------------------------------#
+# View models.
+# ----------------------------------------------------------------------------#
+
+
+def count_upcoming_shows(venue_ids=None, artist_ids=None):
+    if venue_ids is not None:
+        key, ids = Show.venue_id, venue_ids
+    else:
+        key, ids = Show.artist_id, artist_ids
+    if not ids:
+        return {}
+
+    return dict(db.session.execute(upcoming_counts_statement(key, ids)).all())
+
+
+def upcoming_counts_statement(key, ids):
+    return select(key, func.count(key)).where(key.in_(ids), Show.start_date_time > get_now()).group_by(key)
+
+
+def stale_counter_ids(rows):
+    """Rows whose next show has started since the last sweep, so their stored upcoming count is too high."""
+    now = get_now()
+    return [row.id for row in rows if row.next_show_at is not None and row.next_show_at <= now]
+
+
+def merge_upcoming_counts(rows, stale, recounted):
+    counts = {row.id: row.upcoming_show_count for row in rows}
+    counts.update(dict.fromkeys(stale, 0))
+    counts.update(recounted)
+    return counts
+
+
+def upcoming_show_counts(model, rows):
+    """Reads the stored counters off `rows`, recounting any whose next show has started since the last sweep."""
+    stale = stale_counter_ids(rows)
+    if not stale:
+        return merge_upcoming_counts(rows, stale, {})
+    if model is Venue:
+        return merge_upcoming_counts(rows, stale, count_upcoming_shows(venue_ids=stale))
+    return merge_upcoming_counts(rows, stale, count_upcoming_shows(artist_ids=stale))
+
+
+# The sync and async detail routes send the same ETag, so both build tiles with show_tile, in this order.
+SHOW_TILE_ORDER = [Show.start_date_time, Show.id]
+
+
+def show_tile(prefix, counterpart, start_time):
+    return {
+        prefix + "_id": counterpart.id,
+        prefix + "_name": counterpart.name,
+        prefix + "_image_link": counterpart.image_link,
+        "start_time": start_time,
+    }
+
+
+def show_tiles(shows, prefix):
+    return [(show.start_date_time, show_tile(prefix, getattr(show, prefix), show.start_date_time))
+            for show in sorted(shows, key=lambda show: (show.start_date_time, show.id))]
+
+
+def artist_show_tiles(shows):
+    return show_tiles(shows, "venue")
+
+
+def artist_partition(artist_id, shows=None, version=None):
+    def load():
+        if shows is not None:
+            return artist_show_tiles(shows)
+        with primary():
+            return artist_show_tiles(Show.query.options(joinedload(Show.venue)).filter_by(artist_id=artist_id).all())
+
+    return get_partition('artist', artist_id, load, version)
+
+
+def venue_show_tiles(shows):
+    return show_tiles(shows, "artist")
+
+
+def venue_partition(venue_id, shows=None, version=None):
+    def load():
+        if shows is not None:
+            return venue_show_tiles(shows)
+        with primary():
+            return venue_show_tiles(Show.query.options(joinedload(Show.artist)).filter_by(venue_id=venue_id).all())
+
+    return get_partition('venue', venue_id, load, version)
+
+
+VENUE_AREA_KEYS = [Venue.city, Venue.state, Venue.name, Venue.id]
+
+
+def venue_areas_query():
+    return select(Venue.city, Venue.state, Venue.id, Venue.name, Venue.upcoming_show_count, Venue.next_show_at) \
+        .filter(*genre_criteria(Venue, requested_genres()))
+
+
+def venue_areas():
+    rows, next_cursor = keyset_page(venue_areas_query(), VENUE_AREA_KEYS)
+    return venue_areas_data(rows, upcoming_show_counts(Venue, rows), next_cursor)
+
+
+def venue_areas_data(rows, upcoming, next_cursor):
+    areas = {}
+    for row in rows:
+        area = areas.get((row.city, row.state))
+        if area is None:
+            area = areas[(row.city, row.state)] = {
+                "city": row.city,
+                "state": row.state,
+                "venues": []
+            }
+        area["venues"].append({
+            "id": row.id,
+            "name": row.name,
+            "num_upcoming_shows": upcoming[row.id]
+        })
+    data = list(areas.values())
+
+    # data = [{
+    #     "city": "San Francisco",
+    #     "state": "CA",
+    #     "venues": [{
+    #         "id": 1,
+    #         "name": "The Musical Hop",
+    #         "num_upcoming_shows": 0,
+    #     }, {
+    #         "id": 3,
+    #         "name": "Park Square Live Music & Coffee",
+    #         "num_upcoming_shows": 1,
+    #     }]
+    # }, {
+    #     "city": "New York",
+    #     "state": "NY",
+    #     "venues": [{
+    #         "id": 2,
+    #         "name": "The Dueling Pianos Bar",
+    #         "num_upcoming_shows": 0,
+    #     }]
+    # }]
+    return {"areas": data, "next_cursor": next_cursor}
+
+
+def single_venue(venue_id, editing=False, version=None):
+    # Same loading strategy as single_artist: two round trips, shows skipped when not needed.
+    partition = None if editing else peek_partition('venue', venue_id, version)
+    options = [selectinload(Venue.genres)]
+    loading = not editing and partition is None
+    if loading:
+        options.append(joinedload(Venue.shows).joinedload(Show.artist))
+    with primary() if loading else nullcontext():
+        venue = Venue.query.options(*options).filter_by(id=venue_id).first()
+    if venue is None:
+        abort(404)
+
+    gen = [ge.genre.name for ge in venue.genres]
+
+    if editing:
+        return {
+            "id": venue.id,
+            "name": venue.name,
+            "genres": gen,
+            "address": venue.address,
+            "city": venue.city,
+            "state": venue.state,
+            "phone": venue.phone,
+            "website": venue.website_link,
+            "facebook_link": venue.facebook_link,
+            "seeking_talent": venue.seeking_talent,
+            "image_link": venue.image_link,
+        }
+
+    if partition is None:
+        partition = venue_partition(venue_id, venue.shows, version)
+    past_shows, upcoming_shows = partition.split(get_now())
+    return venue_detail(venue, gen, past_shows, upcoming_shows)
+
+
+def venue_detail(venue, gen, past_shows, upcoming_shows):
+    return {
+        "id": venue.id,
+        "name": venue.name,
+        "genres": gen,
+        "address": venue.address,
+        "city": venue.city,
+        "state": venue.state,
+        "phone": venue.phone,
+        "website": venue.website_link,
+        "facebook_link": venue.facebook_link,
+        "seeking_talent": venue.seeking_talent,
+        "image_link": venue.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows)
+    }
+
+
+def counter_rows(model, hits):
+    if not hits:
+        return []
+    return db.session.query(model.id, model.upcoming_show_count, model.past_show_count, model.next_show_at) \
+        .filter(model.id.in_([hit.id for hit in hits]), *genre_criteria(model, requested_genres())).all()
+
+
+def with_shows(model, hits):
+    """Hits with at least one show, and their counter rows; the total doesn't change as shows start."""
+    rows = [row for row in counter_rows(model, hits) if row.upcoming_show_count + row.past_show_count > 0]
+    booked = {row.id for row in rows}
+    return [hit for hit in hits if hit.id in booked], rows
+
+
+def search_results(model, search_term, hits=None, rows=None):
+    if hits is None:
+        hits = get_search_backend().search(model, search_term)
+    if rows is None:
+        rows = counter_rows(model, hits)
+        # The counter query also applies ?genre=, so keep only the hits it returned.
+        matched = {row.id for row in rows}
+        hits = [hit for hit in hits if hit.id in matched]
+    upcoming = upcoming_show_counts(model, rows)
+    data = []
+    response = {
+        "count": len(hits),
+        "data": data
+    }
+
+    for hit in hits:
+        data.append({
+            "id": hit.id,
+            "name": hit.name,
+            "num_upcoming_shows": upcoming.get(hit.id, 0),
+        })
+
+    return response
+
+
+def nearby_args():
+    """(latitude, longitude, radius_km, limit) from ?lat=&lng=&radius=&limit=; aborts with 400."""
+    config = current_app.config
+    try:
+        latitude, longitude = float(request.args['lat']), float(request.args['lng'])
+        radius_km = float(request.args.get('radius', config['NEARBY_RADIUS_KM']))
+        limit = int(request.args.get('limit', config['NEARBY_LIMIT']))
+    except (KeyError, ValueError):
+        abort(400)
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and 0 < radius_km <= config['NEARBY_MAX_RADIUS_KM']):
+        abort(400)
+    return latitude, longitude, radius_km, max(1, min(limit, config['NEARBY_MAX_LIMIT']))
+
+
+def nearby_venues(latitude, longitude, radius_km, limit):
+    """The closest venues with upcoming shows within `radius_km`, nearest first.
+
+    One bounding-box query on (latitude, longitude) finds the candidates; exact distances and the
+    radius are applied here. ?genre= narrows the candidates like it does for search.
+    """
+    south, north, ranges = bounding_box(latitude, longitude, radius_km)
+    rows = db.session.query(Venue.id, Venue.name, Venue.city, Venue.state, Venue.latitude, Venue.longitude,
+                            Venue.upcoming_show_count, Venue.next_show_at) \
+        .filter(Venue.latitude.between(south, north),
+                or_(*[Venue.longitude.between(west, east) for west, east in ranges]),
+                Venue.upcoming_show_count > 0, *genre_criteria(Venue, requested_genres())).all()
+    upcoming = upcoming_show_counts(Venue, rows)
+    hits = [(distance_km(latitude, longitude, row.latitude, row.longitude), row) for row in rows
+            if upcoming.get(row.id)]
+    hits = sorted((hit for hit in hits if hit[0] <= radius_km), key=lambda hit: (hit[0], hit[1].id))[:limit]
+    return {
+        "count": len(hits),
+        "data": [{
+            "id": row.id,
+            "name": row.name,
+            "city": row.city,
+            "state": row.state,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "distance_km": round(distance, 2),
+            "num_upcoming_shows": upcoming[row.id],
+        } for distance, row in hits]
+    }
+
+
+def recommended_artists(venue_id):
+    """The venue's top artists from the last `flask recommend`, best first."""
+    return db.session.query(Artist.id, Artist.name, Artist.image_link, Artist.city, Artist.state) \
+        .join(Venue_Recommendation, Venue_Recommendation.artist_id == Artist.id) \
+        .filter(Venue_Recommendation.venue_id == venue_id) \
+        .order_by(Venue_Recommendation.rank).limit(current_app.config['RECOMMENDATION_COUNT']).all()
+
+
+def recommended_venues(artist_id):
+    """The artist's top venues from the last `flask recommend`, best first."""
+    return db.session.query(Venue.id, Venue.name, Venue.image_link, Venue.city, Venue.state) \
+        .join(Artist_Recommendation, Artist_Recommendation.venue_id == Venue.id) \
+        .filter(Artist_Recommendation.artist_id == artist_id) \
+        .order_by(Artist_Recommendation.rank).limit(current_app.config['RECOMMENDATION_COUNT']).all()
+
+
+def search_show_results(search_term):
+    search_backend = get_search_backend()
+    artist_hits, artist_rows = with_shows(Artist, search_backend.search(Artist, search_term))
+    venue_hits, venue_rows = with_shows(Venue, search_backend.search(Venue, search_term))
+    return search_results(Artist, search_term, artist_hits, artist_rows), \
+        search_results(Venue, search_term, venue_hits, venue_rows)
+
+
+ARTIST_LIST_KEYS = [Artist.name, Artist.id]
+
+
+def artist_list_query():
+    return select(Artist.id, Artist.name).filter(*genre_criteria(Artist, requested_genres()))
+
+
+def artist_list():
+    data, next_cursor = keyset_page(artist_list_query(), ARTIST_LIST_KEYS)
+    return artist_list_data(data, next_cursor)
+
+
+def artist_list_data(data, next_cursor):
+    return {"artists": [dict(row._mapping) for row in data], "next_cursor": next_cursor}
+
+
+def single_artist(artist_id, editing=False, version=None):
+    # Shows and their venues come back in the same round trip as the artist, unless the show
+    # partition is already cached or the edit form doesn't need it. Genres are a second statement:
+    # joined alongside the shows they would multiply the rows to genres x shows.
+    # `version` makes a partition cached at any other version count as missing. The partition
+    # outlives replica lag, so the round trips that fill it go to the primary.
+    partition = None if editing else peek_partition('artist', artist_id, version)
+    options = [selectinload(Artist.genres)]
+    loading = not editing and partition is None
+    if loading:
+        options.append(joinedload(Artist.shows).joinedload(Show.venue))
+    with primary() if loading else nullcontext():
+        artist = Artist.query.options(*options).filter_by(id=artist_id).first()
+    if artist is None:
+        abort(404)
+
+    gen = [ge.genre.name for ge in artist.genres]
+
+    if editing:
+        return {
+            "id": artist.id,
+            "name": artist.name,
+            "genres": gen,
+            "city": artist.city,
+            "state": artist.state,
+            "phone": artist.phone,
+            "website": artist.website_link,
+            "facebook_link": artist.facebook_link,
+            "seeking_venue": artist.seeking_venue,
+            "image_link": artist.image_link
+        }
+
+    if partition is None:
+        partition = artist_partition(artist_id, artist.shows, version)
+    past_shows, upcoming_shows = partition.split(get_now())
+    return artist_detail(artist, gen, past_shows, upcoming_shows)
+
+
+def artist_detail(artist, gen, past_shows, upcoming_shows):
+    return {
+        "id": artist.id,
+        "name": artist.name,
+        "genres": gen,
+        "city": artist.city,
+        "state": artist.state,
+        "phone": artist.phone,
+        "website": artist.website_link,
+        "facebook_link": artist.facebook_link,
+        "seeking_venue": artist.seeking_venue,
+        "image_link": artist.image_link,
+        "past_shows": past_shows,
+        "upcoming_shows": upcoming_shows,
+        "past_shows_count": len(past_shows),
+        "upcoming_shows_count": len(upcoming_shows),
+    }
+
+
+# The id breaks ties, so the order stays total even if uq_shows_booking is ever relaxed.
+SHOW_LIST_KEYS = [Show.start_date_time, Show.artist_id, Show.venue_id, Show.id]
+
+
+def show_list_query():
+    return select(Show.start_date_time, Show.artist_id, Show.venue_id, Show.id, Artist.name.label("artist_name"),
+                  Artist.image_link.label("artist_image_link"), Venue.name.label("venue_name")) \
+        .join(Artist, Show.artist_id == Artist.id).join(Venue, Show.venue_id == Venue.id)
+
+
+def show_list():
+    all_shows, next_cursor = keyset_page(show_list_query(), SHOW_LIST_KEYS)
+    return show_list_data(all_shows, next_cursor)
+
+
+def show_list_data(all_shows, next_cursor):
+    data = []
+    for item in all_shows:
+        data.append({
+            "venue_id": item.venue_id,
+            "venue_name": item.venue_name,
+            "artist_id": item.artist_id,
+            "artist_name": item.artist_name,
+            "artist_image_link": item.artist_image_link,
+            "start_time": item.start_date_time,
+        })
+
+    return {"shows": data, "next_cursor": next_cursor}